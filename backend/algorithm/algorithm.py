@@ -1,4 +1,5 @@
-from algorithm.arbiter import Arbiter
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
 from src.api_models import _Algorithm
 
 
@@ -11,11 +12,6 @@ class BaseAlgorithm:
         self.environment = algorithm.environment
         
     def makeDecisions(self):
-        decisions = []
-
-        # Pass the robot into the arbiter class to make the decision for the robot.
-        for robot in self.robots:
-            arbiter = Arbiter(robot)
-            decisions.append(arbiter.execute())
-
-        return decisions
+        # Decide for the whole fleet at once, the decisions match one Arbiter per robot.
+        batch_arbiter = BatchArbiter(pack_robots(self.robots))
+        return batch_arbiter.execute()
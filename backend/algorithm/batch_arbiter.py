@@ -0,0 +1,178 @@
+import numpy as np
+
+from algorithm.arbiter import ControllerType, payload_type_dictionary
+from models.robot_frame import RobotFrame, status_code_dictionary
+import src.settings as settings
+import src.utils as utils
+
+
+# Robots that match no controller condition keep the default go to goal controller without a payload type
+NO_CONTROLLER = 0
+
+
+# Payload types by controller value
+controller_payload_type_dictionary = {
+    NO_CONTROLLER: None,
+    **{controller_type.value: payload_type_dictionary[controller_type.name] for controller_type in ControllerType},
+}
+
+
+class BatchArbiter:
+    """
+    Makes the same decisions as one Arbiter per robot for a whole fleet at once. Every step of the arbiter is
+    evaluated for all robots of the frame with array operations, numpy's kernels may round the last bit of the
+    velocities and PID errors differently from the math module.
+    """
+    def __init__(self, frame: RobotFrame) -> None:
+        self.frame = frame
+        self.sensor_weights = np.array(settings.SENSOR_WEIGHTS, dtype=np.float64)[np.arange(frame.ir_x.shape[1])]
+
+        self.kP = settings.PID_CONTROLLER['kP'] # Proportional gain.
+        self.kI = settings.PID_CONTROLLER['kI'] # Integral gain.
+        self.kD = settings.PID_CONTROLLER['kD'] # Derivative gain.
+
+
+    def determine_goals(self):
+        """
+        Returns the goal of the go to goal controller of every robot, (1, 0) if its status sets none
+        """
+        frame = self.frame
+        conditions = [
+            (frame.status == status_code_dictionary["MAPPING"]) & frame.has_mapping_goal,
+            frame.status == status_code_dictionary["FIND_LEADER"],
+            (frame.status == status_code_dictionary["NAVIGATION"]) & frame.has_path_point,
+        ]
+        goal_x = np.select(conditions, [frame.mapping_goal_x, frame.leader_x, frame.path_point_x], default=1.0)
+        goal_y = np.select(conditions, [frame.mapping_goal_y, frame.leader_y, frame.path_point_y], default=0.0)
+        return goal_x, goal_y
+
+
+    def determine_controllers(self):
+        """
+        Returns the ControllerType value selected for every robot, NO_CONTROLLER if no condition matched
+        """
+        frame = self.frame
+        conditions = [
+            frame.status == status_code_dictionary["COLLISION"],
+            (frame.closest_distance < settings.CLOSE_DISTANCE_IN_PX) & (frame.status != status_code_dictionary["NAVIGATION"]),
+            frame.has_path_point | frame.has_mapping_goal | (frame.status == status_code_dictionary["FIND_LEADER"]),
+        ]
+        choices = [ControllerType.REVERSE.value, ControllerType.AVOID_OBSTACLES.value, ControllerType.GO_TO_GOAL.value]
+        return np.select(conditions, choices, default=NO_CONTROLLER)
+
+
+    def transform_to_robot_frame(self, x: np.ndarray, y: np.ndarray):
+        """
+        Transforms points into the frame of each robot, broadcasting over trailing sensor columns
+        """
+        frame = self.frame
+        theta = -frame.theta
+        cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+
+        # Inverse pose translation, computed once per robot
+        inverse_x = -frame.x * cos_theta - -frame.y * sin_theta
+        inverse_y = -frame.x * sin_theta + -frame.y * cos_theta
+
+        if x.ndim == 2:
+            cos_theta, sin_theta = cos_theta[:, None], sin_theta[:, None]
+            inverse_x, inverse_y = inverse_x[:, None], inverse_y[:, None]
+
+        return x * cos_theta - y * sin_theta + inverse_x, x * sin_theta + y * cos_theta + inverse_y
+
+
+    def calculate_go_to_goal_headings(self, goal_x: np.ndarray, goal_y: np.ndarray):
+        return self.transform_to_robot_frame(goal_x, goal_y)
+
+
+    def calculate_avoid_obstacles_headings(self):
+        """
+        Sums the weighted IR readings in the robot frame, in sensor order
+        """
+        frame = self.frame
+        reading_x, reading_y = self.transform_to_robot_frame(frame.ir_x, frame.ir_y)
+        heading_x = np.zeros(frame.count, dtype=np.float64)
+        heading_y = np.zeros(frame.count, dtype=np.float64)
+
+        for index in range(frame.ir_x.shape[1]):
+            mask = frame.ir_mask[:, index]
+            heading_x = np.where(mask, heading_x + reading_x[:, index] * self.sensor_weights[index], heading_x)
+            heading_y = np.where(mask, heading_y + reading_y[:, index] * self.sensor_weights[index], heading_y)
+
+        return heading_x, heading_y
+
+
+    def calculate_steering_inputs(self, heading_x: np.ndarray, heading_y: np.ndarray, prev_eP: np.ndarray, prev_eI: np.ndarray):
+        """
+        Runs the heading PID controller, returns the wheel velocities and the new PID errors
+        """
+        dt = settings.DIFFERENCE_IN_TIME
+
+        eP = np.arctan2(heading_y, heading_x)
+        eI = prev_eI + eP * dt
+        eD = (eP - prev_eP) / dt
+
+        w = self.kP * eP + self.kI * eI + self.kD * eD
+        v = settings.MAX_TRANSLATIONAL_VELOCITY / np.sqrt(np.abs(w) + 1)
+
+        v = np.maximum(np.minimum(v, settings.MAX_TRANSLATIONAL_VELOCITY), -settings.MAX_TRANSLATIONAL_VELOCITY)
+        w = np.maximum(np.minimum(w, settings.MAX_ANGULAR_VELOCITY), -settings.MAX_ANGULAR_VELOCITY)
+
+        velocity_left, velocity_right = utils.uni_to_diff(v, w)
+        return velocity_left, velocity_right, eP, eI
+
+
+    def calculate_decisions(self):
+        """
+        Returns the ControllerType value, wheel velocities and new PID errors of every robot as arrays
+        """
+        controllers = self.determine_controllers()
+
+        # Switching controllers resets the PID errors
+        reset = (controllers != NO_CONTROLLER) & (controllers != self.frame.previous_controller)
+        prev_eP = np.where(reset, 0.0, self.frame.prev_eP)
+        prev_eI = np.where(reset, 0.0, self.frame.prev_eI)
+
+        goal_heading_x, goal_heading_y = self.calculate_go_to_goal_headings(*self.determine_goals())
+        obstacle_heading_x, obstacle_heading_y = self.calculate_avoid_obstacles_headings()
+        is_avoiding = controllers == ControllerType.AVOID_OBSTACLES.value
+        heading_x = np.where(is_avoiding, obstacle_heading_x, goal_heading_x)
+        heading_y = np.where(is_avoiding, obstacle_heading_y, goal_heading_y)
+
+        velocity_left, velocity_right, eP, eI = self.calculate_steering_inputs(heading_x, heading_y, prev_eP, prev_eI)
+
+        # Reversing drives straight back at three times the maximum velocity and clears the PID errors
+        reverse_velocity = settings.MAX_TRANSLATIONAL_VELOCITY / (abs(0.0) + 1) ** 0.5
+        reverse_left, reverse_right = utils.uni_to_diff((-reverse_velocity * 3), 0.0)
+        is_reversing = controllers == ControllerType.REVERSE.value
+        velocity_left = np.where(is_reversing, reverse_left, velocity_left)
+        velocity_right = np.where(is_reversing, reverse_right, velocity_right)
+        eP = np.where(is_reversing, 0.0, eP)
+        eI = np.where(is_reversing, 0.0, eI)
+
+        return controllers, velocity_left, velocity_right, eP, eI
+
+
+    def execute(self):
+        """
+        Returns the Arbiter payload of every robot, in robot order
+        """
+        controllers, velocity_left, velocity_right, eP, eI = self.calculate_decisions()
+
+        reverse = ControllerType.REVERSE.value
+        ids, controllers = self.frame.ids.tolist(), controllers.tolist()
+        velocity_left, velocity_right, eP, eI = velocity_left.tolist(), velocity_right.tolist(), eP.tolist(), eI.tolist()
+
+        payloads = []
+        for idx, controller in enumerate(controllers):
+            # The reverse controller hands back its fresh, integer PID metadata
+            pid_metadata = {'prev_eP': 0, 'prev_eI': 0} if controller == reverse else {'prev_eP': eP[idx], 'prev_eI': eI[idx]}
+            payloads.append({
+                'robot_id': ids[idx],
+                'type': controller_payload_type_dictionary[controller],
+                'payload': {
+                    'steering_input': (velocity_left[idx], velocity_right[idx]),
+                    'pid_metadata': pid_metadata,
+                },
+            })
+
+        return payloads
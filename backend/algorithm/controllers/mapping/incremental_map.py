@@ -0,0 +1,142 @@
+import time
+from threading import Lock
+
+import numpy as np
+
+from algorithm.controllers.mapping.map_store import MapStore, map_store
+from algorithm.controllers.mapping.mapping import OPENING_ITERATIONS, OPENING_KERNEL_SIZE, OPENING_REACH, Mapping
+import src.settings as settings
+
+
+def get_dirty_boxes(x: np.ndarray, y: np.ndarray, width: int, tile_size: int):
+    """
+    Returns the bounding box (y_min, y_max, x_min, x_max) of the changed pixels in every tile holding any
+    """
+    tiles_per_row = width // tile_size + 1
+    tiles = (y // tile_size) * tiles_per_row + x // tile_size
+    order = np.argsort(tiles, kind="stable")
+    tiles, x, y = tiles[order], x[order], y[order]
+
+    starts = np.flatnonzero(np.r_[True, tiles[1:] != tiles[:-1]])
+    boxes = zip(np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts) + 1, np.minimum.reduceat(x, starts), np.maximum.reduceat(x, starts) + 1)
+    return [tuple(int(limit) for limit in box) for box in boxes]
+
+
+class IncrementalMap:
+    """
+    Adds new sensor readings to the current map of the store. Only the tiles holding new obstacles are opened again
+    and only the boxes around them are written into the new version, so an update costs in proportion to the new
+    readings rather than to the map or to every reading so far.
+    """
+    def __init__(self, store: MapStore, tile_size: int):
+        self.store = store
+        self.tile_size = tile_size
+        self.lock = Lock()
+
+        # Last map published from new readings
+        self.snapshot = None
+
+        # Counters exposed through get_stats
+        self.updates = 0
+        self.changed_pixels = 0
+        self.dirty_tiles = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+    def reset(self, final_map: np.ndarray, final_map_opened: np.ndarray):
+        """
+        Replaces the map with one built from every reading and publishes it, the store takes the arrays over
+        """
+        with self.lock:
+            self.snapshot = self.store.publish(final_map, final_map_opened)
+            return self.snapshot
+
+
+    def open_box(self, mapping: Mapping, final_map: np.ndarray, box: tuple, x: np.ndarray, y: np.ndarray):
+        """
+        Opens the raw grid with the new obstacle pixels x, y again around a dirty box, returns the window
+        (top, left, pixels) of the opened grid that may have changed
+        """
+        height, width = final_map.shape
+        y_min, y_max, x_min, x_max = box
+
+        reach = OPENING_REACH
+        top, bottom = max(y_min - reach, 0), min(y_max + reach, height)
+        left, right = max(x_min - reach, 0), min(x_max + reach, width)
+        crop_top, crop_bottom = max(top - reach, 0), min(bottom + reach, height)
+        crop_left, crop_right = max(left - reach, 0), min(right + reach, width)
+
+        # The raw grid of the current version is read only, the crop gets the new pixels it holds
+        crop = final_map[crop_top:crop_bottom, crop_left:crop_right].copy()
+        is_inside = (y >= crop_top) & (y < crop_bottom) & (x >= crop_left) & (x < crop_right)
+        crop[y[is_inside] - crop_top, x[is_inside] - crop_left] = 0
+
+        opened = mapping.apply_opening(crop, OPENING_KERNEL_SIZE, OPENING_ITERATIONS)
+        return top, left, opened[top - crop_top:bottom - crop_top, left - crop_left:right - crop_left]
+
+
+    def apply_delta(self, mapping: Mapping):
+        """
+        Adds the sensor readings of the mapping to the current map and publishes a new version if any obstacle
+        is new. Returns the current map and the number of new obstacle pixels.
+        """
+        with self.lock:
+            started_at = time.perf_counter()
+            shape = (mapping.height + 1, mapping.width + 1)
+
+            # Readings are placed exactly as when the whole map is rasterized, negative indices wrap around the grid
+            x, y = mapping.get_obstacle_pixels(range(len(mapping.region_points)))
+            x, y = x % shape[1], y % shape[0]
+
+            while True:
+                snapshot, final_map = self.store.get_maps()
+                if snapshot is None or final_map is None or final_map.shape != shape:
+                    # There is no raw grid of this size to add to, the readings start an empty one
+                    changed_pixels = len(np.unique(y * shape[1] + x))
+                    if changed_pixels == 0:
+                        return snapshot, 0
+
+                    final_map = np.full(shape, 255, dtype=np.uint8)
+                    final_map[y, x] = 0
+                    dirty_boxes = get_dirty_boxes(x, y, shape[1], self.tile_size)
+                    self.snapshot = self.store.publish(final_map, mapping.apply_opening(final_map, OPENING_KERNEL_SIZE, OPENING_ITERATIONS))
+                    break
+
+                is_new = final_map[y, x] != 0
+                new_x, new_y = x[is_new], y[is_new]
+                changed_pixels = len(np.unique(new_y * shape[1] + new_x))
+                if changed_pixels == 0:
+                    return snapshot, 0
+
+                dirty_boxes = get_dirty_boxes(new_x, new_y, shape[1], self.tile_size)
+                windows = [self.open_box(mapping, final_map, box, new_x, new_y) for box in dirty_boxes]
+
+                # Another writer may have published since, the readings are then added to its map instead
+                published = self.store.publish_patch(snapshot, new_x, new_y, windows)
+                if published is not None:
+                    self.snapshot = published
+                    break
+
+            elapsed = time.perf_counter() - started_at
+            self.updates += 1
+            self.changed_pixels += changed_pixels
+            self.dirty_tiles += len(dirty_boxes)
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            return self.snapshot, changed_pixels
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "version": self.snapshot.version if self.snapshot is not None else None,
+                "updates": self.updates,
+                "changed_pixels": self.changed_pixels,
+                "dirty_tiles": self.dirty_tiles,
+                "mean_update_time_ms": self.total_time / self.updates * 1000 if self.updates > 0 else 0.0,
+                "max_update_time_ms": self.max_time * 1000,
+            }
+
+
+incremental_map = IncrementalMap(map_store, settings.MAP_UPDATE_TILE_PX)
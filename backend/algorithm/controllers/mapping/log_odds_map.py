@@ -0,0 +1,139 @@
+import time
+from threading import Lock
+
+import numpy as np
+
+from algorithm.controllers.mapping.incremental_map import get_dirty_boxes
+from algorithm.controllers.mapping.map_store import MapStore, map_store
+import src.settings as settings
+
+
+def trace_rays(origins: np.ndarray, ends: np.ndarray):
+    """
+    Returns the x and y of the cells the rays from the (n, 2) origins to the (n, 2) ends cross, origin included and
+    end excluded. Every ray takes one step per cell along its major axis, so it visits each of its cells once.
+    """
+    origins, ends = np.rint(origins), np.rint(ends)
+    deltas = ends - origins
+    steps = np.abs(deltas).max(axis=1).astype(np.int64)
+
+    # Step of every cell along its ray, all rays of the batch traversed at once. Repeating the values of every ray
+    # is cheaper than gathering them by ray index.
+    ray_steps = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    fractions = ray_steps / np.repeat(steps, steps)
+
+    x = np.rint(np.repeat(origins[:, 0], steps) + np.repeat(deltas[:, 0], steps) * fractions).astype(np.int64)
+    y = np.rint(np.repeat(origins[:, 1], steps) + np.repeat(deltas[:, 1], steps) * fractions).astype(np.int64)
+    return x, y
+
+
+class LogOddsMap:
+    """
+    Probabilistic occupancy grid built from robot poses and the points their range sensors read. A reading raises
+    the log odds of the cell it ends in and lowers those of the cells its ray crosses, so cells seen free again
+    are cleared instead of kept forever. The grid is thresholded into the map the planners use, without opening.
+    """
+    def __init__(self, store: MapStore, tile_size: int):
+        self.store = store
+        self.tile_size = tile_size
+        self.lock = Lock()
+
+        # Log odds of every cell and the thresholded map published from them
+        self.log_odds = None
+        self.final_map = None
+        self.snapshot = None
+
+        # Counters exposed through get_stats
+        self.frames = 0
+        self.readings = 0
+        self.traversed_cells = 0
+        self.changed_pixels = 0
+        self.total_time = 0.0
+
+
+    def reset(self, width: int, height: int):
+        """
+        Starts an empty grid, every cell unknown and free in the published map
+        """
+        self.log_odds = np.zeros((height + 1, width + 1), dtype=np.float32)
+        self.final_map = np.full((height + 1, width + 1), 255, dtype=np.uint8)
+        self.snapshot = None
+
+
+    def get_cells(self, x: np.ndarray, y: np.ndarray):
+        """
+        Returns the flat indices of the cells among x and y that lie within the grid, repeats included
+        """
+        height, width = self.log_odds.shape
+        within_map = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        return y[within_map] * width + x[within_map]
+
+
+    def integrate(self, origins: np.ndarray, ends: np.ndarray, is_hit: np.ndarray):
+        """
+        Updates the log odds with one frame of readings, rays from the (n, 2) origins to the (n, 2) ends.
+        Readings that are not hits reached the sensor range without an obstacle and only clear their ray.
+        Each cell is updated once per frame and a hit outweighs any ray crossing its cell.
+        Returns the cells updated, repeats included.
+        """
+        free_x, free_y = trace_rays(origins, ends)
+        ends = np.rint(ends[is_hit]).astype(np.int64)
+        free_cells = self.get_cells(free_x, free_y)
+        hit_cells = self.get_cells(ends[:, 0], ends[:, 1])
+
+        # Repeated cells are assigned the same value, so each cell is updated once without deduplicating the cells.
+        # The hits are computed from the log odds before the frame and assigned last, replacing any ray update.
+        log_odds = self.log_odds.ravel()
+        hit_log_odds = np.minimum(log_odds[hit_cells] + settings.LOG_ODDS_HIT, settings.LOG_ODDS_MAX)
+        log_odds[free_cells] = np.maximum(log_odds[free_cells] + settings.LOG_ODDS_MISS, settings.LOG_ODDS_MIN)
+        log_odds[hit_cells] = hit_log_odds
+
+        self.traversed_cells += len(free_x)
+        return np.concatenate([free_cells, hit_cells])
+
+
+    def apply_frame(self, width: int, height: int, origins: np.ndarray, ends: np.ndarray, is_hit: np.ndarray):
+        """
+        Integrates a frame of readings and publishes a new version of the map if any cell changed state.
+        Returns the current map and the number of cells that changed state.
+        """
+        with self.lock:
+            started_at = time.perf_counter()
+            if self.log_odds is None or self.log_odds.shape != (height + 1, width + 1):
+                self.reset(width, height)
+
+            # Only the cells updated by the frame can cross the threshold
+            cells = self.integrate(origins, ends, is_hit)
+            values = np.where(self.log_odds.ravel()[cells] > settings.LOG_ODDS_OCCUPIED_THRESHOLD, 0, 255).astype(np.uint8)
+            is_changed = self.final_map.ravel()[cells] != values
+            changed = np.unique(cells[is_changed])
+            self.final_map.ravel()[cells[is_changed]] = values[is_changed]
+
+            self.frames += 1
+            self.readings += len(origins)
+            self.changed_pixels += len(changed)
+            if len(changed) > 0:
+                # The layers of the current map are patched around the changed cells if it was published from this grid
+                y, x = np.divmod(changed, self.final_map.shape[1])
+                dirty_boxes = get_dirty_boxes(x, y, self.final_map.shape[1], self.tile_size)
+                base = self.snapshot if self.snapshot is self.store.get_snapshot() else None
+                final_map = self.final_map.copy()
+                self.snapshot = self.store.publish(final_map, final_map.copy(), base, dirty_boxes)
+
+            self.total_time += time.perf_counter() - started_at
+            return self.store.get_snapshot(), len(changed)
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "version": self.snapshot.version if self.snapshot is not None else None,
+                "frames": self.frames,
+                "readings": self.readings,
+                "traversed_cells": self.traversed_cells,
+                "changed_pixels": self.changed_pixels,
+                "readings_per_second": self.readings / self.total_time if self.total_time > 0 else 0.0,
+            }
+
+
+log_odds_map = LogOddsMap(map_store, settings.MAP_UPDATE_TILE_PX)
@@ -0,0 +1,328 @@
+import atexit
+import os
+import time
+import weakref
+from threading import Condition, Lock, Thread
+
+import cv2
+import numpy as np
+
+from models.occupancy_map import OccupancyMap, get_read_only_view
+import src.settings as settings
+
+
+class MapBuffer:
+    """
+    Writable raw grid, opened grid and layers of one version of the map. Snapshots only ever get read only views of
+    them, and once the snapshot of its version is gone the buffer is written again for a later version.
+    """
+    def __init__(self, final_map: np.ndarray, final_map_opened: np.ndarray, validity_mask: np.ndarray, cost_field: np.ndarray):
+        self.final_map = final_map
+        self.final_map_opened = final_map_opened
+        self.validity_mask = validity_mask
+        self.cost_field = cost_field
+
+        # Snapshot of the version the buffer holds, only referenced weakly so the buffer is freed with it
+        self.lineage = None
+        self.version = None
+        self.snapshot = None
+
+
+    def get_layers(self):
+        return [self.final_map, self.final_map_opened, self.validity_mask, self.cost_field]
+
+
+    def is_free(self):
+        """
+        Returns True once nothing holds the snapshot of the version in the buffer
+        """
+        return self.snapshot is None or self.snapshot() is None
+
+
+    def copy(self):
+        return MapBuffer(*[layer.copy() for layer in self.get_layers()])
+
+
+class MapStore:
+    """
+    Process wide store of the current occupancy map. Each published map is a snapshot with a monotonically
+    increasing version, and the images are written to disk by a background thread.
+    Snapshots never change. A patched version is written into the buffer of an older version no snapshot holds
+    anymore, after copying in the boxes changed since, so a patch costs in proportion to the boxes changed.
+    """
+    def __init__(self, save_dir: str, persist_interval: float = settings.MAP_PERSIST_INTERVAL_S):
+        self.save_dir = save_dir
+        self.final_map_name = "final_map.png"
+        self.final_map_opened_name = "final_map_opened.png"
+
+        self.lock = Lock()
+        self.snapshot: OccupancyMap = None
+        self.version = 0
+
+        # Buffer of the current map, and the buffers of older versions waiting for their snapshots to be gone
+        self.buffer: MapBuffer = None
+        self.retired_buffers = []
+
+        # Background persistence, the current map is written at most every persist_interval seconds
+        self.persist_interval = persist_interval
+        self.condition = Condition()
+        self.pending = None
+        self.is_writing = False
+        self.flush_waiters = 0
+        self.written_at = -persist_interval
+        self.persisted_version = 0
+        self.worker = None
+
+        # Counters exposed through get_stats
+        self.patches = 0
+        self.reused_buffers = 0
+        self.copied_buffers = 0
+
+
+    def get_snapshot(self):
+        """
+        Returns the current occupancy map, loading the last persisted map on first use
+        """
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self.lock:
+            if self.snapshot is None:
+                self.load()
+            return self.snapshot
+
+
+    def get_maps(self):
+        """
+        Returns the current occupancy map and a read only view of the raw grid it was opened from, None if it is
+        unknown. The raw grid stays unchanged as long as the occupancy map is held.
+        """
+        self.get_snapshot()
+        with self.lock:
+            if self.buffer is None or self.buffer.final_map is None:
+                return self.snapshot, None
+            return self.snapshot, get_read_only_view(self.buffer.final_map)
+
+
+    def get_version(self):
+        """
+        Returns the version of the current occupancy map
+        """
+        return self.version
+
+
+    def load_image(self, name: str):
+        """
+        Reads a persisted map image from disk, returns None if it has not been written yet
+        """
+        file_path = f'{self.save_dir}{name}'
+        if not os.path.exists(file_path):
+            return None
+        return cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+
+
+    def load(self):
+        """
+        Reads the last persisted map from disk, the map stays None if no map has been generated yet
+        """
+        final_map_opened = self.load_image(self.final_map_opened_name)
+        if final_map_opened is None:
+            return
+
+        final_map = self.load_image(self.final_map_name)
+        final_map = final_map if final_map is not None and final_map.shape == final_map_opened.shape else None
+        self.set_current(*self.create_snapshot(final_map, final_map_opened, self.version))
+
+
+    def create_snapshot(self, final_map: np.ndarray, final_map_opened: np.ndarray, version: int):
+        """
+        Returns the buffer taking the arrays over and the snapshot of the map, with its layers built in full
+        """
+        snapshot = OccupancyMap(get_read_only_view(final_map_opened), version)
+        validity_mask, cost_field = snapshot.build_validity_mask(), snapshot.build_cost_field()
+        snapshot.validity_mask, snapshot.cost_field = get_read_only_view(validity_mask), get_read_only_view(cost_field)
+        return MapBuffer(final_map, final_map_opened, validity_mask, cost_field), snapshot
+
+
+    def set_current(self, buffer: MapBuffer, snapshot: OccupancyMap):
+        """
+        Makes the snapshot, held in the buffer, the current map. The buffer of the previous version is retired.
+        """
+        buffer.lineage, buffer.version, buffer.snapshot = snapshot.lineage, snapshot.version, weakref.ref(snapshot)
+        if self.buffer is not None and self.buffer is not buffer:
+            self.retired_buffers.append(self.buffer)
+        self.buffer, self.snapshot, self.version = buffer, snapshot, snapshot.version
+
+
+    def get_free_buffer(self):
+        """
+        Returns a buffer holding the current map for the next version to be written into. The most recent retired
+        buffer no snapshot holds anymore is brought up to date by copying in the boxes changed since its version, the
+        other free ones are dropped. The current map is only copied whole when no buffer is free or the change log
+        no longer reaches back to it.
+        """
+        free_buffers = [buffer for buffer in self.retired_buffers if buffer.is_free()]
+        self.retired_buffers = [buffer for buffer in self.retired_buffers if not buffer.is_free()]
+
+        current = self.buffer
+        buffer = max(free_buffers, key=lambda free_buffer: free_buffer.version, default=None)
+        changes = None
+        if buffer is not None and buffer.lineage == current.lineage and buffer.final_map is not None:
+            changes = self.snapshot.get_changes(buffer.version)
+        if changes is None:
+            self.copied_buffers += 1
+            return current.copy()
+
+        for top, bottom, left, right in changes[0]:
+            for layer, current_layer in zip(buffer.get_layers(), current.get_layers()):
+                layer[top:bottom, left:right] = current_layer[top:bottom, left:right]
+        self.reused_buffers += 1
+        return buffer
+
+
+    def publish(self, final_map: np.ndarray, final_map_opened: np.ndarray, base: OccupancyMap = None, dirty_boxes: list = None):
+        """
+        Atomically replaces the current map with a new version and schedules it to be persisted. The store takes
+        the arrays over. When the new map differs from the current one, base, only within the dirty boxes, its
+        layers are patched from copies of those of base.
+        """
+        with self.lock:
+            version = self.version + 1
+
+            # Build the shared layers before the snapshot is visible so planners never pay for them
+            if base is not None and base is self.snapshot and base.final_map.shape == final_map_opened.shape and dirty_boxes is not None:
+                snapshot = OccupancyMap(get_read_only_view(final_map_opened), version)
+                validity_mask, cost_field = base.get_validity_mask().copy(), base.get_cost_field().copy()
+                snapshot.patch_layers(base, dirty_boxes, validity_mask, cost_field)
+                buffer = MapBuffer(final_map, final_map_opened, validity_mask, cost_field)
+            else:
+                buffer, snapshot = self.create_snapshot(final_map, final_map_opened, version)
+
+            self.set_current(buffer, snapshot)
+
+        self.schedule_persist(version)
+        return snapshot
+
+
+    def publish_patch(self, base: OccupancyMap, x: np.ndarray, y: np.ndarray, windows: list):
+        """
+        Publishes a new version of the current map, base, with the raw pixels at x, y turned into obstacles and the
+        windows (top, left, pixels) of the opened grid replaced. The new version is written into a free buffer and
+        only its layers around the windows are computed again, earlier snapshots are left untouched.
+        Returns None if base is no longer the current map or its raw grid is unknown.
+        """
+        with self.lock:
+            if base is None or base is not self.snapshot or self.buffer.final_map is None:
+                return None
+
+            buffer = self.get_free_buffer()
+            buffer.final_map[y, x] = 0
+            boxes = []
+            for top, left, pixels in windows:
+                bottom, right = top + pixels.shape[0], left + pixels.shape[1]
+                buffer.final_map_opened[top:bottom, left:right] = pixels
+                boxes.append((top, bottom, left, right))
+
+            version = self.version + 1
+            snapshot = OccupancyMap(get_read_only_view(buffer.final_map_opened), version)
+            snapshot.patch_layers(base, boxes, buffer.validity_mask, buffer.cost_field)
+            self.set_current(buffer, snapshot)
+            self.patches += 1
+
+        self.schedule_persist(version)
+        return snapshot
+
+
+    def schedule_persist(self, version: int):
+        """
+        Marks the current map as waiting to be written to disk
+        """
+        with self.condition:
+            self.pending = version
+            self.condition.notify_all()
+        self.start_worker()
+
+
+    def start_worker(self):
+        """
+        Starts the background persistence thread if it is not running
+        """
+        with self.condition:
+            if self.worker is None:
+                self.worker = Thread(target=self.persist_forever, name="map-store-writer", daemon=True)
+                self.worker.start()
+
+
+    def persist_forever(self):
+        """
+        Writes the current map to disk whenever one is published, at most every persist_interval seconds unless
+        a flush is waiting for it
+        """
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                delay = self.written_at + self.persist_interval - time.monotonic()
+                if delay > 0 and self.flush_waiters == 0:
+                    self.condition.wait(delay)
+                    continue
+                self.pending = None
+                self.is_writing = True
+
+            # Holding the snapshot keeps its buffer, raw grid included, from being written for a later version
+            snapshot, final_map = self.get_maps()
+            version = snapshot.version
+
+            try:
+                if final_map is not None:
+                    self.write_image(self.final_map_name, final_map)
+                self.write_image(self.final_map_opened_name, snapshot.final_map)
+            except Exception as e:
+                print(e)
+            finally:
+                # The buffer may be reused as soon as it is written
+                del snapshot, final_map
+                with self.condition:
+                    self.is_writing = False
+                    self.written_at = time.monotonic()
+                    self.persisted_version = version
+                    self.condition.notify_all()
+
+
+    def write_image(self, name: str, image: np.ndarray):
+        """
+        Writes the image next to its final path and renames it, so readers never see a half written file
+        """
+        file_path = f'{self.save_dir}{name}'
+        temporary_path = f'{file_path}.tmp.png'
+        cv2.imwrite(temporary_path, image)
+        os.replace(temporary_path, file_path)
+
+
+    def flush(self, timeout: float = None):
+        """
+        Blocks until every published map has been written to disk
+        """
+        with self.condition:
+            self.flush_waiters += 1
+            self.condition.notify_all()
+            try:
+                return self.condition.wait_for(lambda: self.pending is None and not self.is_writing, timeout)
+            finally:
+                self.flush_waiters -= 1
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "version": self.version,
+                "patches": self.patches,
+                "reused_buffers": self.reused_buffers,
+                "copied_buffers": self.copied_buffers,
+                "retired_buffers": len(self.retired_buffers),
+            }
+
+
+map_store = MapStore("./algorithm/controllers/mapping/maps/")
+atexit.register(map_store.flush)
@@ -1,12 +1,21 @@
-import json
 from typing import List
 
 import numpy as np
+from algorithm.controllers.mapping.map_store import map_store
 from models.region import Region
 from src.api_models import _SensorReading
 from models.point import Point
 import cv2
-import src.utils as utils
+
+
+# Opening applied to the raw map, removes isolated readings. Each iteration reaches kernel_size // 2 pixels further.
+OPENING_KERNEL_SIZE = 3
+OPENING_ITERATIONS = 3
+
+# Opening erodes then dilates, so a changed raw pixel reaches this far into the opened map, and each opened pixel
+# depends on the raw pixels within the same distance around it
+OPENING_REACH = 2 * (OPENING_KERNEL_SIZE // 2) * OPENING_ITERATIONS
+
 
 class SensorReadingsPerRegion:
     def __init__(self, region_number: int, sensor_readings: List[Point]):
@@ -16,13 +25,11 @@ class SensorReadingsPerRegion:
 
 class Mapping:
     def __init__(self, width: int, height: int, number_of_regions: int, region_points: List[List[Point]], sensor_readings: List[SensorReadingsPerRegion]):
-        self.map_file_path = "./algorithm/controllers/mapping/map.json"
         self.width = width
         self.height = height
         self.region_points = region_points
         self.sensor_readings = sensor_readings
         self.number_of_regions = number_of_regions
-        self.save_dir = "./algorithm/controllers/mapping/maps/"
 
 
     def convert_readings_to_tuples(self, readings: List[Point], toRound=True):
@@ -68,62 +75,73 @@ class Mapping:
         return self.region_points[region_number][0].x, self.region_points[region_number][0].y, self.region_points[region_number][2].x, self.region_points[region_number][2].y
 
 
-    def clear_map_json(self):
-        self.save_data_to_file("")
+    def convert_readings_to_array(self, readings):
+        """Converts readings to a (n, 2) float array of x, y, readings may already be given as an array"""
+        if isinstance(readings, np.ndarray):
+            return readings.reshape(-1, 2).astype(np.float64, copy=False)
+
+        array = np.fromiter((coordinate for reading in readings for coordinate in (reading.x, reading.y)), dtype=np.float64, count=2 * len(readings))
+        return array.reshape(-1, 2)
 
 
-    def store_raw_data(self):
-        """"Stores raw data such as sensor readings, just in case it needs to be pre-loaded in"""
-        replacement_data = {
-            "width": self.width,
-            "height": self.height,
-            "number_of_regions": self.number_of_regions,
-            "regions": self.convert_regions_to_tuples(False),
-            "sensor_readings": self.convert_sensor_readings_per_region_to_dict(False)
-        }
+    def get_region_limits_array(self):
+        """Returns the limits of every region as a (regions, 4) array of x_min, y_min, x_max, y_max"""
+        return np.array([self.get_region_limits(idx) for idx in range(len(self.region_points))], dtype=np.float64).reshape(-1, 4)
 
-        self.save_data_to_file(replacement_data)
+
+    def get_obstacle_pixels(self, region_numbers: List[int]):
+        """
+        Returns the rounded x and y of the readings that fall within the limits of their region, for the given regions.
+        Readings are bounded by the region at the same position in the sensor readings as the region in the regions.
+        """
+        region_limits = self.get_region_limits_array()
+        region_numbers = [idx for idx in region_numbers if idx < len(self.sensor_readings) and idx < len(region_limits)]
+        if len(region_numbers) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Concatenate the readings once and give every reading the limits of its region
+        readings = [self.convert_readings_to_array(self.sensor_readings[idx].sensor_readings) for idx in region_numbers]
+        counts = [len(region_readings) for region_readings in readings]
+        limits = np.repeat(region_limits[region_numbers], counts, axis=0)
+        readings = np.rint(np.concatenate(readings))
+
+        # Rounding half to even matches round() of the readings
+        x, y = readings[:, 0], readings[:, 1]
+        inside = (limits[:, 0] <= x) & (x <= limits[:, 2]) & (limits[:, 1] <= y) & (y <= limits[:, 3])
+        return x[inside].astype(np.int64), y[inside].astype(np.int64)
 
 
     def generate_region_map(self, region_number: int):
         """Generates a region map from the data"""
-        # Create a mask for the region
         region_map = np.full((self.height + 1, self.width + 1), 255, dtype=np.uint8)
-        x_min, y_min, x_max, y_max = self.get_region_limits(region_number)
-
-        sensor_readings = self.convert_sensor_readings_per_region_to_dict()
-        
-        for reading in sensor_readings[region_number]["sensor_readings"]:
-            x, y = reading
+        x, y = self.get_obstacle_pixels([region_number])
+        region_map[y, x] = 0
+        return region_map
 
-            # Check if the reading is within the region
-            if (x_min <= x <= x_max and y_min <= y <= y_max):\
-                # Set the mask to 0
-                region_map[y, x] = 0
 
-        return region_map
+    def rasterize_readings(self):
+        """Rasterizes the readings of every region into a single map, obstacles are 0 and free space 255"""
+        final_map = np.full((self.height + 1, self.width + 1), 255, dtype=np.uint8)
+        x, y = self.get_obstacle_pixels(range(len(self.region_points)))
+        final_map[y, x] = 0
+        return final_map
 
     
-    def generate_map(self):
-        """Generates a map from the data"""
-        final_map = np.full((self.height + 1, self.width + 1), 255, dtype=np.uint8)
+    def build_map(self):
+        """Builds the map and its opened version from the data, without publishing it"""
+        final_map = self.rasterize_readings()
+        final_map_opened = self.apply_opening(final_map, OPENING_KERNEL_SIZE, OPENING_ITERATIONS)
+        return final_map, final_map_opened
 
-        for idx, _ in enumerate(self.region_points):
-            region_map = self.generate_region_map(idx)
-            final_map = cv2.bitwise_and(final_map, region_map)
 
-        final_map_opened = self.apply_opening(final_map, 3, 3)
+    def generate_map(self):
+        """Generates a map from the data"""
+        final_map, final_map_opened = self.build_map()
 
-        utils.save_image("final_map.png", self.save_dir, final_map)
-        utils.save_image("final_map_opened.png", self.save_dir, final_map_opened)
+        # Planners read the new version from memory straight away, the images are written in the background
+        return map_store.publish(final_map, final_map_opened)
 
     
     def apply_opening(self, image, kernel_size: int, iterations: int):
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
         return cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel, iterations=iterations)
-    
-    
-    def save_data_to_file(self, replacement_data):
-        # Dump data to file
-        with open(self.map_file_path, "w") as map_file:
-            map_file.write(json.dumps(replacement_data))
@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+from threading import Lock
+
+import numpy as np
+
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from models.point import Point
+import src.settings as settings
+
+
+# Version of the manifest layout, bumped whenever the segments are laid out differently
+MANIFEST_FORMAT = 1
+
+
+class ReadingStore:
+    """
+    Append only store of the raw mapping data. The readings of every entry of the sensor readings are kept in .npy
+    segments of x, y float64 rows, listed with the map size and regions in a small JSON manifest. Appending writes
+    only the new segments and the manifest, and reloading memory maps the segments instead of parsing them.
+    """
+    def __init__(self, directory: str, max_segments: int):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.max_segments = max_segments
+        self.lock = Lock()
+        self.manifest = None
+
+
+    def read_manifest(self):
+        """
+        Returns the manifest, None if nothing has been stored yet
+        """
+        if self.manifest is None and os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest_file:
+                self.manifest = json.load(manifest_file)
+        return self.manifest
+
+
+    def write_manifest(self, manifest: dict):
+        """
+        Writes the manifest next to its final path and renames it, so a reload never sees a half written manifest.
+        Segments are written before the manifest that lists them and removed after the manifest that drops them.
+        """
+        temporary_path = f'{self.manifest_path}.tmp'
+        with open(temporary_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temporary_path, self.manifest_path)
+        self.manifest = manifest
+
+        referenced = {segment["file"] for entry in manifest["entries"] for segment in entry["segments"]}
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy") and name not in referenced:
+                os.remove(os.path.join(self.directory, name))
+
+
+    def write_segment(self, manifest: dict, readings: np.ndarray):
+        """
+        Writes the readings to a new segment and returns its manifest entry
+        """
+        name = f'{manifest["next_segment"]:08d}.npy'
+        manifest["next_segment"] += 1
+        np.save(os.path.join(self.directory, name), np.ascontiguousarray(readings, dtype=np.float64))
+        return {"file": name, "count": len(readings)}
+
+
+    def add_readings(self, manifest: dict, mapping: Mapping):
+        """
+        Writes the readings of the mapping as new segments of the entries at the same positions, merging the segments
+        of entries that grew past max_segments
+        """
+        for position, sensor_readings in enumerate(mapping.sensor_readings):
+            if position == len(manifest["entries"]):
+                manifest["entries"].append({"region_number": sensor_readings.region_number, "segments": []})
+            entry = manifest["entries"][position]
+            entry["region_number"] = sensor_readings.region_number
+
+            readings = mapping.convert_readings_to_array(sensor_readings.sensor_readings)
+            if len(readings) > 0:
+                entry["segments"].append(self.write_segment(manifest, readings))
+
+            if len(entry["segments"]) > self.max_segments:
+                entry["segments"] = [self.write_segment(manifest, self.load_entry(entry))]
+
+
+    def get_header(self, mapping: Mapping):
+        return {
+            "format": MANIFEST_FORMAT,
+            "width": mapping.width,
+            "height": mapping.height,
+            "number_of_regions": mapping.number_of_regions,
+            "regions": mapping.convert_regions_to_tuples(False),
+        }
+
+
+    def write_mapping(self, mapping: Mapping):
+        """
+        Writes the mapping in place of the stored data, the caller holds the lock
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.read_manifest()
+        manifest = {**self.get_header(mapping), "next_segment": previous["next_segment"] if previous is not None else 0, "entries": []}
+        self.add_readings(manifest, mapping)
+        self.write_manifest(manifest)
+
+
+    def replace(self, mapping: Mapping):
+        """
+        Replaces the stored data with the mapping, which holds every reading as sent to /generate_map/
+        """
+        with self.lock:
+            self.write_mapping(mapping)
+
+
+    def append(self, mapping: Mapping):
+        """
+        Appends the readings of the mapping to the stored ones and takes its map size and regions.
+        The stored data is replaced if it was recorded for a map of another size.
+        """
+        with self.lock:
+            previous = self.read_manifest()
+            if previous is None or (previous["width"], previous["height"]) != (mapping.width, mapping.height):
+                self.write_mapping(mapping)
+                return
+
+            entries = [dict(entry, segments=list(entry["segments"])) for entry in previous["entries"]]
+            manifest = {**self.get_header(mapping), "next_segment": previous["next_segment"], "entries": entries}
+            self.add_readings(manifest, mapping)
+            self.write_manifest(manifest)
+
+
+    def load_entry(self, entry: dict):
+        """
+        Returns the readings of an entry, memory mapped without a copy when they are in a single segment
+        """
+        segments = [np.load(os.path.join(self.directory, segment["file"]), mmap_mode="r") for segment in entry["segments"]]
+        if len(segments) == 0:
+            return np.empty((0, 2), dtype=np.float64)
+        if len(segments) == 1:
+            return segments[0]
+        return np.concatenate(segments)
+
+
+    def load(self):
+        """
+        Returns the stored data as a Mapping with memory mapped readings, None if nothing has been stored yet
+        """
+        with self.lock:
+            manifest = self.read_manifest()
+            if manifest is None:
+                return None
+
+            region_points = [[Point(x, y) for x, y in region] for region in manifest["regions"]]
+            sensor_readings = [SensorReadingsPerRegion(entry["region_number"], self.load_entry(entry)) for entry in manifest["entries"]]
+            return Mapping(manifest["width"], manifest["height"], manifest["number_of_regions"], region_points, sensor_readings)
+
+
+    def replay(self):
+        """
+        Builds the map and its opened version from every stored reading, None if nothing has been stored yet
+        """
+        mapping = self.load()
+        return mapping.build_map() if mapping is not None else None
+
+
+    def get_stats(self):
+        with self.lock:
+            manifest = self.read_manifest()
+            if manifest is None:
+                return {"readings": 0, "segments": 0, "bytes": 0}
+
+            segments = [segment for entry in manifest["entries"] for segment in entry["segments"]]
+            return {
+                "readings": sum(segment["count"] for segment in segments),
+                "segments": len(segments),
+                "bytes": sum(os.path.getsize(os.path.join(self.directory, segment["file"])) for segment in segments),
+            }
+
+
+def convert_map_json(json_path: str, store: ReadingStore):
+    """
+    Converts raw mapping data saved to map.json by older versions into the store, returns the number of readings
+    converted. A cleared map.json holds no data and converts nothing.
+    """
+    with open(json_path) as map_file:
+        content = map_file.read()
+    data = json.loads(content) if content.strip() != "" else ""
+    if not isinstance(data, dict):
+        return 0
+
+    region_points = [[Point(x, y) for x, y in region] for region in data["regions"]]
+    sensor_readings = [
+        SensorReadingsPerRegion(entry["region_number"], np.array(entry["sensor_readings"], dtype=np.float64).reshape(-1, 2))
+        for entry in data["sensor_readings"]
+    ]
+    store.replace(Mapping(data["width"], data["height"], data["number_of_regions"], region_points, sensor_readings))
+    return sum(len(entry.sensor_readings) for entry in sensor_readings)
+
+
+reading_store = ReadingStore("./algorithm/controllers/mapping/readings/", settings.READING_STORE_MAX_SEGMENTS)
+
+
+if __name__ == "__main__":
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "./algorithm/controllers/mapping/map.json"
+    store = ReadingStore(sys.argv[2], settings.READING_STORE_MAX_SEGMENTS) if len(sys.argv) > 2 else reading_store
+    print(f'Converted {convert_map_json(json_path, store)} readings from {json_path} to {store.directory}')
@@ -58,11 +58,10 @@ class AvoidObstacles:
     def calculate_heading_vector(self):
         """Calculates the heading vector of the goal for the robot."""
         heading_vector = Point(0, 0)
+        inverse_pose = self.pose.inverse()
 
         # Calculate the heading vector.
         for index, sensor_reading in enumerate(self.sensor_readings):
-            inverse_pose = self.pose.inverse()
-
             reading = sensor_reading.rotate_and_translate(inverse_pose.point, inverse_pose.theta)
 
             heading_vector = heading_vector.add(reading.scale(self.sensor_weights[index]))
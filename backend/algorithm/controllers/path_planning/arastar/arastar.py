@@ -0,0 +1,182 @@
+import heapq
+import logging
+import time
+from math import inf, sqrt
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.plan_status import MAX_ITERATIONS_SENTINEL, PlanStatus
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+import src.settings as settings
+
+
+logger = logging.getLogger(__name__)
+
+def build_flat_layers(occupancy_map: OccupancyMap):
+    """
+    Returns the validity mask and cost field as flat lists indexed by cell key, plain lists index much faster
+    than arrays one element at a time
+    """
+    return occupancy_map.get_validity_mask().ravel().tolist(), occupancy_map.get_cost_field().ravel().tolist()
+
+
+class ARAStar(AStar):
+    """
+    Anytime Repairing A*. Finds a first path quickly with a heavily inflated heuristic, then keeps lowering the
+    inflation and repairing the search while the time budget lasts. Each path found costs at most
+    suboptimality_bound times the optimal path cost.
+    """
+    def __init__(self, occupancy_map: OccupancyMap, time_budget_ms: float = settings.ANYTIME_PLANNER_BUDGET_MS):
+        super().__init__(occupancy_map)
+        self.time_budget_ms = time_budget_ms
+        self.flat_validity_mask, self.flat_cost_field = occupancy_map.get_derived_layer("flat_layers", build_flat_layers)
+
+        # Heuristic inflation of the first search, lowered by epsilon_step after every path found
+        self.heuristic_weight = settings.ANYTIME_PLANNER_INITIAL_EPSILON
+        self.epsilon_step = settings.ANYTIME_PLANNER_EPSILON_STEP
+
+        # Cap on expansions over all searches, the time budget is the limit that normally applies
+        self.max_iterations = 200000
+
+        # Result of the last search
+        self.status = None
+        self.suboptimality_bound = inf
+        self.number_of_solutions = 0
+        self.elapsed_time = 0.0
+
+
+    def calculate_heuristic(self, x: int, y: int, goal_x: int, goal_y: int):
+        dx, dy = abs(x - goal_x), abs(y - goal_y)
+        return max(dx, dy) + (sqrt(2) - 1) * min(dx, dy)
+
+
+    def get_lower_bound(self, frontier: list, inconsistent: dict, g_costs: dict):
+        """
+        Returns the smallest g + h of the cells still to be expanded, a lower bound on the optimal path cost
+        """
+        lower_bound = inf
+        for _, h, _, key, g in frontier:
+            if g == g_costs[key]:
+                lower_bound = min(lower_bound, g + h)
+        for key, h in inconsistent.items():
+            lower_bound = min(lower_bound, g_costs[key] + h)
+        return lower_bound
+
+
+    def search(self, start_point: Point, goal_point: Point):
+        """
+        Executes ARA* within the time budget, returns the best path found or the sentinel if none was found
+        """
+        started_at = time.perf_counter()
+        deadline = started_at + self.time_budget_ms / 1000
+
+        start_x, start_y = int(start_point.x), int(start_point.y)
+        goal_x, goal_y = round(goal_point.x), round(goal_point.y)
+        start_key = self.get_key(start_x, start_y)
+        goal_key = self.get_key(goal_x, goal_y)
+
+        self.status = None
+        self.suboptimality_bound = inf
+        self.number_of_solutions = 0
+
+        # Open set is a binary heap of (f, h, insertion order, key, g when pushed), outdated entries are skipped lazily.
+        # Cells improved after their expansion in the current search wait in the inconsistent set for the next one.
+        epsilon = self.heuristic_weight
+        g_costs = {start_key: 0.0}
+        parents = {start_key: None}
+        closed = set()
+        inconsistent = {}
+        counter = 0
+
+        self.number_of_nodes += 1
+        start_h = self.calculate_heuristic(start_x, start_y, goal_x, goal_y)
+        frontier = [(epsilon * start_h, start_h, counter, start_key, 0.0)]
+
+        # Moves as (dx, dy, key offset, step length)
+        moves = [(dx, dy, dy * self.width + dx, step) for dx, dy, step in self.moves]
+        valid, cost = self.flat_validity_mask, self.flat_cost_field
+        width, height = self.width, self.height
+
+        best_path = None
+        iterations = 0
+        is_out_of_time = False
+
+        while True:
+            # Improve the path until no cell left to expand can lead to a cheaper one under the current inflation
+            while frontier and frontier[0][0] < g_costs.get(goal_key, inf):
+                if iterations >= self.max_iterations or (iterations % 64 == 0 and time.perf_counter() > deadline):
+                    is_out_of_time = True
+                    break
+
+                _, _, _, key, g = heapq.heappop(frontier)
+                if g != g_costs[key] or key in closed:
+                    continue
+
+                closed.add(key)
+                y, x = divmod(key, width)
+                self.number_of_expansions += 1
+
+                for dx, dy, offset, step in moves:
+                    nx, ny, child_key = x + dx, y + dy, key + offset
+                    if not (0 <= nx < width and 0 <= ny < height and valid[child_key]):
+                        continue
+                    self.number_of_nodes += 1
+
+                    child_g = g + step + cost[child_key]
+                    if child_g >= g_costs.get(child_key, inf):
+                        continue
+
+                    g_costs[child_key] = child_g
+                    parents[child_key] = key
+                    child_h = self.calculate_heuristic(nx, ny, goal_x, goal_y)
+                    if child_key in closed:
+                        inconsistent[child_key] = child_h
+                    else:
+                        counter += 1
+                        heapq.heappush(frontier, (child_g + epsilon * child_h, child_h, counter, child_key, child_g))
+
+                iterations += 1
+
+            # Publish the best path so far. Every cell whose cost may still drop is open or inconsistent, so their
+            # smallest g + h bounds the optimal cost from below, and a completed search also meets its inflation.
+            if goal_key in g_costs:
+                best_path = self.reconstruct_path(parents, goal_key)
+                self.number_of_solutions += 1
+                lower_bound = self.get_lower_bound(frontier, inconsistent, g_costs)
+                bound = float(g_costs[goal_key] / lower_bound) if lower_bound > 0 else 1.0
+                if not is_out_of_time:
+                    bound = min(bound, epsilon)
+                self.suboptimality_bound = max(min(self.suboptimality_bound, bound), 1.0)
+
+            if is_out_of_time or self.suboptimality_bound <= 1.0 or not frontier and not inconsistent:
+                break
+
+            # Lower the inflation and search again from the open and inconsistent cells
+            epsilon = max(epsilon - self.epsilon_step, 1.0)
+            entries = {key: g for _, _, _, key, g in frontier if g == g_costs[key] and key not in closed}
+            entries.update({key: g_costs[key] for key in inconsistent})
+            frontier = []
+            for key, g in entries.items():
+                y, x = divmod(key, self.width)
+                h = self.calculate_heuristic(x, y, goal_x, goal_y)
+                counter += 1
+                frontier.append((g + epsilon * h, h, counter, key, g))
+            heapq.heapify(frontier)
+            inconsistent = {}
+            closed = set()
+
+        self.elapsed_time = time.perf_counter() - started_at
+
+        if best_path is None:
+            if not is_out_of_time:
+                self.status = PlanStatus.NO_PATH
+            elif iterations >= self.max_iterations:
+                self.status = PlanStatus.MAX_ITERATIONS_REACHED
+            else:
+                self.status = PlanStatus.BUDGET_EXHAUSTED
+            logger.debug("Could not find goal: %s", self.status.value)
+            return [MAX_ITERATIONS_SENTINEL]
+
+        self.status = PlanStatus.FOUND
+        logger.debug("Found goal with suboptimality bound %.3f after %d expansions", self.suboptimality_bound, iterations)
+        return best_path
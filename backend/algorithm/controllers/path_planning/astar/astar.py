@@ -1,16 +1,21 @@
-from math import sqrt
-from typing import List
-import cv2
-import numpy as np
+import heapq
+import logging
+from math import inf, sqrt
 
-from algorithm.controllers.path_planning.astar.node import AStarNode
+from algorithm.controllers.path_planning.plan_status import MAX_ITERATIONS_SENTINEL, PlanStatus
+from models.occupancy_map import OccupancyMap
 from models.point import Point
-import src.settings as settings
+
+
+logger = logging.getLogger(__name__)
 
 
 class AStar:
-    def __init__(self, final_map):
-        self.final_map = final_map
+    def __init__(self, occupancy_map: OccupancyMap, heuristic_weight: float = None):
+        self.occupancy_map = occupancy_map
+        self.final_map = occupancy_map.final_map
+        self.validity_mask = occupancy_map.get_validity_mask()
+        self.cost_field = occupancy_map.get_cost_field()
         self.width = self.final_map.shape[1]
         self.height = self.final_map.shape[0]
 
@@ -25,79 +30,49 @@ class AStar:
             Point(-1, 1),
             Point(-1, 0)
         ]
+        self.moves = [(int(action.x), int(action.y), sqrt(action.x ** 2 + action.y ** 2)) for action in self.actions]
         self.number_of_nodes = 0
         self.number_of_expansions = 0
         self.max_iterations = 3000
 
-        # Initialize window related variables
-        self.validity_window_size = int(settings.ROBOT_RADIUS_IN_PX + settings.PX_AWAY_FROM_OBSTACLE)
-        self.validity_window = np.full((self.validity_window_size * 2, self.validity_window_size * 2), 255, dtype=np.uint8)
-        self.path_cost_window_size = self.validity_window_size + settings.WINDOW_BUFFER_PX
+        # Parent of every cell discovered by the last search
+        self.parents = {}
+
+        # Result of the last search
+        self.status = None
+        self.suboptimality_bound = None
+
+        # Without a weight cells are ordered by their proximity cost plus their distance to the goal, as the search
+        # always has, which reaches the goal in few expansions but does not bound the path cost. With a weight they
+        # are ordered by the path cost so far plus the weighted octile distance, and the path costs at most the
+        # weight times the optimal one.
+        self.heuristic_weight = heuristic_weight
 
 
     def is_point_valid(self, point: Point):
         """
         Returns True if the point is valid
         """
-        window = self.get_window(point, self.validity_window_size)
-        inverse_window = cv2.bitwise_not(window)
-        result = cv2.bitwise_and(inverse_window, self.validity_window)
-        return not np.sum(result) >= 255
+        return self.occupancy_map.is_point_valid(point)
 
 
     def calculate_euclidean_distance(self, p1: Point, p2: Point):
         return sqrt(pow(p1.x - p2.x, 2) + pow(p1.y - p2.y, 2))
 
 
-    def get_sizes(self, point: Point, size: int):
+    def calculate_octile_distance(self, p1: Point, p2: Point):
         """
-        Returns the sizes of the window
+        Returns the shortest 8-connected grid distance between two points ignoring obstacles
         """
-        x, y = point.unpack()
-        return x - size, y - size, x + size, y + size
-
-
-    def get_window(self, point: Point, size: int):
-        """
-        Returns a window of size window_size around the point
-        """
-        window = np.zeros((size * 2, size * 2), dtype=np.uint8)
-
-        x_min, y_min, x_max, y_max = self.get_sizes(point, size)
-
-        start_x = 0
-        end_x = size * 2
-        start_y = 0
-        end_y = size * 2
-
-        if x_min < 0:
-            start_x = abs(x_min)
-            x_min = 0
-        if y_min < 0:
-            start_y = abs(y_min)
-            y_min = 0
-        if x_max > self.width:
-            end_x = abs(self.width - x_max)
-            x_max = self.width
-        if y_max > self.height:
-            end_y = abs(self.height - y_max)
-            y_max = self.height
-        
-        window[int(start_y):int(end_y), int(start_x):int(end_x)] = self.final_map[int(y_min):int(y_max), int(x_min):int(x_max)]
-
-        return window
+        dx, dy = abs(p1.x - p2.x), abs(p1.y - p2.y)
+        return max(dx, dy) + (sqrt(2) - 1) * min(dx, dy)
 
 
     def calculate_path_cost(self, point: Point):
         """
         Calculates the path cost of moving from one node to another
         """
-        window = self.get_window(point, self.path_cost_window_size)
-        inverse_window = cv2.bitwise_not(window)
-
-        row, col = inverse_window.shape
-
-        return np.sum(inverse_window) / (row * col)
+        return self.occupancy_map.get_path_cost(point)
 
 
     def get_total_cost(self, p1: Point, p2: Point):
@@ -107,94 +82,129 @@ class AStar:
         return self.calculate_path_cost(p1) + self.calculate_euclidean_distance(p1, p2)
 
 
-    def get_neighbours(self, point: Point):
+    def get_key(self, x: int, y: int):
+        """
+        Returns the integer key of a cell, used to index the open and closed sets
+        """
+        return y * self.width + x
+
+
+    def get_point_from_key(self, key: int):
         """
-        Returns a list of neighbours of the point
+        Returns the point of a cell from its integer key
         """
-        neighbours = []
-        for action in self.actions:
-            neighbours.append(point.add(action))
-        return neighbours
+        y, x = divmod(key, self.width)
+        return Point(x, y)
 
 
-    def expand_and_return_children(self, node: AStarNode):
+    def expand_and_return_children(self, x: int, y: int):
         """
-        Expands the node and returns a list of children
+        Expands the cell and returns a list of (x, y, move cost) tuples for its valid neighbours,
+        where the move cost is the step length plus the proximity cost of the neighbour
         """
         self.number_of_expansions += 1
-        node.expansion_sequence = self.number_of_expansions
 
         children = []
 
-        for neighbour in self.get_neighbours(node.point):
-            if (neighbour.x in range(0, self.width) and neighbour.y in range(0, self.height) and self.is_point_valid(neighbour)):
+        for dx, dy, step_cost in self.moves:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height and self.validity_mask[ny, nx]:
                 self.number_of_nodes += 1
-                children.append(AStarNode(self.number_of_nodes, -1, neighbour, parent=node.point))
+                children.append((nx, ny, step_cost + self.cost_field[ny, nx]))
 
         return children
-    
-        
+
+
+    def reconstruct_path(self, parents: dict, goal_key: int):
+        """
+        Walks the parent map back from the goal and returns the path from start to goal
+        """
+        path = []
+        key = goal_key
+        while key is not None:
+            path.append(self.get_point_from_key(key))
+            key = parents[key]
+        path.reverse()
+
+        return path
+
+
     def search(self, start_point: Point, goal_point: Point):
         """
         Executes the A* algorithm
         """
-        frontier: List[AStarNode] = []
-        explored = []
-        removed = []
-        is_goal_found = False
-        goal_node: AStarNode = None
+        start_x, start_y = int(start_point.x), int(start_point.y)
+        goal_x, goal_y = round(goal_point.x), round(goal_point.y)
+        start_key = self.get_key(start_x, start_y)
+        goal_key = self.get_key(goal_x, goal_y)
+        is_weighted = self.heuristic_weight is not None
+
+        # Open set is a binary heap of (priority, insertion order, key), equal priorities leave in insertion order.
+        # Without a weight a cell is pushed once, when first discovered, and keeps that parent.
+        # With a weight a cell is pushed again whenever its path cost improves and outdated entries are skipped lazily.
+        frontier = []
+        closed = set()
+        g_costs = {start_key: 0.0}
+        self.parents = parents = {start_key: None}
+        counter = 0
 
         self.number_of_nodes += 1
-
-        # initial path cost of g is 0
-        initial_f = self.calculate_euclidean_distance(start_point, goal_point)
-        frontier.append(AStarNode(self.number_of_nodes, self.number_of_expansions, start_point, initial_f))
+        if is_weighted:
+            initial_priority = self.heuristic_weight * self.calculate_octile_distance(start_point, goal_point)
+        else:
+            initial_priority = self.calculate_euclidean_distance(start_point, goal_point)
+        heapq.heappush(frontier, (initial_priority, counter, start_key))
 
         # Iterations
         iterations = 0
+        is_goal_found = False
+
+        while frontier and iterations < self.max_iterations:
+            _, _, key = heapq.heappop(frontier)
+
+            if key in closed:
+                continue
 
-        while not is_goal_found and iterations < self.max_iterations:
             # Goal test before expansion
-            if frontier[0].point.equal(goal_point):
-                goal_node = frontier[0]
+            if key == goal_key:
+                is_goal_found = True
                 break
 
-            # Get children paths of the first frontier element
-            children = self.expand_and_return_children(frontier[0])
-            frontier[0].add_children(children)
-
-            # Put the first element of the frontier to the explored array
-            explored.append(frontier[0])
+            closed.add(key)
+            y, x = divmod(key, self.width)
+            g = g_costs[key]
 
-            # Remove the first element of the frontier
-            del frontier[0]
+            for nx, ny, move_cost in self.expand_and_return_children(x, y):
+                child_key = self.get_key(nx, ny)
+                if child_key in closed:
+                    continue
 
-            for child in children:
-                if not np.any([child.point.equal(e.point) for e in explored]) and not np.any([child.point.equal(f.point) for f in frontier]):
-                    child.f = self.get_total_cost(child.point, goal_point)
-                    frontier.append(child)
+                child_g = g + move_cost
+                if is_weighted:
+                    if child_g >= g_costs.get(child_key, inf):
+                        continue
+                    priority = child_g + self.heuristic_weight * self.calculate_octile_distance(Point(nx, ny), goal_point)
                 else:
-                    child.removed = True
-                    removed.append(child)
+                    if child_key in parents:
+                        continue
+                    priority = self.cost_field[ny, nx] + sqrt((nx - goal_point.x) ** 2 + (ny - goal_point.y) ** 2)
 
-            # Sort the frontier by the F cost
-            frontier.sort(key=lambda x: x.f)
+                g_costs[child_key] = child_g
+                parents[child_key] = key
+                counter += 1
+                heapq.heappush(frontier, (priority, counter, child_key))
 
             iterations = iterations + 1
 
-        if goal_node is None:
-            print("Could not find goal with max iterations")
-            return ["Max Iterations Reached"]
+        if not is_goal_found:
+            # An empty frontier means every reachable cell was expanded
+            self.status = PlanStatus.MAX_ITERATIONS_REACHED if frontier else PlanStatus.NO_PATH
+            self.suboptimality_bound = None
+            logger.debug("Could not find goal: %s", self.status.value)
+            return [MAX_ITERATIONS_SENTINEL]
 
-        print("Found goal with max iterations: " + str(iterations))
+        self.status = PlanStatus.FOUND
+        self.suboptimality_bound = self.heuristic_weight
+        logger.debug("Found goal after %d iterations", iterations)
 
-        # # Get the path from the goal node
-        path = [goal_node.point]
-        while goal_node.parent is not None:
-            path.insert(0, goal_node.parent)
-            for explored_node in explored:
-                if explored_node.point == goal_node.parent:
-                    goal_node = explored_node
-                    break
-
-        return path
+        return self.reconstruct_path(parents, goal_key)
@@ -0,0 +1,369 @@
+import heapq
+import time
+from collections import OrderedDict
+from math import inf, sqrt
+from threading import Lock
+
+import numpy as np
+
+from algorithm.controllers.path_planning.plan_status import MAX_ITERATIONS_SENTINEL, PlanStatus
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+MOVES = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+
+
+# Cap on the expansions of one search or repair
+MAX_ITERATIONS = 50000
+
+
+def get_changed_cells(previous: OccupancyMap, current: OccupancyMap):
+    """
+    Returns the (x, y) arrays of cells whose validity or proximity cost differ between two map versions,
+    or None if the maps can not be compared
+    """
+    if previous.final_map.shape != current.final_map.shape:
+        return None
+
+    # Versions patched from one another log the cells they changed, which spares comparing the whole layers
+    if previous.lineage == current.lineage:
+        changes = current.get_changes(previous.version)
+        return None if changes is None else changes[1:]
+
+    changed = (previous.get_validity_mask() != current.get_validity_mask()) | \
+        (previous.get_cost_field() != current.get_cost_field())
+    ys, xs = np.nonzero(changed)
+    return xs, ys
+
+
+class DStarLite:
+    """
+    D* Lite searching backwards from a fixed goal, so the search state stays valid as the robot moves
+    and only the cells affected by a map change are repaired
+    """
+    def __init__(self, occupancy_map: OccupancyMap, goal_point: Point, max_iterations: int = MAX_ITERATIONS):
+        self.occupancy_map = occupancy_map
+        self.validity_mask = occupancy_map.get_validity_mask()
+        self.cost_field = occupancy_map.get_cost_field()
+        self.width = occupancy_map.width
+        self.height = occupancy_map.height
+
+        self.heuristic_weight = 1.0
+        self.max_iterations = max_iterations
+        self.number_of_expansions = 0
+
+        # Held for a whole repair, requests for the same robot and goal share this search
+        self.lock = Lock()
+
+        self.goal = (round(goal_point.x), round(goal_point.y))
+        self.start = None
+        self.km = 0.0
+
+        # Search state, g and rhs default to infinity
+        self.g = {}
+        self.rhs = {self.goal: 0.0}
+        self.queue = []
+        self.queued = {}
+        self.push(self.goal)
+
+
+    def calculate_heuristic(self, a: tuple, b: tuple):
+        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return self.heuristic_weight * (max(dx, dy) + (sqrt(2) - 1) * min(dx, dy))
+
+
+    def calculate_key(self, cell: tuple):
+        """
+        Returns the priority of the cell, rounded so equal costs summed in a different order compare equal
+        """
+        value = min(self.g.get(cell, inf), self.rhs.get(cell, inf))
+        start = self.start if self.start is not None else cell
+        return (round(value + self.calculate_heuristic(start, cell) + self.km, 6), round(value, 6))
+
+
+    def push(self, cell: tuple):
+        key = self.calculate_key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key, cell))
+
+
+    def is_valid(self, cell: tuple):
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and self.validity_mask[y, x]
+
+
+    def get_edge_cost(self, a: tuple, b: tuple):
+        """
+        Returns the cost of moving from a to the neighbouring cell b, the step length plus the proximity cost of b
+        """
+        if not self.is_valid(b):
+            return inf
+        step = sqrt(2) if a[0] != b[0] and a[1] != b[1] else 1
+        return step + self.cost_field[b[1], b[0]]
+
+
+    def get_neighbours(self, cell: tuple):
+        x, y = cell
+        return [(x + dx, y + dy) for dx, dy in MOVES if 0 <= x + dx < self.width and 0 <= y + dy < self.height]
+
+
+    def calculate_rhs(self, cell: tuple):
+        """
+        Returns the one step lookahead cost of the cell, the cheapest edge cost plus cost to goal over its neighbours
+        """
+        if cell == self.goal:
+            return 0.0
+        return min([self.get_edge_cost(cell, neighbour) + self.g.get(neighbour, inf) for neighbour in self.get_neighbours(cell)] + [inf])
+
+
+    def update_queue(self, cell: tuple):
+        """
+        Queues the cell if it is inconsistent and removes it from the queue otherwise
+        """
+        self.queued.pop(cell, None)
+        if self.g.get(cell, inf) != self.rhs.get(cell, inf):
+            self.push(cell)
+
+
+    def update_vertex(self, cell: tuple):
+        self.rhs[cell] = self.calculate_rhs(cell)
+        self.update_queue(cell)
+
+
+    def top_key(self):
+        """
+        Returns the smallest key in the queue, discarding stale entries
+        """
+        while self.queue:
+            key, cell = self.queue[0]
+            if self.queued.get(cell) == key:
+                return key
+            heapq.heappop(self.queue)
+        return (inf, inf)
+
+
+    def compute_shortest_path(self):
+        """
+        Expands inconsistent cells until the start is consistent, returns False if max_iterations was reached
+        """
+        iterations = 0
+
+        while self.top_key() < self.calculate_key(self.start) or self.rhs.get(self.start, inf) != self.g.get(self.start, inf):
+            if iterations >= self.max_iterations:
+                return False
+
+            key_old, cell = heapq.heappop(self.queue)
+            del self.queued[cell]
+            key_new = self.calculate_key(cell)
+            self.number_of_expansions += 1
+            iterations += 1
+
+            if key_old < key_new:
+                self.push(cell)
+            elif self.g.get(cell, inf) > self.rhs.get(cell, inf):
+                # Overconsistent, the cell got cheaper so its neighbours can only get cheaper through it
+                g = self.rhs[cell]
+                self.g[cell] = g
+                for neighbour in self.get_neighbours(cell):
+                    if neighbour != self.goal:
+                        self.rhs[neighbour] = min(self.rhs.get(neighbour, inf), self.get_edge_cost(neighbour, cell) + g)
+                    self.update_queue(neighbour)
+            else:
+                # Underconsistent, only the neighbours whose lookahead went through the cell need recomputing
+                g_old = self.g.get(cell, inf)
+                self.g[cell] = inf
+                for neighbour in self.get_neighbours(cell) + [cell]:
+                    if self.rhs.get(neighbour, inf) == self.get_edge_cost(neighbour, cell) + g_old:
+                        self.rhs[neighbour] = self.calculate_rhs(neighbour)
+                    self.update_queue(neighbour)
+
+        return True
+
+
+    def update_start(self, start_point: Point):
+        """
+        Moves the start, raising the key modifier by the heuristic distance travelled
+        """
+        start = (int(start_point.x), int(start_point.y))
+        if self.start is not None and start != self.start:
+            self.km += self.calculate_heuristic(self.start, start)
+        self.start = start
+
+
+    def update_map(self, occupancy_map: OccupancyMap):
+        """
+        Switches to a new map version and repairs the cells whose validity or cost changed.
+        Returns the number of changed cells, or None if the search had to be restarted.
+        """
+        if occupancy_map is self.occupancy_map:
+            return 0
+
+        changed_cells = get_changed_cells(self.occupancy_map, occupancy_map)
+
+        self.occupancy_map = occupancy_map
+        self.validity_mask = occupancy_map.get_validity_mask()
+        self.cost_field = occupancy_map.get_cost_field()
+
+        if changed_cells is None:
+            self.width, self.height = occupancy_map.width, occupancy_map.height
+            self.g, self.rhs, self.queue, self.queued, self.km = {}, {self.goal: 0.0}, [], {}, 0.0
+            self.push(self.goal)
+            return None
+
+        # Entering a changed cell changes the cost of the edges from all of its neighbours
+        xs, ys = changed_cells
+        affected = set()
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            affected.add((x, y))
+            affected.update(self.get_neighbours((x, y)))
+
+        for cell in affected:
+            self.update_vertex(cell)
+
+        return len(xs)
+
+
+    def extract_path(self):
+        """
+        Follows the cheapest successor from the start to the goal
+        """
+        if self.g.get(self.start, inf) == inf:
+            return [MAX_ITERATIONS_SENTINEL]
+
+        path = [Point(*self.start)]
+        cell = self.start
+        visited = {cell}
+
+        while cell != self.goal:
+            cell = min(self.get_neighbours(cell), key=lambda neighbour: self.get_edge_cost(cell, neighbour) + self.g.get(neighbour, inf))
+            if cell in visited:
+                return [MAX_ITERATIONS_SENTINEL]
+            visited.add(cell)
+            path.append(Point(*cell))
+
+        return path
+
+
+    def find_path(self, is_goal_valid: bool):
+        """
+        Repairs the search and returns the plan status and the path from the start to the goal
+        """
+        if not is_goal_valid:
+            return PlanStatus.NO_PATH, [MAX_ITERATIONS_SENTINEL]
+        if not self.compute_shortest_path():
+            return PlanStatus.MAX_ITERATIONS_REACHED, [MAX_ITERATIONS_SENTINEL]
+
+        path = self.extract_path()
+        return PlanStatus.NO_PATH if isinstance(path[0], str) else PlanStatus.FOUND, path
+
+
+class IncrementalPlannerRegistry:
+    """
+    Keeps one D* Lite search per robot and goal so the search state survives between plan requests
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.planners = OrderedDict()
+        self.lock = Lock()
+
+        # Metrics
+        self.searches = 0
+        self.restarts = 0
+        self.repairs = 0
+        self.changed_cells = 0
+        self.expansions = 0
+        self.replanning_time = 0.0
+        self.last_replan = None
+
+
+    def search(self, robot_id: int, occupancy_map: OccupancyMap, start_point: Point, goal_point: Point, max_iterations: int = MAX_ITERATIONS):
+        """
+        Returns the plan status and the path from the start to the goal, reusing and repairing the robot's previous
+        search to the goal
+        """
+        started_at = time.perf_counter()
+        key = (robot_id, round(goal_point.x), round(goal_point.y))
+
+        with self.lock:
+            planner = self.planners.get(key)
+            if planner is None:
+                planner = DStarLite(occupancy_map, goal_point, max_iterations)
+                self.planners[key] = planner
+                while len(self.planners) > self.max_size:
+                    self.planners.popitem(last=False)
+            self.planners.move_to_end(key)
+
+        with planner.lock:
+            planner.max_iterations = max_iterations
+            expansions_before = planner.number_of_expansions
+            changed_cells = planner.update_map(occupancy_map)
+            planner.update_start(start_point)
+
+            status, path = planner.find_path(occupancy_map.is_point_valid(goal_point))
+            expansions = planner.number_of_expansions - expansions_before
+
+        elapsed = time.perf_counter() - started_at
+
+        with self.lock:
+            self.searches += 1
+            if changed_cells is None:
+                self.restarts += 1
+            elif changed_cells > 0:
+                self.repairs += 1
+                self.changed_cells += changed_cells
+            self.expansions += expansions
+            self.replanning_time += elapsed
+            self.last_replan = {
+                "robot_id": robot_id,
+                "map_version": occupancy_map.version,
+                "changed_cells": changed_cells,
+                "expansions": expansions,
+                "time_ms": elapsed * 1000,
+            }
+
+        return status, path
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "planners": len(self.planners),
+                "searches": self.searches,
+                "restarts": self.restarts,
+                "repairs": self.repairs,
+                "changed_cells": self.changed_cells,
+                "expansions": self.expansions,
+                "replanning_time_ms": self.replanning_time * 1000,
+                "last_replan": self.last_replan,
+            }
+
+
+class DStarLitePlanner:
+    """
+    Adapts the incremental planners of one robot to the search(start_point, goal_point) interface of the grid planners.
+    Without a registry every search starts from scratch and no search state is kept.
+    """
+    def __init__(self, occupancy_map: OccupancyMap, robot_id: int = None, registry: IncrementalPlannerRegistry = None,
+                 max_iterations: int = MAX_ITERATIONS):
+        self.occupancy_map = occupancy_map
+        self.robot_id = robot_id
+        self.registry = registry
+        self.heuristic_weight = 1.0
+        self.max_iterations = max_iterations
+
+        # Result of the last search, D* Lite paths are optimal
+        self.status = None
+        self.suboptimality_bound = None
+
+
+    def search(self, start_point: Point, goal_point: Point):
+        if self.registry is not None:
+            self.status, path = self.registry.search(self.robot_id, self.occupancy_map, start_point, goal_point, self.max_iterations)
+        else:
+            planner = DStarLite(self.occupancy_map, goal_point, self.max_iterations)
+            planner.update_start(start_point)
+            self.status, path = planner.find_path(self.occupancy_map.is_point_valid(goal_point))
+
+        self.suboptimality_bound = 1.0 if self.status == PlanStatus.FOUND else None
+        return path
@@ -0,0 +1,230 @@
+import heapq
+import time
+from collections import OrderedDict
+from math import inf, sqrt
+from threading import Lock
+
+import numpy as np
+
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+MOVES = [(-1, -1, sqrt(2)), (0, -1, 1), (1, -1, sqrt(2)), (1, 0, 1), (1, 1, sqrt(2)), (0, 1, 1), (-1, 1, sqrt(2)), (-1, 0, 1)]
+
+
+def compute_distance_field(occupancy_map: OccupancyMap, goal: tuple, window: tuple):
+    """
+    Runs Dijkstra backwards from the goal cell over the window (x_min, y_min, x_max, y_max) of the map.
+    Returns the cost of reaching the goal from every cell of the window, with the same edge costs as A*:
+    the step length plus the proximity cost of the cell being entered, which must be valid.
+    """
+    x_min, y_min, x_max, y_max = window
+    width, height = x_max - x_min, y_max - y_min
+
+    # Plain lists index much faster than arrays one element at a time
+    valid = occupancy_map.get_validity_mask()[y_min:y_max, x_min:x_max].ravel().tolist()
+    cost = occupancy_map.get_cost_field()[y_min:y_max, x_min:x_max].ravel().tolist()
+    moves = [(dx, dy, dy * width + dx, step) for dx, dy, step in MOVES]
+
+    distance = [inf] * (width * height)
+    goal_index = (goal[1] - y_min) * width + goal[0] - x_min
+    distance[goal_index] = 0.0
+    queue = [(0.0, goal_index)]
+
+    while queue:
+        cell_distance, index = heapq.heappop(queue)
+        if cell_distance > distance[index] or not valid[index]:
+            continue
+
+        y, x = divmod(index, width)
+        entry_cost = cost[index]
+        for dx, dy, offset, step in moves:
+            if 0 <= x + dx < width and 0 <= y + dy < height:
+                neighbour_distance = cell_distance + step + entry_cost
+                if neighbour_distance < distance[index + offset]:
+                    distance[index + offset] = neighbour_distance
+                    heapq.heappush(queue, (neighbour_distance, index + offset))
+
+    return np.array(distance, dtype=np.float64).reshape(height, width)
+
+
+def get_window(occupancy_map: OccupancyMap, goal: tuple, base=None, margin: int = 0):
+    """
+    Returns the window (x_min, y_min, x_max, y_max) searched for a field to the goal: the whole map for a full field,
+    the box around both goals grown by the margin for a patch over the base field
+    """
+    if base is None:
+        return 0, 0, occupancy_map.width, occupancy_map.height
+    return (
+        max(min(goal[0], base.goal[0]) - margin, 0),
+        max(min(goal[1], base.goal[1]) - margin, 0),
+        min(max(goal[0], base.goal[0]) + margin + 1, occupancy_map.width),
+        min(max(goal[1], base.goal[1]) + margin + 1, occupancy_map.height),
+    )
+
+
+class FlowField:
+    """
+    Cost to reach one goal cell from every cell of the map, shared by every robot heading to the goal.
+
+    A field can be a patch over the full field of a nearby goal: the patch is only searched around both goals and
+    elsewhere robots follow the base field to the old goal and the patch on to the new one. The combined cost is an
+    upper bound on the true cost that strictly decreases along the descent, so robots always reach the goal.
+    """
+    def __init__(self, occupancy_map: OccupancyMap, goal: tuple, window: tuple, distance: np.ndarray, base=None):
+        self.occupancy_map = occupancy_map
+        self.validity_mask = occupancy_map.get_validity_mask()
+        self.cost_field = occupancy_map.get_cost_field()
+        self.goal = goal
+        self.window = window
+        self.distance = distance
+        self.base = base
+
+        # Cost from the goal of the base field on to this goal
+        self.base_offset = self.get_local_distance(base.goal) if base is not None else inf
+
+
+    def get_local_distance(self, cell: tuple):
+        x_min, y_min, x_max, y_max = self.window
+        if x_min <= cell[0] < x_max and y_min <= cell[1] < y_max:
+            return self.distance[cell[1] - y_min, cell[0] - x_min]
+        return inf
+
+
+    def get_distance(self, cell: tuple):
+        """
+        Returns the cost of reaching the goal from the cell, infinite if it is unreachable
+        """
+        if self.base is None:
+            return self.get_local_distance(cell)
+        return min(self.get_local_distance(cell), self.base.get_distance(cell) + self.base_offset)
+
+
+    def is_reachable(self, point: Point):
+        x, y = round(point.x), round(point.y)
+        return 0 <= x < self.occupancy_map.width and 0 <= y < self.occupancy_map.height and self.get_distance((x, y)) < inf
+
+
+    def get_next_waypoint(self, point: Point, lookahead: int):
+        """
+        Descends the field from the point for at most lookahead cells, returns None if the goal is unreachable
+        """
+        if not self.is_reachable(point):
+            return None
+
+        x, y = round(point.x), round(point.y)
+        for _ in range(lookahead):
+            if (x, y) == self.goal:
+                break
+
+            best_cost, best_cell = inf, None
+            for dx, dy, step in MOVES:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.occupancy_map.width and 0 <= ny < self.occupancy_map.height and self.validity_mask[ny, nx]:
+                    neighbour_cost = step + self.cost_field[ny, nx] + self.get_distance((nx, ny))
+                    if neighbour_cost < best_cost:
+                        best_cost, best_cell = neighbour_cost, (nx, ny)
+
+            if best_cell is None:
+                break
+            x, y = best_cell
+
+        return Point(x, y)
+
+
+class FlowFieldCache:
+    """
+    LRU cache of flow fields keyed by map version and goal cell. A goal close to the goal of a cached full field
+    of the same map version, such as a leader that moved a little, is served by patching that field.
+    """
+    def __init__(self, max_size: int, patch_radius: int):
+        self.max_size = max_size
+        self.patch_radius = patch_radius
+        self.fields = OrderedDict()
+        self.lock = Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.full_builds = 0
+        self.patch_builds = 0
+        self.build_time = 0.0
+
+
+    def find_base(self, occupancy_map: OccupancyMap, goal: tuple):
+        """
+        Returns the closest cached full field of the map version within the patch radius of the goal
+        """
+        best, best_distance = None, inf
+        for (version, _), field in self.fields.items():
+            if version != occupancy_map.version or field.base is not None:
+                continue
+            distance = max(abs(field.goal[0] - goal[0]), abs(field.goal[1] - goal[1]))
+            if distance <= self.patch_radius and distance < best_distance:
+                best, best_distance = field, distance
+        return best
+
+
+    async def get_field(self, occupancy_map: OccupancyMap, goal_point: Point, compute_distance):
+        """
+        Returns the flow field to the goal on the map, building or patching it on a miss.
+        compute_distance(occupancy_map, goal, window) is awaited for the distance field of every window searched,
+        so the searches run wherever the caller chooses instead of in the caller's thread.
+        """
+        goal = (round(goal_point.x), round(goal_point.y))
+        key = (occupancy_map.version, goal)
+
+        with self.lock:
+            field = self.fields.get(key)
+            if field is not None:
+                self.fields.move_to_end(key)
+                self.hits += 1
+                return field
+            self.misses += 1
+            base = self.find_base(occupancy_map, goal)
+
+        started_at = time.perf_counter()
+        field = None
+        if base is not None:
+            window = get_window(occupancy_map, goal, base, self.patch_radius)
+            field = FlowField(occupancy_map, goal, window, await compute_distance(occupancy_map, goal, window), base)
+
+        # The patch can only be used if the old goal reaches the new one within the patch
+        is_patch = field is not None and field.base_offset < inf
+        if not is_patch:
+            window = get_window(occupancy_map, goal)
+            field = FlowField(occupancy_map, goal, window, await compute_distance(occupancy_map, goal, window))
+
+        with self.lock:
+            if is_patch:
+                self.patch_builds += 1
+            else:
+                self.full_builds += 1
+            self.build_time += time.perf_counter() - started_at
+            self.fields[key] = field
+            self.fields.move_to_end(key)
+            while len(self.fields) > self.max_size:
+                self.fields.popitem(last=False)
+
+        return field
+
+
+    def clear(self):
+        with self.lock:
+            self.fields.clear()
+
+
+    def get_stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.fields),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+                "full_builds": self.full_builds,
+                "patch_builds": self.patch_builds,
+                "build_time_ms": self.build_time * 1000,
+            }
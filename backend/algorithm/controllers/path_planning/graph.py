@@ -1,17 +1,51 @@
-import numpy as np
+import heapq
+from math import inf
 
 
 class Graph:
     def __init__(self, size: int):
         self.size = size
-        self.matrix = np.zeros((size, size), dtype=np.uint8)
+        self.adjacency = [{} for _ in range(size)]
 
 
-    def add_edge(self, node1: int, node2: int) -> None:
-        self.matrix[node1][node2] = 1
-        self.matrix[node2][node1] = 1
+    def add_edge(self, node1: int, node2: int, weight: float = 1.0) -> None:
+        self.adjacency[node1][node2] = weight
+        self.adjacency[node2][node1] = weight
 
 
-    def remove_edge(self, node1: str, node2: str) -> None:
-        self.matrix[node1][node2] = 0
-        self.matrix[node2][node1] = 0
+    def add_directed_edge(self, node1: int, node2: int, weight: float = 1.0) -> None:
+        self.adjacency[node1][node2] = weight
+
+
+    def remove_edge(self, node1: int, node2: int) -> None:
+        self.adjacency[node1].pop(node2, None)
+        self.adjacency[node2].pop(node1, None)
+
+
+    def shortest_paths(self, sources: dict):
+        """
+        Runs Dijkstra from the source nodes, given as a dictionary of node to initial cost.
+        Returns the cost to and the parent of every node, parents of sources are None.
+        """
+        costs = [inf] * self.size
+        parents = [None] * self.size
+        frontier = []
+
+        for node, cost in sources.items():
+            if cost < costs[node]:
+                costs[node] = cost
+                heapq.heappush(frontier, (cost, node))
+
+        while frontier:
+            cost, node = heapq.heappop(frontier)
+            if cost > costs[node]:
+                continue
+
+            for neighbour, weight in self.adjacency[node].items():
+                neighbour_cost = cost + weight
+                if neighbour_cost < costs[neighbour]:
+                    costs[neighbour] = neighbour_cost
+                    parents[neighbour] = node
+                    heapq.heappush(frontier, (neighbour_cost, neighbour))
+
+        return costs, parents
@@ -0,0 +1,238 @@
+from math import sqrt
+
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+STRAIGHT_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def get_uniform_mask(occupancy_map: OccupancyMap):
+    """
+    Returns the cells the robot fits in whose neighbours, and themselves, carry no proximity cost.
+    A path may turn into a cell with a cost from any of its neighbours, so jumps stop beside those cells.
+    """
+    uniform = occupancy_map.get_validity_mask() & (occupancy_map.get_cost_field() == 0)
+    padded = np.pad(uniform, 1, constant_values=False)
+    height, width = uniform.shape
+
+    mask = uniform.copy()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            mask &= padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+    return mask
+
+
+def build_jump_tables(occupancy_map: OccupancyMap):
+    """
+    Precomputes, for every cell and straight direction, the index of the next cell a straight jump stops at.
+    A jump stops at cells with a proximity cost, invalid cells and cells with a forced neighbour.
+    """
+    uniform = get_uniform_mask(occupancy_map)
+    padded = np.pad(uniform, 1, constant_values=False)
+    centre = padded[1:-1, 1:-1]
+    height, width = uniform.shape
+
+    forced = {
+        (1, 0): (~padded[2:, 1:-1] & padded[2:, 2:]) | (~padded[:-2, 1:-1] & padded[:-2, 2:]),
+        (-1, 0): (~padded[2:, 1:-1] & padded[2:, :-2]) | (~padded[:-2, 1:-1] & padded[:-2, :-2]),
+        (0, 1): (~padded[1:-1, 2:] & padded[2:, 2:]) | (~padded[1:-1, :-2] & padded[2:, :-2]),
+        (0, -1): (~padded[1:-1, 2:] & padded[:-2, 2:]) | (~padded[1:-1, :-2] & padded[:-2, :-2]),
+    }
+
+    tables = {}
+    for direction in STRAIGHT_DIRECTIONS:
+        stop = ~centre | forced[direction]
+        dx, dy = direction
+        axis = 0 if dx == 0 else 1
+        length = height if axis == 0 else width
+        indices = np.arange(length).reshape((-1, 1) if axis == 0 else (1, -1))
+
+        if dx + dy > 0:
+            # Smallest stop index at or after each cell, shifted so the cell itself is excluded
+            stop_indices = np.where(stop, indices, length)
+            next_stop = np.flip(np.minimum.accumulate(np.flip(stop_indices, axis), axis=axis), axis)
+            table = np.full(uniform.shape, length, dtype=np.int32)
+            if axis == 0:
+                table[:-1, :] = next_stop[1:, :]
+            else:
+                table[:, :-1] = next_stop[:, 1:]
+        else:
+            # Largest stop index at or before each cell, shifted so the cell itself is excluded
+            stop_indices = np.where(stop, indices, -1)
+            next_stop = np.maximum.accumulate(stop_indices, axis=axis)
+            table = np.full(uniform.shape, -1, dtype=np.int32)
+            if axis == 0:
+                table[1:, :] = next_stop[:-1, :]
+            else:
+                table[:, 1:] = next_stop[:, :-1]
+
+        tables[direction] = table
+
+    return tables
+
+
+class JumpPointSearch(AStar):
+    """
+    Jump Point Search over the cells with no proximity cost around them, falling back to weighted A* steps
+    for cells near obstacles where the proximity cost is non-zero
+    """
+    def __init__(self, occupancy_map: OccupancyMap, heuristic_weight: float = None):
+        super().__init__(occupancy_map, heuristic_weight)
+
+        # Cells away from any proximity cost, the search jumps across these
+        self.uniform_mask = occupancy_map.get_derived_layer("uniform_mask", get_uniform_mask)
+        self.jump_tables = occupancy_map.get_derived_layer("jump_tables", build_jump_tables)
+
+        # Key of the goal of the current search, jumps stop when they pass it
+        self.goal_key = None
+
+
+    def is_valid(self, x: int, y: int):
+        """
+        Returns True if the cell is within the map and the robot fits in it
+        """
+        return 0 <= x < self.width and 0 <= y < self.height and self.validity_mask[y, x]
+
+
+    def is_uniform(self, x: int, y: int):
+        """
+        Returns True if the cell is within the map and has no proximity cost
+        """
+        return 0 <= x < self.width and 0 <= y < self.height and self.uniform_mask[y, x]
+
+
+    def jump_straight(self, x: int, y: int, dx: int, dy: int):
+        """
+        Returns the jump point reached by moving straight from the cell, or None if the way is blocked
+        """
+        stop = int(self.jump_tables[(dx, dy)][y, x])
+        goal_y, goal_x = divmod(self.goal_key, self.width)
+
+        if dy == 0:
+            if goal_y == y and 0 < (goal_x - x) * dx < (stop - x) * dx:
+                return goal_x, goal_y
+            stop_x, stop_y = stop, y
+        else:
+            if goal_x == x and 0 < (goal_y - y) * dy < (stop - y) * dy:
+                return goal_x, goal_y
+            stop_x, stop_y = x, stop
+
+        if not self.is_valid(stop_x, stop_y):
+            return None
+        return stop_x, stop_y
+
+
+    def jump(self, x: int, y: int, dx: int, dy: int):
+        """
+        Moves from the cell in the direction until a jump point is found, returns None if the way is blocked.
+        Cells with a proximity cost stop the jump so they are expanded one step at a time.
+        """
+        if dx == 0 or dy == 0:
+            return self.jump_straight(x, y, dx, dy)
+
+        while True:
+            x, y = x + dx, y + dy
+
+            if not self.is_valid(x, y):
+                return None
+            if self.get_key(x, y) == self.goal_key or not self.uniform_mask[y, x]:
+                return x, y
+
+            # Forced neighbours appear where a cell beside the diagonal has a cost but the cell past it does not
+            if (not self.is_uniform(x - dx, y) and self.is_uniform(x - dx, y + dy)) or \
+                    (not self.is_uniform(x, y - dy) and self.is_uniform(x + dx, y - dy)):
+                return x, y
+
+            # A diagonal cell is a jump point if either of its straight components reaches one
+            if self.jump_straight(x, y, dx, 0) is not None or self.jump_straight(x, y, 0, dy) is not None:
+                return x, y
+
+
+    def get_directions(self, x: int, y: int):
+        """
+        Returns the directions to search from the cell, pruned by the direction it was reached from
+        """
+        parent_key = self.parents[self.get_key(x, y)]
+        if parent_key is None:
+            return [(dx, dy) for dx, dy, _ in self.moves]
+
+        parent_y, parent_x = divmod(parent_key, self.width)
+        dx = (x > parent_x) - (x < parent_x)
+        dy = (y > parent_y) - (y < parent_y)
+
+        if dx != 0 and dy != 0:
+            directions = [(dx, 0), (0, dy), (dx, dy)]
+            if not self.is_uniform(x - dx, y):
+                directions.append((-dx, dy))
+            if not self.is_uniform(x, y - dy):
+                directions.append((dx, -dy))
+        elif dx != 0:
+            directions = [(dx, 0)]
+            if not self.is_uniform(x, y + 1):
+                directions.append((dx, 1))
+            if not self.is_uniform(x, y - 1):
+                directions.append((dx, -1))
+        else:
+            directions = [(0, dy)]
+            if not self.is_uniform(x + 1, y):
+                directions.append((1, dy))
+            if not self.is_uniform(x - 1, y):
+                directions.append((-1, dy))
+
+        return directions
+
+
+    def expand_and_return_children(self, x: int, y: int):
+        """
+        Expands the cell and returns a list of (x, y, move cost) tuples for the jump points reachable from it.
+        Cells with a proximity cost expand their neighbours one step at a time like A*.
+        """
+        if not self.uniform_mask[y, x]:
+            return super().expand_and_return_children(x, y)
+
+        self.number_of_expansions += 1
+
+        children = []
+
+        for dx, dy in self.get_directions(x, y):
+            jump_point = self.jump(x, y, dx, dy)
+            if jump_point is None:
+                continue
+
+            nx, ny = jump_point
+            self.number_of_nodes += 1
+            steps = max(abs(nx - x), abs(ny - y))
+            step_length = sqrt(2) if dx != 0 and dy != 0 else 1
+            children.append((nx, ny, steps * step_length + self.cost_field[ny, nx]))
+
+        return children
+
+
+    def search(self, start_point: Point, goal_point: Point):
+        """
+        Executes Jump Point Search
+        """
+        self.goal_key = self.get_key(round(goal_point.x), round(goal_point.y))
+        return super().search(start_point, goal_point)
+
+
+    def reconstruct_path(self, parents: dict, goal_key: int):
+        """
+        Walks the parent map back from the goal and fills in the cells between consecutive jump points
+        """
+        jump_points = super().reconstruct_path(parents, goal_key)
+
+        path = [jump_points[0]]
+        for jump_point in jump_points[1:]:
+            x, y = path[-1].unpack()
+            dx = (jump_point.x > x) - (jump_point.x < x)
+            dy = (jump_point.y > y) - (jump_point.y < y)
+            while (x, y) != (jump_point.x, jump_point.y):
+                x, y = x + dx, y + dy
+                path.append(Point(x, y))
+
+        return path
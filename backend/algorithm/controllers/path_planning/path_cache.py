@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class PathCache:
+    """
+    Bounded least recently used cache of the navigation paths returned by PathToGoal.execute
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+        # Counters exposed through get_stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def get(self, key):
+        """
+        Returns the cached navigation paths for the key, or None on a miss
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+
+    def put(self, key, navigation_paths):
+        """
+        Stores the navigation paths for the key, evicting the least recently used entries beyond max_size
+        """
+        with self.lock:
+            self.entries[key] = navigation_paths
+            self.entries.move_to_end(key)
+            self.evict()
+
+
+    def evict(self):
+        """
+        Drops the least recently used entries until the cache fits in max_size
+        """
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def resize(self, max_size: int):
+        """
+        Changes the maximum number of entries, evicting entries if the cache shrinks
+        """
+        with self.lock:
+            self.max_size = max_size
+            self.evict()
+
+
+    def clear(self):
+        """
+        Drops every entry, called whenever a new map is generated
+        """
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+
+    def get_stats(self):
+        """
+        Returns the size and counters of the cache
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
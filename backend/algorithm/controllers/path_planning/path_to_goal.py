@@ -1,95 +1,176 @@
+import time
 from math import cos, sin, sqrt
 from typing import List
 import cv2
 import numpy as np
-from algorithm.controllers.path_planning.bfs.bfs import BFS
-from algorithm.controllers.path_planning.graph import Graph
+from algorithm.controllers.path_planning.arastar.arastar import ARAStar
 from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.dstar_lite.dstar_lite import DStarLitePlanner, IncrementalPlannerRegistry
+from algorithm.controllers.path_planning.jps.jps import JumpPointSearch
+from algorithm.controllers.path_planning.plan_status import PlanStatus, get_plan_result
+from algorithm.controllers.path_planning.plan_history import PlanHistory, draw_paths
+from algorithm.controllers.path_planning.region_graph import get_region_graph
+from algorithm.controllers.path_planning.segment_cache import SegmentCache
+from algorithm.controllers.mapping.map_store import map_store
+from models.occupancy_map import OccupancyMap
 from models.region import Region
+from models.region_index import get_region_index, get_regions_signature
 import src.settings as settings
 from models.point import Point
 from models.pose import Pose
 import sys
 
+
+planner_dictionary = {
+    "ASTAR": AStar,
+    "JPS": JumpPointSearch,
+}
+
+
+plan_history = PlanHistory(settings.PLAN_HISTORY_SIZE)
+
+
+segment_cache = SegmentCache(settings.SEGMENT_CACHE_SIZE)
+
+
+# Incremental planners keep their search state per robot and goal across requests and map versions
+incremental_planner_dictionary = {
+    "DSTAR_LITE": DStarLitePlanner,
+}
+
+
+incremental_planners = IncrementalPlannerRegistry(settings.INCREMENTAL_PLANNER_CACHE_SIZE)
+
+
+# Anytime planners search within a time budget and report how far their path may be from the optimal one
+anytime_planner_dictionary = {
+    "ARASTAR": ARAStar,
+}
+
+
+def is_planner_known(planner: str):
+    return planner in planner_dictionary or planner in incremental_planner_dictionary or planner in anytime_planner_dictionary
+
+
+def get_plan_cache_key(map_version: int, regions: List[Region], initial_pose: Pose, goal_point: Point, planner: str, hierarchical: bool,
+                       time_budget_ms: float):
+    """
+    Returns the key identifying a plan request in the path cache. It is computed from the request alone, so the
+    planner and its map layers are only built when the plan is not cached.
+    """
+    time_budget_ms = time_budget_ms if planner in anytime_planner_dictionary else None
+
+    return (
+        map_version,
+        get_regions_signature(regions),
+        initial_pose.point.round().unpack(),
+        goal_point.round().unpack(),
+        (planner, time_budget_ms, hierarchical),
+    )
+
+
 class PathToGoal:
-    def __init__(self, initial_pose: Pose, goal_point: Point, regions: List[Region]):
+    def __init__(self, initial_pose: Pose, goal_point: Point, regions: List[Region], planner: str = "ASTAR", hierarchical: bool = False, robot_id: int = None, occupancy_map: OccupancyMap = None,
+                 time_budget_ms: float = settings.ANYTIME_PLANNER_BUDGET_MS):
         np.set_printoptions(threshold=sys.maxsize)
 
         # Initialize constructor variables
         self.initial_pose = initial_pose
         self.goal_point = goal_point
+        self.planner = planner
+        self.hierarchical = hierarchical
+        self.robot_id = robot_id
+        self.time_budget_ms = time_budget_ms
 
-        # Initialize final map array and associated metadata
-        self.final_map_path = "./algorithm/controllers/mapping/maps/final_map_opened.png"
-        self.final_map = cv2.imread(self.final_map_path, cv2.IMREAD_GRAYSCALE)
+        # Result of the last execution, every segment must be found for the plan to be found
+        self.status = None
+        self.suboptimality_bound = None
+
+        # Take a snapshot of the current map, later map updates do not affect this request
+        self.occupancy_map = occupancy_map if occupancy_map is not None else map_store.get_snapshot()
+        self.final_map = self.occupancy_map.final_map
 
         # Initialize regions
         self.regions = regions
+        self.region_index = get_region_index(self.regions)
 
-        # Graph
-        self.graph = Graph(len(self.regions))
-        self.init_graph()
+        # Weighted region graph with precomputed routes
+        self.region_graph = get_region_graph(self.regions)
 
         # Initialize miscellaneous variables
         self.save_dir = "./algorithm/controllers/path_planning/"
 
         # Initialize Search algorithms
-        self.a_star = AStar(self.final_map)
-        self.bfs = BFS(self.graph)
+        self.path_planner = self.create_path_planner(self.occupancy_map)
 
-    
-    def init_graph(self):
+
+    def create_path_planner(self, occupancy_map):
         """
-        Initialize the adjacency matrix graph
+        Returns the grid path planner for the map, incremental planners resume the robot's previous searches
         """
-        for region in self.regions:
-            for region_id in region.connected_region_ids:
-                self.graph.add_edge(region.id, region_id)
+        if self.planner in incremental_planner_dictionary:
+            return incremental_planner_dictionary[self.planner](occupancy_map, self.robot_id, incremental_planners)
+        if self.planner in anytime_planner_dictionary:
+            return anytime_planner_dictionary[self.planner](occupancy_map, self.time_budget_ms)
+        return planner_dictionary[self.planner](occupancy_map)
 
 
+    def create_segment_planner(self, occupancy_map):
+        """
+        Returns the grid path planner for cached segments. Segments are shared by every robot, so incremental
+        planners search from scratch instead of touching the robot's search state.
+        """
+        if self.planner in incremental_planner_dictionary:
+            return incremental_planner_dictionary[self.planner](occupancy_map)
+        return self.create_path_planner(occupancy_map)
+
+    
     def get_region_from_point(self, point: Point):
         """
         Returns the region containing the point
         """
-        return list(filter(lambda x: x.is_point_within_region(point), self.regions))[0]
+        region = self.region_index.get_region_from_point(point)
+        if region is None:
+            raise ValueError(f'Point {point.unpack()} is not within any region')
+        return region
 
     
-    def visualize(self, path: List[Point]):
+    def visualize(self, navigation_paths: List[List[Point]]):
         """
         Visualizes the A* algorithm
         """
-        path_map = self.final_map.copy()
-
-        for point in path:
-            path_map[point.y][point.x] = 100
-        
-        cv2.imwrite(f'{self.save_dir}{"path_map.png"}', path_map)
+        cv2.imwrite(f'{self.save_dir}{"path_map.png"}', draw_paths(self.final_map, navigation_paths))
 
     
     def get_navigation_path(self, start_region: Region, goal_region: Region):
         """
         Returns the navigation path from start to goal
         """
-        path = self.bfs.search(start_region.id, goal_region.id)
-        
-        if len(path) == 0:
-            return [self.initial_pose.point, self.goal_point]
+        entry_points = self.region_graph.get_entry_points(start_region.id, goal_region.id)
 
-        navigation_paths = [self.initial_pose.point]
-        for idx, p in enumerate(path):
-            if idx == len(path) - 1:
-                break
-            navigation_paths.append(self.regions[path[idx + 1]].get_entry_point(p))
-        navigation_paths.append(self.goal_point)
-
-        return navigation_paths
+        return [self.initial_pose.point] + entry_points + [self.goal_point]
 
     
+    def get_cached_segment(self, route: List[int], idx: int):
+        """
+        Returns the cached path between the entry points on either side of the idx-th region of the route, with the
+        status and suboptimality bound it was planned with
+        """
+        in_idx = self.region_graph.transition_indices[(route[idx - 1], route[idx])]
+        out_idx = self.region_graph.transition_indices[(route[idx], route[idx + 1])]
+        time_budget_ms = self.time_budget_ms if self.planner in anytime_planner_dictionary else None
+        cache_key = (get_regions_signature(self.regions), self.planner, self.path_planner.heuristic_weight, self.path_planner.max_iterations, time_budget_ms)
+        path, _, status, suboptimality_bound = segment_cache.get_segment(self.occupancy_map, self.region_graph, cache_key, in_idx, out_idx, self.create_segment_planner)
+        return path, status, suboptimality_bound
+
+
     def execute(self):
         """
         Executes the regional A* algorithm
         """
-        if not self.a_star.is_point_valid(self.goal_point):
+        self.status, self.suboptimality_bound = PlanStatus.FOUND, 1.0
+        if not self.occupancy_map.is_point_valid(self.goal_point):
+            self.status = PlanStatus.INVALID_GOAL
             return []
         
         initial_pose_region = self.get_region_from_point(self.initial_pose.point),
@@ -98,6 +179,8 @@ class PathToGoal:
         
         navigation_points = self.get_navigation_path(initial_pose_region, goal_point_region)
         navigation_paths = []
+        route = self.region_graph.get_route(initial_pose_region.id, goal_point_region.id)
+        started_at = time.perf_counter()
 
         for idx, point in enumerate(navigation_points):
             # Last point is the goal, therefore it is not counted
@@ -106,18 +189,46 @@ class PathToGoal:
             
             end_point = navigation_points[idx + 1]
 
-            # Trigger the A Star algorithm
-            path = self.a_star.search(point.round(), end_point)
+            is_cached = self.hierarchical and 0 < idx < len(navigation_points) - 2
+            if is_cached:
+                # Segments between two entry points cross a single region and are stitched in from the cache
+                path, segment_status, segment_bound = self.get_cached_segment(route, idx)
+            else:
+                if self.planner in anytime_planner_dictionary:
+                    # The segments left share what is left of the time budget
+                    remaining_budget_ms = self.time_budget_ms - (time.perf_counter() - started_at) * 1000
+                    self.path_planner.time_budget_ms = max(remaining_budget_ms, 0) / (len(navigation_points) - 1 - idx)
+
+                # Trigger the grid path planner. Every planner reports whether it ran out of iterations or time or exhausted
+                # the map, weighted searches are within their heuristic weight of the optimal path, anytime searches report
+                # the bound they reached and unweighted A* searches have no bound.
+                path = self.path_planner.search(point.round(), end_point)
+                segment_status, segment_bound = self.path_planner.status, self.path_planner.suboptimality_bound
 
             if isinstance(path[0], str):
+                self.status, self.suboptimality_bound = segment_status, None
                 navigation_paths = path
                 break
+            if self.suboptimality_bound is not None:
+                self.suboptimality_bound = max(self.suboptimality_bound, segment_bound) if segment_bound is not None else None
 
             # Add the path to the navigation paths
             navigation_paths.append(path)
 
-        # Visualize the navigation paths
+        # Keep the plan so it can be drawn on demand, only debug mode draws it on the request path
         if not isinstance(path[0], str):
-            self.visualize(list(np.concatenate(navigation_paths).flat))
+            plan_history.record(self.occupancy_map, navigation_paths)
+            if settings.DEBUG_VISUALIZE_PATHS:
+                self.visualize(navigation_paths)
 
         return navigation_paths
+
+
+    def execute_with_status(self):
+        """
+        Executes the plan and returns its status, suboptimality bound and navigation paths, without the sentinel path
+        """
+        navigation_paths = self.execute()
+        if self.status != PlanStatus.FOUND:
+            return get_plan_result(self.status)
+        return get_plan_result(self.status, self.suboptimality_bound, navigation_paths)
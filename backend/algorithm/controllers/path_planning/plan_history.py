@@ -0,0 +1,61 @@
+from collections import deque
+from threading import Lock
+from typing import List
+
+import numpy as np
+
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+def draw_paths(final_map: np.ndarray, navigation_paths: List[List[Point]]):
+    """
+    Returns a copy of the map with the cells of every path segment drawn in grey
+    """
+    path_map = final_map.copy()
+
+    points = [point.unpack() for path in navigation_paths for point in path]
+    if len(points) > 0:
+        points = np.array(points, dtype=np.int64)
+        path_map[points[:, 1], points[:, 0]] = 100
+
+    return path_map
+
+
+class PlanHistory:
+    """
+    Keeps references to the most recent plans and the map snapshot each was planned on, so they can be
+    drawn on demand instead of on every planning request
+    """
+    def __init__(self, max_size: int):
+        self.plans = deque(maxlen=max_size)
+        self.lock = Lock()
+
+
+    def record(self, occupancy_map: OccupancyMap, navigation_paths: List[List[Point]]):
+        """
+        Records a successful plan, nothing is copied or drawn
+        """
+        with self.lock:
+            self.plans.append((occupancy_map, navigation_paths))
+
+
+    def render(self, version: int = None, count: int = None):
+        """
+        Draws the last count plans made on the map version, the latest recorded version by default.
+        Returns None if no plan was recorded for the version.
+        """
+        with self.lock:
+            plans = list(self.plans)
+
+        if version is None and len(plans) > 0:
+            version = plans[-1][0].version
+
+        plans = [plan for plan in plans if plan[0].version == version]
+        if len(plans) == 0:
+            return None
+        if count is not None:
+            plans = plans[-count:]
+
+        occupancy_map = plans[-1][0]
+        return draw_paths(occupancy_map.final_map, [path for _, navigation_paths in plans for path in navigation_paths])
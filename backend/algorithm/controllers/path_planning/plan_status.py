@@ -0,0 +1,36 @@
+from enum import Enum
+
+
+# Path returned by the grid planners when no path was found, kept for clients that do not ask for a plan status
+MAX_ITERATIONS_SENTINEL = "Max Iterations Reached"
+
+
+class PlanStatus(str, Enum):
+    FOUND = "FOUND" # Every segment has a path, within the suboptimality bound of the optimal one
+    MAX_ITERATIONS_REACHED = "MAX_ITERATIONS_REACHED" # A planner ran out of iterations before reaching its goal
+    BUDGET_EXHAUSTED = "BUDGET_EXHAUSTED" # An anytime planner ran out of time before its first path
+    NO_PATH = "NO_PATH" # The search exhausted every reachable cell without reaching the goal
+    INVALID_GOAL = "INVALID_GOAL" # The robot does not fit at the goal
+
+
+def get_plan_result(status: PlanStatus, suboptimality_bound: float = None, navigation_paths: list = None):
+    """
+    Returns the result of a plan request as the API reports it when a plan status is requested
+    """
+    return {
+        "status": status,
+        "suboptimality_bound": suboptimality_bound,
+        "navigation_paths": navigation_paths if navigation_paths is not None else [],
+    }
+
+
+def get_legacy_navigation_paths(plan_result: dict):
+    """
+    Returns the navigation paths of a plan result as returned before plan statuses, the sentinel path when a
+    planner gave up and no paths when the goal is invalid
+    """
+    if plan_result["status"] == PlanStatus.FOUND:
+        return plan_result["navigation_paths"]
+    if plan_result["status"] == PlanStatus.INVALID_GOAL:
+        return []
+    return [MAX_ITERATIONS_SENTINEL]
@@ -0,0 +1,125 @@
+from math import inf, sqrt
+from typing import List
+
+from algorithm.controllers.path_planning.graph import Graph
+from models.point import Point
+from models.region import Region
+from models.region_index import get_region_set_layer
+
+
+def calculate_distance(p1: Point, p2: Point):
+    return sqrt(pow(p1.x - p2.x, 2) + pow(p1.y - p2.y, 2))
+
+
+def get_region_centre(region: Region):
+    return Point((region.start_point.x + region.end_point.x) / 2, (region.start_point.y + region.end_point.y) / 2)
+
+
+class RegionGraph:
+    """
+    Weighted graph of the region set with precomputed routes between every pair of regions.
+
+    Each node is a transition from one region into a neighbouring one, located at the entry point of the region
+    being entered, and edges between consecutive transitions are weighted by the distance between their entry points.
+    The region centres stand in for the unknown start and goal positions when routes are precomputed.
+    """
+    def __init__(self, regions: List[Region]):
+        self.regions = {region.id: region for region in regions}
+
+        # Transitions (from region id, to region id) and the entry point used to enter the next region
+        self.transitions = []
+        self.entry_points = []
+        for region in regions:
+            neighbour_ids = set(region.connected_region_ids)
+            neighbour_ids.update(other.id for other in regions if region.id in other.connected_region_ids)
+            for neighbour_id in sorted(neighbour_ids):
+                entry_point = self.regions[neighbour_id].get_entry_point(region.id) if neighbour_id in self.regions else None
+                if entry_point is not None:
+                    self.transitions.append((region.id, neighbour_id))
+                    self.entry_points.append(entry_point)
+
+        self.transition_indices = {transition: idx for idx, transition in enumerate(self.transitions)}
+
+        self.graph = Graph(len(self.transitions))
+        self.init_graph()
+
+        # Precomputed routes, routes[start id][goal id] is the list of region ids from start to goal
+        self.routes = self.compute_all_routes()
+
+
+    def init_graph(self):
+        """
+        Connects every transition into a region to every transition out of it
+        """
+        outgoing = {}
+        for idx, (from_id, _) in enumerate(self.transitions):
+            outgoing.setdefault(from_id, []).append(idx)
+
+        for idx, (_, to_id) in enumerate(self.transitions):
+            for next_idx in outgoing.get(to_id, []):
+                weight = calculate_distance(self.entry_points[idx], self.entry_points[next_idx])
+                self.graph.add_directed_edge(idx, next_idx, weight)
+
+
+    def compute_routes_from(self, start_id: int):
+        """
+        Runs Dijkstra from the start region and returns the shortest route to every reachable region
+        """
+        start_centre = get_region_centre(self.regions[start_id])
+        sources = {
+            idx: calculate_distance(start_centre, self.entry_points[idx])
+            for idx, (from_id, _) in enumerate(self.transitions) if from_id == start_id
+        }
+        costs, parents = self.graph.shortest_paths(sources)
+
+        # The best transition into each goal region, including the distance on to the centre of the goal
+        best = {}
+        for idx, (_, to_id) in enumerate(self.transitions):
+            if costs[idx] == inf or to_id == start_id:
+                continue
+            cost = costs[idx] + calculate_distance(self.entry_points[idx], get_region_centre(self.regions[to_id]))
+            if to_id not in best or cost < best[to_id][0]:
+                best[to_id] = (cost, idx)
+
+        routes = {start_id: []}
+        for goal_id, (_, idx) in best.items():
+            route = [goal_id]
+            while idx is not None:
+                route.append(self.transitions[idx][0])
+                idx = parents[idx]
+            route.reverse()
+            routes[goal_id] = route
+
+        return routes
+
+
+    def compute_all_routes(self):
+        """
+        Precomputes the routes between every pair of regions
+        """
+        return {region_id: self.compute_routes_from(region_id) for region_id in self.regions}
+
+
+    def get_route(self, start_id: int, goal_id: int):
+        """
+        Returns the region ids from the start to the goal region, empty if they are the same region
+        """
+        route = self.routes.get(start_id, {}).get(goal_id)
+        if route is None:
+            raise ValueError(f'Region {goal_id} can not be reached from region {start_id}')
+        return route
+
+
+    def get_entry_points(self, start_id: int, goal_id: int):
+        """
+        Returns the entry points crossed on the route from the start to the goal region
+        """
+        route = self.get_route(start_id, goal_id)
+        return [self.regions[route[idx + 1]].get_entry_point(route[idx]) for idx in range(len(route) - 1)]
+
+
+def get_region_graph(regions: List[Region]):
+    """
+    Returns the region graph for the region set, reusing the routes computed for an identical region set
+    """
+    return get_region_set_layer(regions, "region_graph", RegionGraph)
@@ -0,0 +1,93 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import List
+
+from models.region import Region
+from models.region_index import get_regions_signature
+
+
+def get_regions_hash(regions: List[Region]):
+    """
+    Returns a content hash of the region set, equal for region sets with the same geometry and connections
+    """
+    return hashlib.sha1(repr(get_regions_signature(regions)).encode()).hexdigest()
+
+
+def is_etag_matched(if_none_match: str, etag: str):
+    """
+    Checks if an If-None-Match header lists the ETag, weak validators and * included
+    """
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class RegionSetStore:
+    """
+    Bounded least recently used store of uploaded region sets keyed by their content hash, so plan requests reference
+    a region set by id instead of sending and parsing it on every call
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.region_sets = OrderedDict()
+        self.lock = Lock()
+
+        # Counters exposed through get_stats
+        self.uploads = 0
+        self.duplicate_uploads = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def register(self, regions: List[Region]):
+        """
+        Stores the region set and returns its id, uploading an already stored region set keeps the stored one
+        """
+        region_set_id = get_regions_hash(regions)
+
+        with self.lock:
+            self.uploads += 1
+            if region_set_id in self.region_sets:
+                self.duplicate_uploads += 1
+            else:
+                self.region_sets[region_set_id] = regions
+            self.region_sets.move_to_end(region_set_id)
+
+            while len(self.region_sets) > self.max_size:
+                self.region_sets.popitem(last=False)
+                self.evictions += 1
+
+        return region_set_id
+
+
+    def get(self, region_set_id: str):
+        """
+        Returns the regions of the region set, or None if it was never uploaded or has been evicted
+        """
+        with self.lock:
+            regions = self.region_sets.get(region_set_id)
+            if regions is None:
+                self.misses += 1
+                return None
+
+            self.region_sets.move_to_end(region_set_id)
+            self.hits += 1
+            return regions
+
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.region_sets),
+                "max_size": self.max_size,
+                "uploads": self.uploads,
+                "duplicate_uploads": self.duplicate_uploads,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+            }
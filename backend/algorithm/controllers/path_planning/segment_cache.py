@@ -0,0 +1,166 @@
+import hashlib
+from collections import OrderedDict
+from math import sqrt
+from threading import Event, Lock
+
+from algorithm.controllers.path_planning.region_graph import RegionGraph
+from models.occupancy_map import OccupancyMap
+
+
+class RegionSegments:
+    """
+    Grid paths between every incoming and outgoing entry point of one region, planned on one map
+    """
+    def __init__(self, version: int, window: tuple, pixel_hash: str, segments: dict):
+        self.version = version
+        self.window = window
+        self.pixel_hash = pixel_hash
+        self.segments = segments
+
+
+class SegmentCache:
+    """
+    Bounded least recently used cache of the grid paths and costs between the entry points of each region for
+    hierarchical planning. A new map version only invalidates the regions whose pixels changed around the region
+    and its paths. Regions are planned outside the lock, a region requested while it is being planned waits for it.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.regions = OrderedDict()
+        self.building = {}
+        self.lock = Lock()
+
+        # Counters
+        self.hits = 0
+        self.revalidations = 0
+        self.region_rebuilds = 0
+        self.evictions = 0
+
+
+    def get_pixel_window(self, occupancy_map: OccupancyMap, region_graph: RegionGraph, region_id: int, segments: dict):
+        """
+        Returns the (x_min, y_min, x_max, y_max) window of pixels the segments of the region depend on,
+        the region and its paths expanded by the cost window
+        """
+        region = region_graph.regions[region_id]
+        x_min, y_min = region.start_point.unpack()
+        x_max, y_max = region.end_point.unpack()
+
+        for path, _, _, _ in segments.values():
+            if isinstance(path[0], str):
+                continue
+            x_min = min([x_min] + [point.x for point in path])
+            y_min = min([y_min] + [point.y for point in path])
+            x_max = max([x_max] + [point.x for point in path])
+            y_max = max([y_max] + [point.y for point in path])
+
+        margin = occupancy_map.cost_window_size
+        return (
+            max(int(x_min) - margin, 0),
+            max(int(y_min) - margin, 0),
+            min(int(x_max) + margin + 1, occupancy_map.width),
+            min(int(y_max) + margin + 1, occupancy_map.height),
+        )
+
+
+    def get_pixel_hash(self, occupancy_map: OccupancyMap, window: tuple):
+        x_min, y_min, x_max, y_max = window
+        window_pixels = occupancy_map.final_map[y_min:y_max, x_min:x_max]
+        return hashlib.sha1(str(window_pixels.shape).encode() + window_pixels.tobytes()).hexdigest()
+
+
+    def get_path_cost(self, occupancy_map: OccupancyMap, path: list):
+        """
+        Returns the A* cost of the path, the step lengths plus the proximity cost of every cell after the first
+        """
+        cost = 0.0
+        cost_field = occupancy_map.get_cost_field()
+        for previous, point in zip(path, path[1:]):
+            cost += sqrt(pow(point.x - previous.x, 2) + pow(point.y - previous.y, 2)) + cost_field[point.y, point.x]
+        return cost
+
+
+    def build_region(self, occupancy_map: OccupancyMap, region_graph: RegionGraph, region_id: int, planner_factory):
+        """
+        Plans the paths between every incoming and outgoing entry point of the region
+        """
+        incoming = [idx for idx, (_, to_id) in enumerate(region_graph.transitions) if to_id == region_id]
+        outgoing = [idx for idx, (from_id, _) in enumerate(region_graph.transitions) if from_id == region_id]
+
+        segments = {}
+        for in_idx in incoming:
+            for out_idx in outgoing:
+                # Routes never turn back into the region they came from
+                if region_graph.transitions[in_idx][0] == region_graph.transitions[out_idx][1]:
+                    continue
+
+                start_point = region_graph.entry_points[in_idx].round()
+                planner = planner_factory(occupancy_map)
+                path = planner.search(start_point, region_graph.entry_points[out_idx])
+                cost = None if isinstance(path[0], str) else self.get_path_cost(occupancy_map, path)
+                segments[(in_idx, out_idx)] = (path, cost, planner.status, planner.suboptimality_bound)
+
+        window = self.get_pixel_window(occupancy_map, region_graph, region_id, segments)
+        return RegionSegments(occupancy_map.version, window, self.get_pixel_hash(occupancy_map, window), segments)
+
+
+    def get_segment(self, occupancy_map: OccupancyMap, region_graph: RegionGraph, cache_key: tuple, in_idx: int, out_idx: int, planner_factory):
+        """
+        Returns the cached (path, cost, plan status, suboptimality bound) across the region between two transitions,
+        planning the region if needed
+        """
+        region_id = region_graph.transitions[in_idx][1]
+        key = (cache_key, region_id)
+
+        while True:
+            with self.lock:
+                entry = self.regions.get(key)
+
+                if entry is not None and entry.version != occupancy_map.version:
+                    # Keep the region if none of the pixels its paths depend on changed in the new version
+                    if self.get_pixel_hash(occupancy_map, entry.window) == entry.pixel_hash:
+                        entry.version = occupancy_map.version
+                        self.revalidations += 1
+                    else:
+                        del self.regions[key]
+                        entry = None
+
+                if entry is not None:
+                    self.regions.move_to_end(key)
+                    self.hits += 1
+                    return entry.segments[(in_idx, out_idx)]
+
+                # Only the first request for a region plans it, the others wait and look it up again
+                built = self.building.get(key)
+                if built is None:
+                    built = self.building[key] = Event()
+                    break
+            built.wait()
+
+        try:
+            entry = self.build_region(occupancy_map, region_graph, region_id, planner_factory)
+            with self.lock:
+                self.regions[key] = entry
+                self.regions.move_to_end(key)
+                self.region_rebuilds += 1
+                while len(self.regions) > self.max_size:
+                    self.regions.popitem(last=False)
+                    self.evictions += 1
+        finally:
+            with self.lock:
+                del self.building[key]
+            built.set()
+
+        return entry.segments[(in_idx, out_idx)]
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "regions": len(self.regions),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "region_rebuilds": self.region_rebuilds,
+                "evictions": self.evictions,
+            }
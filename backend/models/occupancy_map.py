@@ -0,0 +1,218 @@
+import hashlib
+import uuid
+
+import cv2
+import numpy as np
+
+from models.point import Point
+import src.settings as settings
+
+
+def compute_validity_mask(final_map: np.ndarray, size: int):
+    """
+    Inflates the obstacles of the map by eroding the free space with a window the size of the robot.
+    The window spans [-size, size) around each cell and anything outside the map counts as an obstacle.
+    """
+    free_space = np.where(final_map == 255, 255, 0).astype(np.uint8)
+    kernel = np.ones((size * 2, size * 2), dtype=np.uint8)
+    eroded = cv2.erode(free_space, kernel, anchor=(size, size), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+    return eroded == 255
+
+
+def compute_cost_field(final_map: np.ndarray, size: int):
+    """
+    Computes the box mean of the inverted map over the window [-size, size) around each cell from an integral image.
+    Anything outside the map counts as an obstacle.
+    """
+    height, width = final_map.shape
+    inverted = cv2.bitwise_not(final_map)
+    padded = cv2.copyMakeBorder(inverted, size, size, size, size, cv2.BORDER_CONSTANT, value=255)
+    integral = cv2.integral(padded, sdepth=cv2.CV_64F)
+
+    window = size * 2
+    box_sum = (
+        integral[window:, window:]
+        - integral[:-window, window:]
+        - integral[window:, :-window]
+        + integral[:-window, :-window]
+    )
+    return box_sum[:height, :width] / (window * window)
+
+
+def get_read_only_view(array: np.ndarray):
+    """
+    Returns a view of the array that can not be written to, while the array itself stays writable
+    """
+    view = array.view()
+    view.setflags(write=False)
+    return view
+
+
+class OccupancyMap:
+    def __init__(self, final_map: np.ndarray, version: int = 0):
+        self.final_map = final_map
+        self.version = version
+        self.width = self.final_map.shape[1]
+        self.height = self.final_map.shape[0]
+
+        # Obstacles are inflated by the robot radius plus the clearance kept away from obstacles
+        self.validity_window_size = int(settings.ROBOT_RADIUS_IN_PX + settings.PX_AWAY_FROM_OBSTACLE)
+
+        # Proximity cost is averaged over a window slightly larger than the validity window
+        self.cost_window_size = self.validity_window_size + settings.WINDOW_BUFFER_PX
+
+        # Derived layers, built lazily on first use and reused by every search on this map
+        self.validity_mask = None
+        self.cost_field = None
+        self.derived_layers = {}
+        self.content_hash = None
+
+        # Versions patched from one another share their lineage, each keeps the (version, boxes, xs, ys) of the
+        # latest patches: the boxes written and the cells whose layers changed
+        self.lineage = uuid.uuid4().hex
+        self.changes = []
+
+
+    def get_content_hash(self):
+        """
+        Returns a hash of the map pixels, identifying the map regardless of where it was loaded from
+        """
+        if self.content_hash is None:
+            digest = hashlib.sha1(str(self.final_map.shape).encode())
+            digest.update(np.ascontiguousarray(self.final_map).tobytes())
+            self.content_hash = digest.hexdigest()
+        return self.content_hash
+
+
+    def get_validity_mask(self):
+        """
+        Returns the configuration space of the map as a boolean grid, True where the robot fits
+        """
+        if self.validity_mask is None:
+            self.validity_mask = self.build_validity_mask()
+        return self.validity_mask
+
+
+    def build_validity_mask(self):
+        return compute_validity_mask(self.final_map, self.validity_window_size)
+
+
+    def get_cost_field(self):
+        """
+        Returns the obstacle proximity cost of every cell, the mean of the inverted map over the cost window
+        """
+        if self.cost_field is None:
+            self.cost_field = self.build_cost_field()
+        return self.cost_field
+
+
+    def build_cost_field(self):
+        return compute_cost_field(self.final_map, self.cost_window_size)
+
+
+    def patch_layers(self, previous: "OccupancyMap", boxes: list, validity_mask: np.ndarray, cost_field: np.ndarray):
+        """
+        Builds the layers into validity_mask and cost_field, writable arrays holding the layers of the previous version
+        of the map, which differs from this one only within the boxes (y_min, y_max, x_min, x_max). Only the cells whose
+        window reaches a box are computed again, from a crop of the map that holds their whole window, and the cells
+        whose validity or cost changed are added to the change log of the previous version. Boxes covering most of the
+        map overlap, so the whole map is computed again instead.
+        """
+        self.lineage = previous.lineage
+
+        size = max(self.validity_window_size, self.cost_window_size)
+        patched_area = sum((y_max - y_min + 4 * size) * (x_max - x_min + 4 * size) for y_min, y_max, x_min, x_max in boxes)
+        if patched_area > self.width * self.height:
+            boxes = [(0, self.height, 0, self.width)]
+
+        patched_boxes, changed_xs, changed_ys = [], [], []
+        for y_min, y_max, x_min, x_max in boxes:
+            # A change at p reaches the cells in (p - size, p + size]
+            top, bottom = max(y_min - size + 1, 0), min(y_max + size, self.height)
+            left, right = max(x_min - size + 1, 0), min(x_max + size, self.width)
+            crop_top, crop_left = max(top - size, 0), max(left - size, 0)
+            crop = self.final_map[crop_top:min(bottom + size, self.height), crop_left:min(right + size, self.width)]
+            window = (slice(top - crop_top, bottom - crop_top), slice(left - crop_left, right - crop_left))
+
+            box_validity_mask = compute_validity_mask(crop, self.validity_window_size)[window]
+            box_cost_field = compute_cost_field(crop, self.cost_window_size)[window]
+            ys, xs = np.nonzero(
+                (validity_mask[top:bottom, left:right] != box_validity_mask) | (cost_field[top:bottom, left:right] != box_cost_field)
+            )
+            validity_mask[top:bottom, left:right] = box_validity_mask
+            cost_field[top:bottom, left:right] = box_cost_field
+
+            patched_boxes.append((top, bottom, left, right))
+            changed_xs.append(xs + left)
+            changed_ys.append(ys + top)
+
+        self.validity_mask, self.cost_field = get_read_only_view(validity_mask), get_read_only_view(cost_field)
+
+        change = (self.version, patched_boxes, np.concatenate(changed_xs), np.concatenate(changed_ys))
+        self.changes = previous.changes[-(settings.MAP_CHANGE_LOG_SIZE - 1):] + [change]
+
+
+    def get_changes(self, version: int):
+        """
+        Returns the boxes patched and the (x, y) arrays of cells whose validity or proximity cost changed since an
+        older version of the same lineage, or None if the change log no longer reaches back to it
+        """
+        changes = [change for change in self.changes if change[0] > version]
+        if version != self.version and (len(changes) == 0 or changes[0][0] != version + 1):
+            return None
+
+        boxes = [box for change in changes for box in change[1]]
+        xs = np.concatenate([change[2] for change in changes] + [np.empty(0, dtype=np.int64)])
+        ys = np.concatenate([change[3] for change in changes] + [np.empty(0, dtype=np.int64)])
+        return boxes, xs, ys
+
+
+    def get_path_cost(self, point: Point):
+        """
+        Returns the obstacle proximity cost at the point
+        """
+        x = min(max(round(point.x), 0), self.width - 1)
+        y = min(max(round(point.y), 0), self.height - 1)
+        return float(self.get_cost_field()[y, x])
+
+
+    def get_path_costs(self, points: np.ndarray):
+        """
+        Returns the obstacle proximity costs at an (N, 2) array of x, y points, clamped to the map
+        """
+        points = np.rint(np.asarray(points, dtype=np.float64)).astype(np.int64).reshape(-1, 2)
+        x = np.clip(points[:, 0], 0, self.width - 1)
+        y = np.clip(points[:, 1], 0, self.height - 1)
+        return self.get_cost_field()[y, x]
+
+
+    def get_derived_layer(self, name: str, build):
+        """
+        Returns a planner specific layer of the map, building it with build(occupancy_map) on first use
+        """
+        if name not in self.derived_layers:
+            self.derived_layers[name] = build(self)
+        return self.derived_layers[name]
+
+
+    def is_point_valid(self, point: Point):
+        """
+        Returns True if the robot can be placed at the point
+        """
+        x, y = round(point.x), round(point.y)
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return bool(self.get_validity_mask()[y, x])
+
+
+    def are_points_valid(self, points: np.ndarray):
+        """
+        Returns a boolean array marking which of the (N, 2) array of x, y points the robot can be placed at
+        """
+        points = np.rint(np.asarray(points, dtype=np.float64)).astype(np.int64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        within_map = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+
+        valid = np.zeros(len(points), dtype=bool)
+        valid[within_map] = self.get_validity_mask()[y[within_map], x[within_map]]
+        return valid
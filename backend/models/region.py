@@ -8,35 +8,29 @@ class Region:
         self.id = id
         self.points = points
         self.connected_region_ids = connected_region_ids
-        self.entry_points = self.generate_entry_point_dict_array(entry_points)
+        self.entry_points = self.generate_entry_point_dict(entry_points)
         self.start_point = self.points[0]
         self.end_point = self.points[2]
 
 
-    def generate_entry_point_dict_array(self, entry_points: List[Point]):
+    def generate_entry_point_dict(self, entry_points: List[Point]):
         """
-        Generates a dictionary of entry points
+        Generates a dictionary of entry points keyed by the id of the neighbouring region
         """
-        entry_point_dict_array = []
+        entry_point_dict = {}
 
         for idx, entry_point in enumerate(entry_points):
-            entry_point_dict = {}
+            # Keep the first entry point listed for a neighbour
+            entry_point_dict.setdefault(self.connected_region_ids[idx], entry_point)
 
-            entry_point_dict["region_id"] = self.connected_region_ids[idx]
-            entry_point_dict["entry_point"] = entry_point
-
-            entry_point_dict_array.append(entry_point_dict)
-
-        return entry_point_dict_array
+        return entry_point_dict
 
 
     def get_entry_point(self, region_id: int):
         """
         Returns the entry point of a region
         """
-        for entry_point in self.entry_points:
-            if entry_point["region_id"] == region_id:
-                return entry_point["entry_point"]
+        return self.entry_points.get(region_id)
 
 
     def is_point_within_region(self, point: Point):
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from math import floor
+from typing import List
+
+import numpy as np
+
+from models.point import Point
+from models.region import Region
+
+
+def get_regions_signature(regions: List[Region]):
+    """
+    Returns a hashable description of the region set, equal for region sets with the same geometry and connections
+    """
+    return tuple(
+        (region.id, region.start_point.unpack(), region.end_point.unpack(), tuple(region.connected_region_ids),
+         tuple((region_id, entry_point.unpack()) for region_id, entry_point in region.entry_points.items()))
+        for region in regions
+    )
+
+
+class RegionIndex:
+    """
+    Uniform grid of buckets over the region rectangles. Each bucket lists, in region order, the regions overlapping it,
+    so a point is resolved by checking the few candidates of its bucket.
+    """
+    def __init__(self, regions: List[Region], bucket_size: int = 20):
+        self.regions = regions
+        self.bucket_size = bucket_size
+
+        # Region bounds as arrays, in the same order as the regions
+        self.x_min = np.array([region.start_point.x for region in regions], dtype=np.float64)
+        self.y_min = np.array([region.start_point.y for region in regions], dtype=np.float64)
+        self.x_max = np.array([region.end_point.x for region in regions], dtype=np.float64)
+        self.y_max = np.array([region.end_point.y for region in regions], dtype=np.float64)
+
+        self.columns = int(floor(self.x_max.max() / bucket_size)) + 1 if len(regions) > 0 else 1
+        self.rows = int(floor(self.y_max.max() / bucket_size)) + 1 if len(regions) > 0 else 1
+        self.buckets = self.build_buckets()
+
+
+    def build_buckets(self):
+        """
+        Returns a (rows, columns, depth) array of region indices per bucket, padded with -1
+        """
+        bucket_lists = [[[] for _ in range(self.columns)] for _ in range(self.rows)]
+
+        for idx in range(len(self.regions)):
+            start_column = max(int(floor(self.x_min[idx] / self.bucket_size)), 0)
+            start_row = max(int(floor(self.y_min[idx] / self.bucket_size)), 0)
+            end_column = int(floor(self.x_max[idx] / self.bucket_size))
+            end_row = int(floor(self.y_max[idx] / self.bucket_size))
+
+            for row in range(start_row, end_row + 1):
+                for column in range(start_column, end_column + 1):
+                    bucket_lists[row][column].append(idx)
+
+        depth = max([len(bucket) for row in bucket_lists for bucket in row] + [1])
+        buckets = np.full((self.rows, self.columns, depth), -1, dtype=np.int32)
+        for row in range(self.rows):
+            for column in range(self.columns):
+                bucket = bucket_lists[row][column]
+                buckets[row, column, :len(bucket)] = bucket
+
+        return buckets
+
+
+    def get_region_from_point(self, point: Point):
+        """
+        Returns the first region containing the point, or None if no region contains it
+        """
+        row, column = int(floor(point.y / self.bucket_size)), int(floor(point.x / self.bucket_size))
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            return None
+
+        for idx in self.buckets[row, column]:
+            if idx < 0:
+                break
+            if self.regions[idx].is_point_within_region(point):
+                return self.regions[idx]
+
+        return None
+
+
+    def get_region_indices(self, points: np.ndarray):
+        """
+        Returns the index into the regions of the first region containing each of the (N, 2) array of x, y points,
+        or -1 for points outside every region
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        result = np.full(len(points), -1, dtype=np.int32)
+
+        rows = np.floor(y / self.bucket_size).astype(np.int64)
+        columns = np.floor(x / self.bucket_size).astype(np.int64)
+        within_grid = (rows >= 0) & (rows < self.rows) & (columns >= 0) & (columns < self.columns)
+        candidates = np.full((len(points), self.buckets.shape[2]), -1, dtype=np.int32)
+        candidates[within_grid] = self.buckets[rows[within_grid], columns[within_grid]]
+
+        for depth in range(candidates.shape[1]):
+            idx = candidates[:, depth]
+            unresolved = (result < 0) & (idx >= 0)
+            if not unresolved.any():
+                break
+
+            safe_idx = np.where(unresolved, idx, 0)
+            contained = unresolved & (x >= self.x_min[safe_idx]) & (x <= self.x_max[safe_idx]) & \
+                (y >= self.y_min[safe_idx]) & (y <= self.y_max[safe_idx])
+            result[contained] = idx[contained]
+
+        return result
+
+
+# Layers derived from a region set, keyed by region set signature so each is built once per region set
+region_set_layers = OrderedDict()
+max_region_sets = 16
+
+
+def get_region_set_layer(regions: List[Region], name: str, build):
+    """
+    Returns a layer derived from the region set, building it with build(regions) the first time the region set is seen
+    """
+    signature = get_regions_signature(regions)
+
+    if signature in region_set_layers:
+        region_set_layers.move_to_end(signature)
+    else:
+        region_set_layers[signature] = {}
+        while len(region_set_layers) > max_region_sets:
+            region_set_layers.popitem(last=False)
+
+    layers = region_set_layers[signature]
+    if name not in layers:
+        layers[name] = build(regions)
+    return layers[name]
+
+
+def get_region_index(regions: List[Region]):
+    """
+    Returns the index for the region set, reusing the index built for an identical region set
+    """
+    return get_region_set_layer(regions, "region_index", RegionIndex)
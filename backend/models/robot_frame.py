@@ -0,0 +1,101 @@
+from typing import List
+
+import numpy as np
+
+from src.api_models import _Robot
+
+
+# Status codes of the robot frame, any other status is packed as 0
+ROBOT_STATUSES = [
+    "IDLE", "PROCESSING", "TRANSIT", "COLLISION", "MAPPING", "MAPPING_COMPLETE",
+    "FIND_LEADER", "NAVIGATION", "GOAL_REACHED", "PLAN_PATH", "GOAL_NOT_REACHED",
+]
+
+status_code_dictionary = {status: code + 1 for code, status in enumerate(ROBOT_STATUSES)}
+
+# Controller codes of the robot frame, the ControllerType values
+controller_code_dictionary = {"GO_TO_GOAL": 1, "AVOID_OBSTACLES": 2, "REVERSE": 3}
+
+
+class RobotFrame:
+    """
+    Struct of arrays holding the inputs of one control decision for every robot of a fleet, one row per robot.
+    Goals a robot does not have are NaN and the IR readings are padded to (robots, sensors) with a mask.
+    """
+    def __init__(self, ids: np.ndarray, status: np.ndarray, previous_controller: np.ndarray, poses: np.ndarray,
+                 leader_positions: np.ndarray, mapping_goals: np.ndarray, path_points: np.ndarray, pid_errors: np.ndarray,
+                 closest_distance: np.ndarray, ir_x: np.ndarray, ir_y: np.ndarray, ir_mask: np.ndarray):
+        self.count = len(ids)
+        self.ids = ids
+        self.status = status
+        self.previous_controller = previous_controller
+
+        self.x, self.y, self.theta = poses[:, 0], poses[:, 1], poses[:, 2]
+        self.leader_x, self.leader_y = leader_positions[:, 0], leader_positions[:, 1]
+        self.mapping_goal_x, self.mapping_goal_y = mapping_goals[:, 0], mapping_goals[:, 1]
+        self.path_point_x, self.path_point_y = path_points[:, 0], path_points[:, 1]
+        self.has_mapping_goal = ~np.isnan(self.mapping_goal_x)
+        self.has_path_point = ~np.isnan(self.path_point_x)
+        self.prev_eP, self.prev_eI = pid_errors[:, 0], pid_errors[:, 1]
+
+        # Closest front sensor distance, infinite without front sensors
+        self.closest_distance = closest_distance
+
+        self.ir_x = ir_x
+        self.ir_y = ir_y
+        self.ir_mask = ir_mask
+
+
+def pad_readings(count: int, rows: np.ndarray, readings: np.ndarray):
+    """
+    Spreads the (M, 2) readings of the robots in rows, grouped by robot in order, into padded (robots, sensors) arrays
+    """
+    columns = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    sensor_count = int(columns.max()) + 1 if len(rows) > 0 else 0
+
+    ir_x = np.zeros((count, sensor_count), dtype=np.float64)
+    ir_y = np.zeros((count, sensor_count), dtype=np.float64)
+    ir_mask = np.zeros((count, sensor_count), dtype=bool)
+    ir_x[rows, columns] = readings[:, 0]
+    ir_y[rows, columns] = readings[:, 1]
+    ir_mask[rows, columns] = True
+    return ir_x, ir_y, ir_mask
+
+
+def pack_robots(robots: List[_Robot]):
+    """
+    Packs the API models of the robots into a RobotFrame in one pass over the robots
+    """
+    count = len(robots)
+    ids, status, previous_controllers, poses, leader_positions = [], [], [], [], []
+    mapping_goals, path_points, pid_errors, closest_distances, ir_rows, ir_readings = [], [], [], [], [], []
+
+    for idx, robot in enumerate(robots):
+        ids.append(robot.id)
+        status.append(status_code_dictionary.get(robot.status, 0))
+        previous_controllers.append(controller_code_dictionary[robot.current_controller])
+        poses.append((robot.pose.vector.x, robot.pose.vector.y, robot.pose.theta))
+        leader_positions.append((robot.leader_position.x, robot.leader_position.y))
+        mapping_goals.append((robot.mapping_goals[0].x, robot.mapping_goals[0].y) if len(robot.mapping_goals) > 0 else (np.nan, np.nan))
+        path_points.append((robot.path_points[0].x, robot.path_points[0].y) if len(robot.path_points) > 0 else (np.nan, np.nan))
+        pid_errors.append((robot.pid_metadata.prev_eP, robot.pid_metadata.prev_eI))
+        closest_distances.append(min(robot.front_sensor_distances, default=np.inf))
+
+        for sensor in robot.ir_sensors:
+            ir_rows.append(idx)
+            ir_readings.append((sensor.reading.x, sensor.reading.y))
+
+    ir_x, ir_y, ir_mask = pad_readings(count, np.array(ir_rows, dtype=np.int64), np.array(ir_readings, dtype=np.float64).reshape(-1, 2))
+
+    return RobotFrame(
+        np.array(ids, dtype=np.int64),
+        np.array(status, dtype=np.uint8),
+        np.array(previous_controllers, dtype=np.int64),
+        np.array(poses, dtype=np.float64).reshape(count, 3),
+        np.array(leader_positions, dtype=np.float64).reshape(count, 2),
+        np.array(mapping_goals, dtype=np.float64).reshape(count, 2),
+        np.array(path_points, dtype=np.float64).reshape(count, 2),
+        np.array(pid_errors, dtype=np.float64).reshape(count, 2),
+        np.array(closest_distances, dtype=np.float64),
+        ir_x, ir_y, ir_mask,
+    )
@@ -0,0 +1,64 @@
+import contextlib
+import io
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.path_planning.arastar.arastar import ARAStar
+from algorithm.controllers.path_planning.astar.astar import AStar
+from models.occupancy_map import OccupancyMap
+from performance_metrics.benchmark_jps import sample_reachable_pairs
+
+
+def run_arastar(occupancy_map: OccupancyMap, pairs, time_budget_ms: float):
+    """
+    Returns the number of goals found, the mean suboptimality bound of the paths found and the total wall time
+    """
+    found, bounds, elapsed = 0, [], 0.0
+    for start, goal in pairs:
+        planner = ARAStar(occupancy_map, time_budget_ms)
+        started_at = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            path = planner.search(start, goal)
+        elapsed += time.perf_counter() - started_at
+        if not isinstance(path[0], str):
+            found += 1
+            bounds.append(planner.suboptimality_bound)
+    return found, np.mean(bounds) if len(bounds) > 0 else float("nan"), elapsed
+
+
+def benchmark_arastar():
+    """
+    Compares the goals found by A* with its iteration cap against ARA* with increasing time budgets on the project maps
+    """
+    prefixes = ["M1-S-", "M2-M-", "M3-L-"]
+    pair_count = 20
+    time_budgets_ms = [20, 50, 200, 1000]
+
+    for prefix in prefixes:
+        occupancy_map = OccupancyMap(cv2.imread(f'./performance_metrics/mapping/{prefix}opening.png', cv2.IMREAD_GRAYSCALE))
+        pairs = sample_reachable_pairs(occupancy_map, pair_count)
+
+        # Build the shared map layers up front so they are not charged to the first search
+        ARAStar(occupancy_map)
+
+        print(f'Map {prefix}')
+        found, elapsed = 0, 0.0
+        for start, goal in pairs:
+            planner = AStar(occupancy_map)
+            started_at = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                path = planner.search(start, goal)
+            elapsed += time.perf_counter() - started_at
+            found += 0 if isinstance(path[0], str) else 1
+        print(f'A* ({AStar(occupancy_map).max_iterations} iterations): {found}/{pair_count} goals found, {elapsed * 1000:.1f} ms')
+
+        for time_budget_ms in time_budgets_ms:
+            found, mean_bound, elapsed = run_arastar(occupancy_map, pairs, time_budget_ms)
+            print(f'ARA* ({time_budget_ms} ms): {found}/{pair_count} goals found, mean bound {mean_bound:.3f}, {elapsed * 1000:.1f} ms')
+        print("")
+
+
+if __name__ == "__main__":
+    benchmark_arastar()
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+
+from algorithm.arbiter import Arbiter
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
+from src.api_models import _Robot
+
+
+STATUSES = ["MAPPING", "NAVIGATION", "FIND_LEADER", "COLLISION", "IDLE"]
+CONTROLLERS = ["GO_TO_GOAL", "AVOID_OBSTACLES", "REVERSE"]
+
+
+def generate_robots(count: int, seed: int = 0):
+    """
+    Generates robots with random poses, goals, sensor readings, statuses and PID state
+    """
+    rng = np.random.default_rng(seed)
+
+    def random_point():
+        return {"x": float(rng.uniform(0, 1400)), "y": float(rng.uniform(0, 900))}
+
+    robots = []
+    for idx in range(count):
+        robots.append(_Robot(**{
+            "id": idx,
+            "pose": {"vector": random_point(), "theta": float(rng.uniform(-np.pi, np.pi))},
+            "sensor_readings": [],
+            "mapping_goals": [random_point() for _ in range(rng.integers(0, 3))],
+            "status": STATUSES[rng.integers(0, len(STATUSES))],
+            "front_sensor_distances": [float(distance) for distance in rng.uniform(0, 40, rng.integers(0, 4))],
+            "ir_sensors": [{"reading": random_point()} for _ in range(rng.integers(0, 9))],
+            "leader_position": random_point(),
+            "path_points": [random_point() for _ in range(rng.integers(0, 3))],
+            "pid_metadata": {"prev_eP": float(rng.normal()), "prev_eI": float(rng.normal())},
+            "robots_within_signal_range": [],
+            "current_controller": CONTROLLERS[rng.integers(0, len(CONTROLLERS))],
+        }))
+    return robots
+
+
+def is_decision_close(decision: dict, batch_decision: dict, tolerance: float = 1e-9):
+    """
+    Returns True if two decisions select the same controller and their velocities and PID errors match within
+    the relative tolerance
+    """
+    if decision['robot_id'] != batch_decision['robot_id'] or decision['type'] != batch_decision['type']:
+        return False
+
+    payload, batch_payload = decision['payload'], batch_decision['payload']
+    values = [*payload['steering_input'], payload['pid_metadata']['prev_eP'], payload['pid_metadata']['prev_eI']]
+    batch_values = [*batch_payload['steering_input'], batch_payload['pid_metadata']['prev_eP'], batch_payload['pid_metadata']['prev_eI']]
+    return bool(np.allclose(values, batch_values, rtol=tolerance, atol=tolerance))
+
+
+def benchmark_arbiter():
+    """
+    Checks the batch arbiter makes the decisions of one Arbiter per robot and compares their wall time
+    """
+    for count in [10, 100, 1000, 10000]:
+        robots = generate_robots(count)
+
+        started_at = time.perf_counter()
+        decisions = [Arbiter(robot).execute() for robot in robots]
+        arbiter_time = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        frame = pack_robots(robots)
+        pack_time = time.perf_counter() - started_at
+        batch_decisions = BatchArbiter(frame).execute()
+        batch_time = time.perf_counter() - started_at
+
+        mismatches = sum(1 for decision, batch_decision in zip(decisions, batch_decisions) if not is_decision_close(decision, batch_decision))
+        print(f'{count} robots: {mismatches} mismatches, Arbiter {arbiter_time * 1000:.1f} ms, BatchArbiter {batch_time * 1000:.1f} ms of which {pack_time * 1000:.1f} ms packing the API models')
+
+
+if __name__ == "__main__":
+    benchmark_arbiter()
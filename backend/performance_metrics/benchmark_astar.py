@@ -0,0 +1,143 @@
+import contextlib
+import io
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+# Start and goal pairs on the shipped map, each pair lies within a single region
+SEARCH_PAIRS = [
+    ((700, 520), (760, 540)),
+    ((700, 300), (760, 150)),
+    ((1100, 650), (700, 520)),
+]
+
+
+class LegacyAStar(AStar):
+    """
+    The list based search and per cell window checks that AStar replaced, kept here as the benchmark baseline
+    """
+    def get_window(self, point: Point, size: int):
+        x, y = point.unpack()
+        x_min, y_min, x_max, y_max = x - size, y - size, x + size, y + size
+        window = np.zeros((size * 2, size * 2), dtype=np.uint8)
+
+        start_x, end_x, start_y, end_y = 0, size * 2, 0, size * 2
+        if x_min < 0:
+            start_x, x_min = abs(x_min), 0
+        if y_min < 0:
+            start_y, y_min = abs(y_min), 0
+        if x_max > self.width:
+            end_x, x_max = abs(self.width - x_max), self.width
+        if y_max > self.height:
+            end_y, y_max = abs(self.height - y_max), self.height
+
+        window[int(start_y):int(end_y), int(start_x):int(end_x)] = self.final_map[int(y_min):int(y_max), int(x_min):int(x_max)]
+        return window
+
+
+    def is_point_valid(self, point: Point):
+        size = self.occupancy_map.validity_window_size
+        window = self.get_window(point, size)
+        inverse_window = cv2.bitwise_not(window)
+        result = cv2.bitwise_and(inverse_window, np.full((size * 2, size * 2), 255, dtype=np.uint8))
+        return not np.sum(result) >= 255
+
+
+    def calculate_path_cost(self, point: Point):
+        inverse_window = cv2.bitwise_not(self.get_window(point, self.occupancy_map.cost_window_size))
+        row, col = inverse_window.shape
+        return np.sum(inverse_window) / (row * col)
+
+
+    def search(self, start_point: Point, goal_point: Point):
+        # Each node is [point, f, parent point]
+        frontier = [[start_point, self.calculate_euclidean_distance(start_point, goal_point), None]]
+        explored = []
+        goal_node = None
+        iterations = 0
+
+        while iterations < self.max_iterations:
+            if frontier[0][0].equal(goal_point):
+                goal_node = frontier[0]
+                break
+
+            node = frontier.pop(0)
+            self.number_of_expansions += 1
+            explored.append(node)
+
+            for neighbour in [node[0].add(action) for action in self.actions]:
+                if not (neighbour.x in range(0, self.width) and neighbour.y in range(0, self.height) and self.is_point_valid(neighbour)):
+                    continue
+                if not np.any([neighbour.equal(e[0]) for e in explored]) and not np.any([neighbour.equal(f[0]) for f in frontier]):
+                    frontier.append([neighbour, self.calculate_path_cost(neighbour) + self.calculate_euclidean_distance(neighbour, goal_point), node[0]])
+
+            frontier.sort(key=lambda x: x[1])
+            iterations = iterations + 1
+
+        if goal_node is None:
+            return ["Max Iterations Reached"]
+
+        path = [goal_node[0]]
+        while goal_node[2] is not None:
+            path.insert(0, goal_node[2])
+            for explored_node in explored:
+                if explored_node[0].equal(goal_node[2]):
+                    goal_node = explored_node
+                    break
+
+        return path
+
+
+def describe_path(path: list):
+    return "not found" if isinstance(path[0], str) else f'{len(path)} points'
+
+
+def time_search(planner_class, occupancy_map, start, goal):
+    planner = planner_class(occupancy_map)
+    started_at = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = planner.search(Point(*start), Point(*goal))
+    elapsed = time.perf_counter() - started_at
+    return path, planner.number_of_expansions, elapsed
+
+
+def benchmark_astar():
+    """
+    Compares AStar against the legacy list based search and per cell window checks on the shipped map
+    """
+    occupancy_map = OccupancyMap(cv2.imread("./algorithm/controllers/mapping/maps/final_map_opened.png", cv2.IMREAD_GRAYSCALE))
+
+    # The configuration space and cost field are built once per map and shared by every search on it
+    started_at = time.perf_counter()
+    occupancy_map.get_validity_mask()
+    occupancy_map.get_cost_field()
+    print(f'Map layers built in {(time.perf_counter() - started_at) * 1000:.1f} ms\n')
+
+    is_failed = False
+    for start, goal in SEARCH_PAIRS:
+        legacy_path, legacy_expansions, legacy_time = time_search(LegacyAStar, occupancy_map, start, goal)
+        path, expansions, elapsed = time_search(AStar, occupancy_map, start, goal)
+
+        print(f'{start} -> {goal}')
+        print(f'Legacy: {describe_path(legacy_path)}, {legacy_expansions} expansions, {legacy_time * 1000:.1f} ms')
+        print(f'AStar:  {describe_path(path)}, {expansions} expansions, {elapsed * 1000:.1f} ms')
+
+        # A search that gives up early is not faster, only compare searches that both found the goal
+        if isinstance(legacy_path[0], str) or isinstance(path[0], str):
+            print('Speedup: not comparable, a search did not find the goal\n')
+            is_failed = True
+        else:
+            print(f'Speedup: {legacy_time / elapsed:.1f}x\n')
+
+    if is_failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    benchmark_astar()
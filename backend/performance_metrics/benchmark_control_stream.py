@@ -0,0 +1,39 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from performance_metrics.benchmark_arbiter import generate_robots
+from src.main import app, stream_metrics
+
+
+def benchmark_control_stream():
+    """
+    Compares frames per second of posting every tick to /algorithm/ against streaming the ticks over /control_stream/
+    """
+    client = TestClient(app)
+    frame_count = 300
+
+    for count in [1, 10, 100]:
+        robots = [robot.model_dump(exclude_none=True) for robot in generate_robots(count)]
+
+        started_at = time.perf_counter()
+        for _ in range(frame_count):
+            client.post("/algorithm/", json={"robots": robots, "environment": {"width": 1400, "height": 900}})
+        http_fps = frame_count / (time.perf_counter() - started_at)
+
+        # Frames are pipelined, every frame is sent before the replies are read
+        with client.websocket_connect("/control_stream/") as websocket:
+            started_at = time.perf_counter()
+            for frame in range(frame_count):
+                websocket.send_json({"frame": frame, "robots": robots})
+            replies = [websocket.receive_json() for _ in range(frame_count)]
+            stream_fps = frame_count / (time.perf_counter() - started_at)
+
+        in_order = [reply["frame"] for reply in replies] == list(range(frame_count))
+        stats = stream_metrics.get_stats()
+        print(f'{count} robots: HTTP {http_fps:.0f} fps, stream {stream_fps:.0f} fps, replies in order {in_order}, '
+              f'server p50 {stats["p50_latency_ms"]:.2f} ms, p99 {stats["p99_latency_ms"]:.2f} ms')
+
+
+if __name__ == "__main__":
+    benchmark_control_stream()
@@ -0,0 +1,80 @@
+import time
+
+import cv2
+
+from algorithm.controllers.path_planning.dstar_lite.dstar_lite import DStarLite
+from models.occupancy_map import OccupancyMap
+from performance_metrics.benchmark_jps import sample_reachable_pairs
+
+
+def run_search(planner: DStarLite):
+    """
+    Returns the path, the expansions and the wall time of bringing the planner up to date
+    """
+    expansions_before = planner.number_of_expansions
+    started_at = time.perf_counter()
+    found = planner.compute_shortest_path()
+    path = planner.extract_path() if found else ["Max Iterations Reached"]
+    return path, planner.number_of_expansions - expansions_before, time.perf_counter() - started_at
+
+
+def benchmark_dstar_lite():
+    """
+    Compares repairing a D* Lite search against planning from scratch when the robot moves and an obstacle
+    appears just ahead of it on its path
+    """
+    prefixes = ["M1-S-", "M2-M-", "M3-L-"]
+    pair_count = 10
+    steps_taken = 10
+    obstacle_distance = 40
+
+    for prefix in prefixes:
+        final_map = cv2.imread(f'./performance_metrics/mapping/{prefix}opening.png', cv2.IMREAD_GRAYSCALE)
+        occupancy_map = OccupancyMap(final_map)
+        pairs = sample_reachable_pairs(occupancy_map, pair_count)
+
+        replans, changed_cells = 0, 0
+        repair_expansions, repair_time = 0, 0.0
+        fresh_expansions, fresh_time = 0, 0.0
+
+        for start, goal in pairs:
+            planner = DStarLite(occupancy_map, goal)
+            planner.update_start(start)
+            path, _, _ = run_search(planner)
+            if isinstance(path[0], str) or len(path) <= obstacle_distance + steps_taken:
+                continue
+
+            # The robot moves along its path and senses a new obstacle ahead of it
+            obstacle = path[steps_taken + obstacle_distance]
+            updated_map = final_map.copy()
+            cv2.circle(updated_map, obstacle.unpack(), 5, 0, -1)
+            updated_occupancy_map = OccupancyMap(updated_map, 1)
+            position = path[steps_taken]
+
+            started_at = time.perf_counter()
+            changed_cells += planner.update_map(updated_occupancy_map)
+            planner.update_start(position)
+            repaired_path, expansions, _ = run_search(planner)
+            repair_expansions += expansions
+            repair_time += time.perf_counter() - started_at
+
+            fresh_planner = DStarLite(updated_occupancy_map, goal)
+            fresh_planner.update_start(position)
+            fresh_path, expansions, elapsed = run_search(fresh_planner)
+            fresh_expansions += expansions
+            fresh_time += elapsed
+
+            # Both searches are optimal, so they must agree on the cost whenever neither ran out of iterations
+            found_both = not isinstance(repaired_path[0], str) and not isinstance(fresh_path[0], str)
+            if found_both and abs(planner.g[planner.start] - fresh_planner.g[fresh_planner.start]) > 1e-6:
+                print(f'Repaired and fresh path costs differ from {position.unpack()} to {goal.unpack()}')
+            replans += 1
+
+        print(f'Map {prefix}: {replans} replans, {changed_cells} changed cells')
+        print(f'Repair: {repair_expansions} expansions, {repair_time * 1000:.1f} ms')
+        print(f'Fresh: {fresh_expansions} expansions, {fresh_time * 1000:.1f} ms')
+        print("")
+
+
+if __name__ == "__main__":
+    benchmark_dstar_lite()
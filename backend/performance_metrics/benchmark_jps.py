@@ -0,0 +1,69 @@
+import contextlib
+import io
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.jps.jps import JumpPointSearch
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+def sample_reachable_pairs(occupancy_map: OccupancyMap, count: int, seed: int = 0):
+    """
+    Samples start and goal pairs that lie in the same connected part of the configuration space
+    """
+    validity_mask = occupancy_map.get_validity_mask()
+    _, labels = cv2.connectedComponents(validity_mask.astype(np.uint8), connectivity=8)
+    ys, xs = np.nonzero(validity_mask)
+    rng = np.random.default_rng(seed)
+
+    pairs = []
+    while len(pairs) < count:
+        i, j = rng.integers(0, len(xs), 2)
+        if labels[ys[i], xs[i]] == labels[ys[j], xs[j]]:
+            pairs.append((Point(int(xs[i]), int(ys[i])), Point(int(xs[j]), int(ys[j]))))
+    return pairs
+
+
+def run_planner(planner_class, occupancy_map: OccupancyMap, pairs):
+    """
+    Returns the number of goals found, the total expansions and the total wall time for the pairs
+    """
+    found, expansions, elapsed = 0, 0, 0.0
+    for start, goal in pairs:
+        planner = planner_class(occupancy_map)
+        started_at = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            path = planner.search(start, goal)
+        elapsed += time.perf_counter() - started_at
+        expansions += planner.number_of_expansions
+        found += 0 if isinstance(path[0], str) else 1
+    return found, expansions, elapsed
+
+
+def benchmark_jps():
+    """
+    Compares node expansions and wall time of Jump Point Search against A* on the three project maps
+    """
+    prefixes = ["M1-S-", "M2-M-", "M3-L-"]
+    pair_count = 50
+
+    for prefix in prefixes:
+        occupancy_map = OccupancyMap(cv2.imread(f'./performance_metrics/mapping/{prefix}opening.png', cv2.IMREAD_GRAYSCALE))
+        pairs = sample_reachable_pairs(occupancy_map, pair_count)
+
+        # Build the shared map layers up front so they are not charged to the first search
+        JumpPointSearch(occupancy_map)
+
+        print(f'Map {prefix}')
+        for name, planner_class in [("A*", AStar), ("JPS", JumpPointSearch)]:
+            found, expansions, elapsed = run_planner(planner_class, occupancy_map, pairs)
+            print(f'{name}: {found}/{pair_count} goals found, {expansions} expansions, {elapsed * 1000:.1f} ms')
+        print("")
+
+
+if __name__ == "__main__":
+    benchmark_jps()
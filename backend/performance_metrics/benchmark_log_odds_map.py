@@ -0,0 +1,96 @@
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.mapping.log_odds_map import LogOddsMap
+from algorithm.controllers.mapping.map_store import MapStore
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from performance_metrics.benchmark_mapping import generate_regions
+import src.settings as settings
+
+
+# Range of the IR sensors in px and their angles on the robot
+SENSOR_RANGE_PX = 25 * settings.PIXEL_TO_CM_RATIO
+SENSOR_ANGLES = np.radians([0, 45, 90, 135, 180, 225, 270, 315])
+
+
+def generate_frames(ground_truth: np.ndarray, frame_count: int, robot_count: int, phantom_rate: float = 0.02, seed: int = 0):
+    """
+    Generates frames of IR readings of robots at random free poses of the ground truth map. Readings end at the first
+    obstacle of their ray with some noise, or at the sensor range when they hit nothing. A share of the readings are
+    phantom hits at a random distance along the ray.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = ground_truth.shape
+    ys, xs = np.nonzero(ground_truth == 255)
+    distances = np.arange(1, int(SENSOR_RANGE_PX) + 1)
+
+    frames = []
+    for _ in range(frame_count):
+        robots = rng.integers(0, len(xs), robot_count)
+        angles = (rng.uniform(0, 2 * np.pi, robot_count)[:, None] + SENSOR_ANGLES[None, :]).ravel()
+        origins = np.repeat(np.stack([xs[robots], ys[robots]], axis=1).astype(np.float64), len(SENSOR_ANGLES), axis=0)
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+        # Cast every ray at once, the first obstacle cell along it is the hit
+        samples = np.rint(origins[:, None, :] + directions[:, None, :] * distances[None, :, None]).astype(np.int64)
+        sample_x, sample_y = np.clip(samples[..., 0], 0, width - 1), np.clip(samples[..., 1], 0, height - 1)
+        is_obstacle = ground_truth[sample_y, sample_x] == 0
+        is_hit = is_obstacle.any(axis=1)
+        ranges = np.where(is_hit, distances[is_obstacle.argmax(axis=1)], SENSOR_RANGE_PX)
+
+        is_phantom = rng.random(len(ranges)) < phantom_rate
+        ranges = np.where(is_phantom, rng.uniform(1, SENSOR_RANGE_PX, len(ranges)), ranges)
+        is_hit = is_hit | is_phantom
+        ends = origins + directions * ranges[:, None] + rng.normal(0, 1.0, origins.shape) * is_hit[:, None]
+        frames.append((origins, ends, is_hit))
+    return frames
+
+
+def benchmark_frames(ground_truth: np.ndarray, frame_count: int, robot_count: int):
+    """
+    Compares the readings per second of the log odds map against the rasterizer on the same frames, and the
+    obstacles each leaves in free space of the ground truth once every frame is mapped
+    """
+    height, width = ground_truth.shape
+    region_points = generate_regions(width, height, 1, 1)
+    frames = generate_frames(ground_truth, frame_count, robot_count)
+    reading_count = sum(len(origins) for origins, _, _ in frames)
+
+    # The rasterizer only uses the hits, all of them at once as the map generation does
+    hits = np.concatenate([ends[is_hit] for _, ends, is_hit in frames])
+    mapping = Mapping(width, height, 1, region_points, [SensorReadingsPerRegion(0, hits)])
+    started_at = time.perf_counter()
+    final_map = mapping.rasterize_readings()
+    rasterizer_time = time.perf_counter() - started_at
+    final_map_opened = mapping.apply_opening(final_map, 3, 3)
+
+    log_odds_map = LogOddsMap(MapStore(tempfile.mkdtemp() + "/"), settings.MAP_UPDATE_TILE_PX)
+    log_odds_map.reset(width - 1, height - 1)
+    started_at = time.perf_counter()
+    for origins, ends, is_hit in frames:
+        log_odds_map.integrate(origins, ends, is_hit)
+    log_odds_time = time.perf_counter() - started_at
+    log_odds_final_map = np.where(log_odds_map.log_odds > settings.LOG_ODDS_OCCUPIED_THRESHOLD, 0, 255).astype(np.uint8)
+
+    is_free = ground_truth == 255
+    print(f'{reading_count} readings in {frame_count} frames of {robot_count} robots, {log_odds_map.traversed_cells} cells traversed')
+    print(f'Rasterizer: {reading_count / rasterizer_time / 1e6:.2f}M readings/s, '
+          f'{np.count_nonzero(final_map[:height, :width][is_free] == 0)} obstacle pixels in free space, '
+          f'{np.count_nonzero(final_map_opened[:height, :width][is_free] == 0)} after opening')
+    print(f'Log odds map: {reading_count / log_odds_time / 1e6:.2f}M readings/s, '
+          f'{np.count_nonzero(log_odds_final_map[:height, :width][is_free] == 0)} obstacle pixels in free space')
+
+
+
+def benchmark_log_odds_map():
+    ground_truth = cv2.imread("./performance_metrics/mapping/M3-L-original.png", cv2.IMREAD_GRAYSCALE)
+    for frame_count, robot_count in [(500, 32), (100, 512)]:
+        benchmark_frames(ground_truth, frame_count, robot_count)
+        print("")
+
+
+if __name__ == "__main__":
+    benchmark_log_odds_map()
@@ -0,0 +1,88 @@
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.mapping.incremental_map import IncrementalMap
+from algorithm.controllers.mapping.map_store import MapStore
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from models.occupancy_map import OccupancyMap
+from performance_metrics.benchmark_mapping import generate_regions
+import src.settings as settings
+
+
+def generate_ticks(ground_truth: np.ndarray, region_points: list, tick_count: int, robot_count: int, readings_per_robot: int, seed: int = 0):
+    """
+    Generates the new readings of every tick, each robot moves along the map and reads the obstacles close to it
+    """
+    rng = np.random.default_rng(seed)
+    ys, xs = np.nonzero(ground_truth == 0)
+    obstacles = np.stack([xs, ys], axis=1).astype(np.float64)
+    positions = obstacles[rng.integers(0, len(obstacles), robot_count)]
+
+    ticks = []
+    for _ in range(tick_count):
+        positions = positions + rng.normal(0, 3, positions.shape)
+        sensor_readings = [[] for _ in region_points]
+        for position in positions:
+            nearby = obstacles[np.abs(obstacles - position).max(axis=1) < 40]
+            if len(nearby) == 0:
+                continue
+            readings = nearby[rng.integers(0, len(nearby), readings_per_robot)] + rng.normal(0, 1.5, (readings_per_robot, 2))
+            region_number = rng.integers(0, len(region_points))
+            sensor_readings[region_number].append(readings)
+        ticks.append([SensorReadingsPerRegion(idx, np.concatenate(readings) if len(readings) > 0 else np.empty((0, 2))) for idx, readings in enumerate(sensor_readings)])
+    return ticks
+
+
+def benchmark_map_delta(tick_count: int = 200, robot_count: int = 8, readings_per_robot: int = 24):
+    """
+    Compares generating the map again from every reading so far on every tick against adding the new readings of
+    the tick to the incremental map, checking both give the same map and layers
+    """
+    ground_truth = cv2.imread("./performance_metrics/mapping/M3-L-original.png", cv2.IMREAD_GRAYSCALE)
+    height, width = ground_truth.shape
+    region_points = generate_regions(width, height, 4, 2)
+    ticks = generate_ticks(ground_truth, region_points, tick_count, robot_count, readings_per_robot)
+
+    incremental_map = IncrementalMap(MapStore(tempfile.mkdtemp() + "/"), settings.MAP_UPDATE_TILE_PX)
+    empty_map = np.full((height + 1, width + 1), 255, dtype=np.uint8)
+    incremental_map.reset(empty_map, empty_map.copy())
+
+    history = [[] for _ in region_points]
+    full_times, delta_times = [], []
+    for idx, tick in enumerate(ticks):
+        for readings in tick:
+            history[readings.region_number].append(readings.sensor_readings)
+
+        mapping = Mapping(width, height, len(region_points), region_points, tick)
+        started_at = time.perf_counter()
+        snapshot, _ = incremental_map.apply_delta(mapping)
+        delta_times.append(time.perf_counter() - started_at)
+
+        mapping = Mapping(width, height, len(region_points), region_points, [SensorReadingsPerRegion(region_number, np.concatenate(readings)) for region_number, readings in enumerate(history)])
+        started_at = time.perf_counter()
+        _, final_map_opened = mapping.build_map()
+        expected = OccupancyMap(final_map_opened)
+        expected.get_validity_mask()
+        expected.get_cost_field()
+        full_times.append(time.perf_counter() - started_at)
+
+        if idx % 50 == 0 or idx == len(ticks) - 1:
+            is_identical = (
+                np.array_equal(snapshot.final_map, expected.final_map)
+                and np.array_equal(snapshot.get_validity_mask(), expected.get_validity_mask())
+                and np.array_equal(snapshot.get_cost_field(), expected.get_cost_field())
+            )
+            readings_so_far = sum(len(readings) for region_readings in history for readings in region_readings)
+            print(f'Tick {idx}: {readings_so_far} readings so far, identical map and layers: {is_identical}')
+
+    print(f'Full generation: mean {np.mean(full_times) * 1000:.2f} ms, p99 {np.percentile(full_times, 99) * 1000:.2f} ms')
+    print(f'Delta ingestion: mean {np.mean(delta_times) * 1000:.2f} ms, p99 {np.percentile(delta_times, 99) * 1000:.2f} ms')
+    print(incremental_map.get_stats())
+    print(incremental_map.store.get_stats())
+
+
+if __name__ == "__main__":
+    benchmark_map_delta()
@@ -0,0 +1,83 @@
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from models.point import Point
+
+
+def generate_regions(width: int, height: int, columns: int, rows: int):
+    """
+    Splits the map into a grid of regions, every region given by its four corners starting at the top left one
+    """
+    region_points = []
+    for row in range(rows):
+        for column in range(columns):
+            x_min, x_max = column * width // columns, (column + 1) * width // columns
+            y_min, y_max = row * height // rows, (row + 1) * height // rows
+            region_points.append([Point(x_min, y_min), Point(x_max, y_min), Point(x_max, y_max), Point(x_min, y_max)])
+    return region_points
+
+
+def generate_sensor_readings(ground_truth: np.ndarray, region_points: list, count: int, seed: int = 0):
+    """
+    Samples count noisy readings of the obstacles of the ground truth map, assigned to the region they were taken in.
+    Readings near region borders may fall out of their region, as they do in the simulation.
+    """
+    rng = np.random.default_rng(seed)
+    ys, xs = np.nonzero(ground_truth == 0)
+    samples = rng.integers(0, len(xs), count)
+    readings = np.stack([xs[samples], ys[samples]], axis=1) + rng.normal(0, 1.5, (count, 2))
+
+    region_numbers = rng.integers(0, len(region_points), count)
+    return [SensorReadingsPerRegion(idx, readings[region_numbers == idx]) for idx in range(len(region_points))]
+
+
+def build_map_per_region(mapping: Mapping):
+    """
+    Rasterizes the readings the way it was done before, one full map and one pass over every reading per region
+    """
+    final_map = np.full((mapping.height + 1, mapping.width + 1), 255, dtype=np.uint8)
+    for region_number in range(len(mapping.region_points)):
+        region_map = np.full((mapping.height + 1, mapping.width + 1), 255, dtype=np.uint8)
+        x_min, y_min, x_max, y_max = mapping.get_region_limits(region_number)
+        sensor_readings = [[(round(x), round(y)) for x, y in readings.sensor_readings.tolist()] for readings in mapping.sensor_readings]
+        for x, y in sensor_readings[region_number]:
+            if (x_min <= x <= x_max and y_min <= y <= y_max):
+                region_map[y, x] = 0
+        final_map = cv2.bitwise_and(final_map, region_map)
+    return final_map
+
+
+def benchmark_mapping():
+    """
+    Checks the vectorized rasterizer matches the per region one pixel for pixel, then scales the readings to millions
+    """
+    ground_truth = cv2.imread("./performance_metrics/mapping/M3-L-original.png", cv2.IMREAD_GRAYSCALE)
+    height, width = ground_truth.shape
+    region_points = generate_regions(width, height, 4, 2)
+
+    for count in [1000, 10000, 100000]:
+        mapping = Mapping(width, height, len(region_points), region_points, generate_sensor_readings(ground_truth, region_points, count))
+        started_at = time.perf_counter()
+        expected = build_map_per_region(mapping)
+        per_region_time = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        final_map = mapping.rasterize_readings()
+        vectorized_time = time.perf_counter() - started_at
+
+        mismatches = np.count_nonzero(final_map != expected)
+        print(f'{count} readings: per region {per_region_time * 1000:.1f} ms, vectorized {vectorized_time * 1000:.1f} ms, {mismatches} mismatched pixels')
+
+    for count in [1000000, 4000000]:
+        mapping = Mapping(width, height, len(region_points), region_points, generate_sensor_readings(ground_truth, region_points, count))
+        started_at = time.perf_counter()
+        mapping.rasterize_readings()
+        vectorized_time = time.perf_counter() - started_at
+        print(f'{count} readings: vectorized {vectorized_time * 1000:.1f} ms, {count / vectorized_time / 1e6:.1f}M readings/s')
+
+
+if __name__ == "__main__":
+    benchmark_mapping()
@@ -0,0 +1,99 @@
+import time
+from threading import Event, Thread
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from algorithm.controllers.mapping.map_store import map_store
+from performance_metrics.benchmark_arbiter import generate_robots
+import src.main as main
+from src.planning_pool import PlanningPool
+import src.settings as settings
+
+
+def generate_plan_requests(count: int, seed: int = 0):
+    """
+    Generates plan requests between random valid points of the current map over a single region
+    """
+    rng = np.random.default_rng(seed)
+    occupancy_map = map_store.get_snapshot()
+    ys, xs = np.nonzero(occupancy_map.get_validity_mask())
+    region = {
+        "id": 0,
+        "points": [{"x": 0, "y": 0}, {"x": occupancy_map.width, "y": 0}, {"x": occupancy_map.width, "y": occupancy_map.height}, {"x": 0, "y": occupancy_map.height}],
+        "entry_points": [],
+        "connected_region_ids": [],
+    }
+
+    requests = []
+    for robot in generate_robots(count, seed):
+        start, goal = rng.integers(0, len(xs), 2)
+        robot = robot.model_dump(exclude_none=True)
+        robot["pose"]["vector"] = {"x": float(xs[start]), "y": float(ys[start])}
+        robot["current_goal"] = {"x": float(xs[goal]), "y": float(ys[goal])}
+        requests.append({"robot": robot, "mapping": {"width": occupancy_map.width, "height": occupancy_map.height, "number_of_regions": 1, "regions": [region], "sensor_readings_per_region": []}})
+    return requests
+
+
+def measure_control_latency(client: TestClient, robot: dict, duration: float):
+    """
+    Posts control ticks back to back for the duration, returns the p50, p99 and max latency in ms
+    """
+    latencies = []
+    finish_at = time.perf_counter() + duration
+    while time.perf_counter() < finish_at:
+        started_at = time.perf_counter()
+        client.post("/single_robot/", json=robot)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+    latencies = np.array(latencies)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99), latencies.max()
+
+
+def run_planning_load(client: TestClient, requests: list, stop: Event, planned: list):
+    idx = 0
+    while not stop.is_set():
+        client.post("/plan_path/", json=requests[idx % len(requests)])
+        planned.append(idx)
+        idx += 1
+
+
+def benchmark_planning_load(duration: float = 10.0, planning_clients: int = 4):
+    """
+    Compares /single_robot/ control latency while idle, and while planning_clients keep /plan_path/ busy with
+    planning on the thread pool of the server against planning in worker processes
+    """
+    robot = generate_robots(1)[0].model_dump(exclude_none=True)
+    requests = generate_plan_requests(50)
+
+    with TestClient(main.app) as client:
+        # Every plan request is a miss, the planners do the work on every request
+        client.put("/path_cache/?max_size=0")
+
+        p50, p99, max_latency = measure_control_latency(client, robot, duration)
+        print(f'Idle: control p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {max_latency:.2f} ms')
+
+        for workers in [0, settings.PLANNING_PROCESS_WORKERS]:
+            main.planning_pool.shutdown()
+            main.planning_pool = PlanningPool(workers, settings.SHARED_MAP_COUNT)
+
+            # Start the workers and share the map before measuring
+            client.post("/plan_path/", json=requests[0])
+
+            stop, planned = Event(), []
+            threads = [Thread(target=run_planning_load, args=(client, requests[idx::planning_clients], stop, planned)) for idx in range(planning_clients)]
+            for thread in threads:
+                thread.start()
+            p50, p99, max_latency = measure_control_latency(client, robot, duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            where = f'{workers} worker processes' if workers > 0 else 'the thread pool'
+            print(f'Planning on {where}: control p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {max_latency:.2f} ms, {len(planned) / duration:.1f} plans/s')
+
+        main.planning_pool.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark_planning_load()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from algorithm.controllers.mapping.reading_store import ReadingStore, convert_map_json
+from performance_metrics.benchmark_mapping import generate_regions, generate_sensor_readings
+import src.settings as settings
+
+
+def write_map_json(mapping: Mapping, json_path: str):
+    """
+    Writes the raw data as map.json was written before the reading store, every reading as a list of floats
+    """
+    data = {
+        "width": mapping.width,
+        "height": mapping.height,
+        "number_of_regions": mapping.number_of_regions,
+        "regions": mapping.convert_regions_to_tuples(False),
+        "sensor_readings": [{"region_number": entry.region_number, "sensor_readings": entry.sensor_readings.tolist()} for entry in mapping.sensor_readings],
+    }
+    with open(json_path, "w") as map_file:
+        map_file.write(json.dumps(data))
+
+
+def benchmark_reading_store(count: int = 1000000, delta_count: int = 200, delta_ticks: int = 100):
+    """
+    Compares writing and reloading the raw readings as map.json against the reading store, checks the replayed map
+    and the map converted from map.json match the map built from the readings, then times appending deltas
+    """
+    ground_truth = cv2.imread("./performance_metrics/mapping/M3-L-original.png", cv2.IMREAD_GRAYSCALE)
+    height, width = ground_truth.shape
+    region_points = generate_regions(width, height, 4, 2)
+    mapping = Mapping(width, height, len(region_points), region_points, generate_sensor_readings(ground_truth, region_points, count))
+    expected, _ = mapping.build_map()
+    directory = tempfile.mkdtemp()
+
+    json_path = os.path.join(directory, "map.json")
+    started_at = time.perf_counter()
+    write_map_json(mapping, json_path)
+    json_write_time = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    with open(json_path) as map_file:
+        json.loads(map_file.read())
+    json_load_time = time.perf_counter() - started_at
+    print(f'map.json: write {json_write_time * 1000:.1f} ms, reload {json_load_time * 1000:.1f} ms, {os.path.getsize(json_path) / 1e6:.1f} MB')
+
+    store = ReadingStore(os.path.join(directory, "readings"), settings.READING_STORE_MAX_SEGMENTS)
+    started_at = time.perf_counter()
+    store.replace(mapping)
+    store_write_time = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    reloaded = ReadingStore(store.directory, settings.READING_STORE_MAX_SEGMENTS).load()
+    store_load_time = time.perf_counter() - started_at
+    print(f'Reading store: write {store_write_time * 1000:.1f} ms, reload {store_load_time * 1000:.1f} ms, {store.get_stats()["bytes"] / 1e6:.1f} MB')
+    print(f'Replayed map identical: {np.array_equal(reloaded.build_map()[0], expected)}')
+
+    converted_store = ReadingStore(os.path.join(directory, "converted"), settings.READING_STORE_MAX_SEGMENTS)
+    started_at = time.perf_counter()
+    convert_map_json(json_path, converted_store)
+    print(f'Converted map.json in {(time.perf_counter() - started_at) * 1000:.1f} ms, identical map: {np.array_equal(converted_store.replay()[0], expected)}')
+
+    # Appending a delta writes only its readings, whatever the number of readings stored
+    rng = np.random.default_rng(1)
+    append_times = []
+    for _ in range(delta_ticks):
+        delta = [SensorReadingsPerRegion(idx, rng.uniform(0, [width, height], (delta_count // len(region_points), 2))) for idx in range(len(region_points))]
+        started_at = time.perf_counter()
+        store.append(Mapping(width, height, len(region_points), region_points, delta))
+        append_times.append(time.perf_counter() - started_at)
+    print(f'Append of {delta_count} readings: mean {np.mean(append_times) * 1000:.2f} ms, p99 {np.percentile(append_times, 99) * 1000:.2f} ms, {store.get_stats()}')
+
+
+if __name__ == "__main__":
+    benchmark_reading_store()
@@ -0,0 +1,69 @@
+import json
+import time
+
+import numpy as np
+
+from algorithm.batch_arbiter import BatchArbiter, controller_payload_type_dictionary
+from models.robot_frame import pack_robots
+from performance_metrics.benchmark_arbiter import generate_robots
+from src.api_models import _Algorithm
+from src.control_stream import encode_decisions as encode_json_decisions
+from src.wire_format import decode_decisions, decode_robot_frame, encode_decisions, encode_robot_frame
+
+
+def time_call(function, repeats: int):
+    """
+    Returns the result of the function and its mean wall time in ms
+    """
+    started_at = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - started_at) / repeats * 1000
+
+
+def benchmark_wire_format():
+    """
+    Compares encode and decode time and message size of the JSON robot payloads, validated and packed like
+    /algorithm/, against the binary wire format, and checks both paths make identical decisions
+    """
+    for count in [10, 100, 1000]:
+        repeats = max(10000 // count, 5)
+        robots = [robot.model_dump(exclude_none=True) for robot in generate_robots(count)]
+        frame = pack_robots(generate_robots(count))
+
+        payload = {"robots": robots, "environment": {"width": 1400, "height": 900}}
+        json_message, json_encode_time = time_call(lambda: json.dumps(payload).encode(), repeats)
+        json_frame, json_decode_time = time_call(lambda: pack_robots(_Algorithm(**json.loads(json_message)).robots), repeats)
+
+        binary_message, binary_encode_time = time_call(lambda: encode_robot_frame(frame), repeats)
+        (_, binary_frame), binary_decode_time = time_call(lambda: decode_robot_frame(binary_message), repeats)
+
+        print(f'{count} robots frame: JSON {len(json_message)} bytes, encode {json_encode_time:.3f} ms, decode {json_decode_time:.3f} ms | '
+              f'binary {len(binary_message)} bytes, encode {binary_encode_time:.3f} ms, decode {binary_decode_time:.3f} ms')
+
+        # Decisions, both from the same arbiter step
+        json_decisions = BatchArbiter(json_frame).execute()
+        arrays = BatchArbiter(binary_frame).calculate_decisions()
+
+        json_reply, json_reply_encode_time = time_call(lambda: json.dumps(encode_json_decisions(json_decisions)).encode(), repeats)
+        _, json_reply_decode_time = time_call(lambda: json.loads(json_reply), repeats)
+        binary_reply, binary_reply_encode_time = time_call(lambda: encode_decisions(binary_frame.ids, *arrays), repeats)
+        (_, ids, controllers, decisions), binary_reply_decode_time = time_call(lambda: decode_decisions(binary_reply), repeats)
+
+        print(f'{count} robots decisions: JSON {len(json_reply)} bytes, encode {json_reply_encode_time:.3f} ms, decode {json_reply_decode_time:.3f} ms | '
+              f'binary {len(binary_reply)} bytes, encode {binary_reply_encode_time:.3f} ms, decode {binary_reply_decode_time:.3f} ms')
+
+        expected = np.array([
+            [*decision['payload']['steering_input'], decision['payload']['pid_metadata']['prev_eP'], decision['payload']['pid_metadata']['prev_eI']]
+            for decision in json_decisions
+        ], dtype=np.float64).reshape(count, 4)
+        mismatches = int(np.sum(
+            (ids != [decision['robot_id'] for decision in json_decisions])
+            | np.array([controller_payload_type_dictionary[controller] != decision['type'] for controller, decision in zip(controllers.tolist(), json_decisions)], dtype=bool)
+            | np.any(decisions != expected, axis=1)
+        ))
+        print(f'{count} robots: {mismatches} mismatched decisions')
+
+
+if __name__ == "__main__":
+    benchmark_wire_format()
@@ -38,6 +38,20 @@ class _Robot(BaseModel):
     current_controller: str # optional, current controller of the robot
 
 
+class _RobotDelta(BaseModel):
+    id: int
+    pose: _Pose = None
+    sensor_readings: List[_SensorReading] = None
+    mapping_goals: List[_Point] = None # optional, replaces the goal queue kept in the session
+    status: str = None
+    front_sensor_distances: List[float] = None
+    ir_sensors: List[_SensorReading] = None
+    leader_position: _Point = None
+    path_points: List[_Point] = None # optional, replaces the path kept in the session
+    current_goal: _Point = None
+    robots_within_signal_range: List[int] = None
+
+
 class _TopologicalEnvironment(BaseModel):
     width: int
     height: int
@@ -74,6 +88,22 @@ class _Mapping(BaseModel):
     sensor_readings_per_region: List[_SensorReadingsPerRegion]
 
 
+class _RangeScan(BaseModel):
+    pose: _Pose
+    sensor_readings: List[_SensorReading] # readings that hit an obstacle
+    empty_readings: List[_SensorReading] = [] # optional, ends of the readings that reached the sensor range without a hit
+
+
+class _LogOddsFrame(BaseModel):
+    width: int
+    height: int
+    scans: List[_RangeScan]
+
+
+class _RegionSet(BaseModel):
+    regions: List[_Region]
+
+
 class _GroundTruthMap(BaseModel):
     width: int
     height: int
@@ -0,0 +1,157 @@
+import json
+import time
+from collections import deque
+from threading import Lock
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
+from src.api_models import _Robot, _RobotDelta
+from src.robot_sessions import SessionStore
+from src.wire_format import decode_robot_frame, encode_decisions as encode_binary_decisions
+
+
+def encode_decisions(decisions):
+    """
+    Returns the Arbiter payloads with the payload type as its value, as the HTTP endpoints serialize it
+    """
+    return [{**decision, 'type': decision['type'].value if decision['type'] is not None else None} for decision in decisions]
+
+
+class StreamMetrics:
+    """
+    Per frame latency and sustained frame rate of the control streams, measured on the server
+    """
+    def __init__(self, window_size: int):
+        self.lock = Lock()
+        self.active_connections = 0
+        self.connections = 0
+        self.frames = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+        # Latencies and completion times of the most recent frames
+        self.latencies = deque(maxlen=window_size)
+        self.frame_times = deque(maxlen=window_size)
+
+
+    def open_connection(self):
+        with self.lock:
+            self.active_connections += 1
+            self.connections += 1
+
+
+    def close_connection(self):
+        with self.lock:
+            self.active_connections -= 1
+
+
+    def record_frame(self, latency: float, is_error: bool = False):
+        with self.lock:
+            self.frames += 1
+            self.errors += 1 if is_error else 0
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.latencies.append(latency)
+            self.frame_times.append(time.perf_counter())
+
+
+    def get_stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            frame_times = list(self.frame_times)
+
+            def percentile(fraction: float):
+                return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if len(latencies) > 0 else 0.0
+
+            # Frame rate over the recent frames across every open stream
+            elapsed = frame_times[-1] - frame_times[0] if len(frame_times) > 1 else 0.0
+            return {
+                "active_connections": self.active_connections,
+                "connections": self.connections,
+                "frames": self.frames,
+                "errors": self.errors,
+                "mean_latency_ms": self.total_latency / self.frames * 1000 if self.frames > 0 else 0.0,
+                "p50_latency_ms": percentile(0.5),
+                "p99_latency_ms": percentile(0.99),
+                "max_latency_ms": self.max_latency * 1000,
+                "fps": (len(frame_times) - 1) / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class ControlStream:
+    """
+    Full duplex control channel over one WebSocket. The client streams frames of robot states,
+    {"frame": n, "robots": [...]}, without waiting for replies, and the server answers every frame in order with
+    {"frame": n, "decisions": [...], "latency_ms": t} where each decision is an Arbiter payload.
+    Frames with a "session_id" carry robot deltas for a session instead of full robot states.
+    Binary frames are robot frames of the wire format and are answered with binary decisions messages.
+    """
+    def __init__(self, websocket: WebSocket, metrics: StreamMetrics, session_store: SessionStore):
+        self.websocket = websocket
+        self.metrics = metrics
+        self.session_store = session_store
+
+
+    def decide(self, message: dict):
+        """
+        Returns the reply to one frame
+        """
+        if "session_id" in message:
+            session = self.session_store.get_session(message["session_id"])
+            if session is None:
+                raise ValueError(f'Session {message["session_id"]} does not exist or has expired')
+            decisions = session.decide([_RobotDelta(**delta) for delta in message["robots"]])
+        else:
+            decisions = BatchArbiter(pack_robots([_Robot(**robot) for robot in message["robots"]])).execute()
+
+        return {"frame": message.get("frame"), "decisions": encode_decisions(decisions)}
+
+
+    def decide_binary(self, data: bytes):
+        """
+        Returns the binary reply to one binary frame
+        """
+        frame_id, frame = decode_robot_frame(data)
+        decisions = BatchArbiter(frame).calculate_decisions()
+        return encode_binary_decisions(frame.ids, *decisions, frame_id=frame_id)
+
+
+    async def run(self):
+        await self.websocket.accept()
+        self.metrics.open_connection()
+
+        try:
+            while True:
+                received = await self.websocket.receive()
+                if received["type"] == "websocket.disconnect":
+                    break
+                started_at = time.perf_counter()
+                message = None
+
+                # Frames are decided on the thread pool, like /algorithm/binary/, so other connections are served meanwhile
+                try:
+                    if received.get("bytes") is not None:
+                        reply = await run_in_threadpool(self.decide_binary, received["bytes"])
+                    else:
+                        message = json.loads(received["text"])
+                        reply = await run_in_threadpool(self.decide, message)
+                    is_error = False
+                except Exception as e:
+                    print(e)
+                    reply = {"frame": message.get("frame") if isinstance(message, dict) else None, "error": str(e)}
+                    is_error = True
+
+                if isinstance(reply, bytes):
+                    await self.websocket.send_bytes(reply)
+                else:
+                    reply["latency_ms"] = (time.perf_counter() - started_at) * 1000
+                    await self.websocket.send_json(reply)
+                self.metrics.record_frame(time.perf_counter() - started_at, is_error)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.metrics.close_connection()
@@ -1,18 +1,39 @@
+import atexit
 from typing import List
-from fastapi import FastAPI
+import cv2
+from fastapi import FastAPI, Header, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from algorithm.algorithm import BaseAlgorithm
 from algorithm.arbiter import Arbiter
+from algorithm.batch_arbiter import BatchArbiter
+from algorithm.controllers.mapping.incremental_map import incremental_map
+from algorithm.controllers.mapping.log_odds_map import log_odds_map
+from algorithm.controllers.mapping.map_store import map_store
 from algorithm.controllers.mapping.mapping import Mapping
-from algorithm.controllers.path_planning.path_to_goal import PathToGoal
+from algorithm.controllers.mapping.reading_store import reading_store
+from algorithm.controllers.path_planning.flow_field.flow_field import FlowFieldCache
+from algorithm.controllers.path_planning.path_cache import PathCache
+from algorithm.controllers.path_planning.path_to_goal import anytime_planner_dictionary, get_plan_cache_key, incremental_planners, is_planner_known, plan_history
+from algorithm.controllers.path_planning.plan_status import PlanStatus, get_legacy_navigation_paths, get_plan_result
+from algorithm.controllers.path_planning.region_store import RegionSetStore, is_etag_matched
 from src.api_models import _ActivityHistory
+from src.control_stream import ControlStream, StreamMetrics
+from src.planning_pool import PlanningPool, generate_ground_truth_task, generate_map_task, replay_map_task
+from src.planning_scheduler import PlanningDropped, PlanningScheduler, priority_dictionary
+from src.robot_sessions import SessionStore
+from src.wire_format import decode_robot_frame, encode_decisions
 from src.api_models import _GroundTruthMap
+from src.api_models import _LogOddsFrame
 from src.api_models import _Mapping
+from src.api_models import _RegionSet
 from src.utils import transform_mapping_api_model
 from src.api_models import _Robot
+from src.api_models import _RobotDelta
 from src.api_models import _Algorithm
-from performance_metrics.generate_ground_truth import generate_ground_truth
 
+import src.settings as settings
 import src.utils as utils
 
 
@@ -24,12 +45,44 @@ origins = [
 ]
 
 
+path_cache = PathCache(settings.PATH_CACHE_SIZE)
+
+
+stream_metrics = StreamMetrics(settings.CONTROL_STREAM_METRICS_WINDOW)
+
+
+session_store = SessionStore(settings.SESSION_IDLE_TIMEOUT_S)
+
+
+flow_field_cache = FlowFieldCache(settings.FLOW_FIELD_CACHE_SIZE, settings.FLOW_FIELD_PATCH_RADIUS_PX)
+
+
+region_sets = RegionSetStore(settings.REGION_SET_STORE_SIZE)
+
+
+planning_pool = PlanningPool(settings.PLANNING_PROCESS_WORKERS, settings.SHARED_MAP_COUNT)
+atexit.register(planning_pool.shutdown)
+
+
+planning_scheduler = PlanningScheduler(settings.PLANNING_QUEUE_SIZE, settings.PLANNING_MAX_CONCURRENT)
+
+
+# HTTP status of the plan requests dropped by the scheduler, by drop reason
+planning_drop_status_dictionary = {
+    "QUEUE_FULL": 503,
+    "SHED": 503,
+    "EXPIRED": 504,
+    "SUPERSEDED": 409,
+}
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Plan-Dropped"],
 )
 
 
@@ -45,37 +98,267 @@ def algorithm(algorithm: _Algorithm):
     return decisions
 
 
+@app.post("/algorithm/binary/")
+async def algorithm_binary(request: Request):
+    # Same decisions as /algorithm/ for a binary robot frame, answered with a binary decisions message
+    try:
+        frame_id, frame = decode_robot_frame(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    decisions = await run_in_threadpool(BatchArbiter(frame).calculate_decisions)
+    return Response(content=encode_decisions(frame.ids, *decisions, frame_id=frame_id), media_type="application/octet-stream")
+
+
 @app.post("/single_robot/")
 def single_robot(robot: _Robot):
     decision = Arbiter(robot)
     return decision.execute()
 
 
+@app.post("/sessions/")
+def create_session():
+    session = session_store.create_session()
+    return {"session_id": session.session_id, "idle_timeout_s": session_store.idle_timeout}
+
+
+@app.get("/sessions/")
+def get_session_stats():
+    return session_store.get_stats()
+
+
+@app.post("/sessions/{session_id}/decisions/")
+def session_decisions(session_id: str, robots: List[_RobotDelta]):
+    session = session_store.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session does not exist or has expired")
+    try:
+        return session.decide(robots)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if not session_store.delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Session does not exist or has expired")
+    return "Success"
+
+
+@app.websocket("/control_stream/")
+async def control_stream(websocket: WebSocket):
+    await ControlStream(websocket, stream_metrics, session_store).run()
+
+
+@app.get("/control_stream/")
+def get_control_stream_stats():
+    return stream_metrics.get_stats()
+
+
 @app.post("/generate_map/")
-def generate_map(raw_mapping: _Mapping):
+async def generate_map(raw_mapping: _Mapping):
     width, height, number_of_regions, region_points, sensor_readings_per_region, _ = transform_mapping_api_model(raw_mapping)
     mapping = Mapping(width, height, number_of_regions, region_points, sensor_readings_per_region)
-    mapping.clear_map_json()
-    mapping.store_raw_data()
-    mapping.generate_map()
+    final_map, final_map_opened = await planning_pool.run(generate_map_task, mapping)
+    snapshot = await run_in_threadpool(incremental_map.reset, final_map, final_map_opened)
+    await run_in_threadpool(reading_store.replace, mapping)
+    path_cache.clear()
+    flow_field_cache.clear()
+    return {"version": snapshot.version}
+
+
+@app.post("/replay_map/")
+async def replay_map():
+    # Generates the map again from the stored readings, e.g. after a restart
+    maps = await planning_pool.run(replay_map_task, reading_store.directory)
+    if maps is None:
+        raise HTTPException(status_code=404, detail="No readings have been stored yet")
+    snapshot = await run_in_threadpool(incremental_map.reset, *maps)
+    path_cache.clear()
+    flow_field_cache.clear()
+    return {"version": snapshot.version}
+
+
+@app.get("/replay_map/")
+def get_reading_store_stats():
+    return reading_store.get_stats()
+
+
+@app.post("/map_delta/")
+async def map_delta(raw_mapping: _Mapping):
+    # Adds only the new sensor readings to the current map instead of generating it again from every reading
+    width, height, number_of_regions, region_points, sensor_readings_per_region, _ = transform_mapping_api_model(raw_mapping)
+    mapping = Mapping(width, height, number_of_regions, region_points, sensor_readings_per_region)
+    snapshot, changed_pixels = await run_in_threadpool(incremental_map.apply_delta, mapping)
+    await run_in_threadpool(reading_store.append, mapping)
+    if changed_pixels > 0:
+        path_cache.clear()
+        flow_field_cache.clear()
+    return {"version": snapshot.version if snapshot is not None else 0, "changed_pixels": changed_pixels}
+
+
+@app.get("/map_delta/")
+def get_map_delta_stats():
+    return {**incremental_map.get_stats(), "map_store": map_store.get_stats()}
+
+
+@app.post("/log_odds_map/")
+async def log_odds_frame(frame: _LogOddsFrame):
+    # Log odds mapping mode, the map is built from the rays of the readings and published in place of the generated one
+    width, height, origins, ends, is_hit = utils.transform_log_odds_frame_api_model(frame)
+    snapshot, changed_pixels = await run_in_threadpool(log_odds_map.apply_frame, width, height, origins, ends, is_hit)
+    if changed_pixels > 0:
+        path_cache.clear()
+        flow_field_cache.clear()
+    return {"version": snapshot.version if snapshot is not None else 0, "changed_pixels": changed_pixels}
+
+
+@app.get("/log_odds_map/")
+def get_log_odds_map_stats():
+    return log_odds_map.get_stats()
+
+
+def get_plan_regions(mapping: _Mapping, region_set_id: str):
+    """
+    Returns the regions of a plan request, sent with the request or referenced by the id of an uploaded region set
+    """
+    if region_set_id is not None:
+        regions = region_sets.get(region_set_id)
+        if regions is None:
+            raise HTTPException(status_code=404, detail="Region set does not exist or has been evicted, upload it again")
+        return regions
+    if mapping is None:
+        raise HTTPException(status_code=422, detail="Either a mapping or a region_set_id is required")
+    return utils.transform_mapping_api_model(mapping)[5]
+
+
+@app.post("/regions/")
+def upload_regions(region_set: _RegionSet, response: Response):
+    region_set_id = region_sets.register(utils.transform_region_set_api_model(region_set))
+    response.headers["ETag"] = f'"{region_set_id}"'
+    return {"region_set_id": region_set_id, "number_of_regions": len(region_set.regions)}
+
+
+@app.get("/regions/")
+def get_region_set_stats():
+    return region_sets.get_stats()
+
+
+@app.get("/regions/{region_set_id}")
+def get_region_set(region_set_id: str, if_none_match: str = Header(None)):
+    # Revalidation: a client holding a stored region set id does not need to upload the regions again
+    regions = region_sets.get(region_set_id)
+    if regions is None:
+        raise HTTPException(status_code=404, detail="Region set does not exist or has been evicted")
+    etag = f'"{region_set_id}"'
+    if is_etag_matched(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content={"region_set_id": region_set_id, "number_of_regions": len(regions)}, headers={"ETag": etag})
+
+
+def get_plan_map(robot: tuple, planner: str):
+    """
+    Returns the map plan requests are executed on, after checking the robot has a goal and the planner exists
+    """
+    if robot[3] is None:
+        raise HTTPException(status_code=422, detail="The robot has no current goal")
+    if not is_planner_known(planner):
+        raise HTTPException(status_code=422, detail=f'Unknown planner {planner}')
+    occupancy_map = map_store.get_snapshot()
+    if occupancy_map is None:
+        raise HTTPException(status_code=503, detail="No map has been generated yet")
+    return occupancy_map
 
 
 @app.post("/plan_path/")
-def plan_path(robot: _Robot, mapping: _Mapping):
+async def plan_path(robot: _Robot, mapping: _Mapping = None, region_set_id: str = None, planner: str = "ASTAR", hierarchical: bool = False,
+                    priority: str = None, deadline_ms: float = settings.PLANNING_DEADLINE_MS,
+                    time_budget_ms: float = settings.ANYTIME_PLANNER_BUDGET_MS, include_status: bool = False):
+    # With include_status the plan result is returned, otherwise the navigation paths or the sentinel path
     robot = utils.transform_robot_api_model(robot)
-    mapping = utils.transform_mapping_api_model(mapping)
-    try:
-        path_to_goal = PathToGoal(robot[1], robot[3], mapping[5])
-        navigation_paths = path_to_goal.execute()
-        return navigation_paths
-    except Exception as e:
-        print(e)
-        return []
+    regions = get_plan_regions(mapping, region_set_id)
+    occupancy_map = get_plan_map(robot, planner)
+
+    # The priority defaults to the one of the robot status
+    priority = priority_dictionary.get(priority or robot[7], priority_dictionary["NAVIGATION"])
+
+    # The plan request itself is only built by the planning pool, and only when the plan is not cached
+    cache_key = get_plan_cache_key(occupancy_map.version, regions, robot[1], robot[3], planner, hierarchical, time_budget_ms)
+    plan_result = path_cache.get(cache_key)
+    if plan_result is None:
+        plan = lambda: planning_pool.plan(occupancy_map, robot[1], robot[3], regions, planner, hierarchical, robot[0], time_budget_ms)
+        try:
+            plan_result = await planning_scheduler.submit(robot[0], priority, deadline_ms, plan)
+        except PlanningDropped as e:
+            # Dropped requests have no answer yet, the header tells the robot to keep its goal and ask again
+            raise HTTPException(status_code=planning_drop_status_dictionary[e.reason], detail=str(e), headers={"X-Plan-Dropped": e.reason})
+        except ValueError as e:
+            # The start or the goal is not within any region
+            print(e)
+            return get_plan_result(PlanStatus.NO_PATH) if include_status else []
+        # Anytime planners may find the path with more time, only their paths found are kept
+        if planner not in anytime_planner_dictionary or plan_result["status"] == PlanStatus.FOUND:
+            path_cache.put(cache_key, plan_result)
+    return plan_result if include_status else get_legacy_navigation_paths(plan_result)
+
+
+@app.get("/path_cache/")
+def get_path_cache_stats():
+    return {**path_cache.get_stats(), "segments": planning_pool.get_segment_stats()}
+
+
+@app.put("/path_cache/")
+def resize_path_cache(max_size: int):
+    path_cache.resize(max_size)
+    return path_cache.get_stats()
+
+
+@app.post("/flow_field/")
+async def flow_field(robots: List[_Robot], lookahead: int = settings.FLOW_FIELD_LOOKAHEAD):
+    occupancy_map = map_store.get_snapshot()
+    if occupancy_map is None:
+        raise HTTPException(status_code=503, detail="No map has been generated yet")
+
+    waypoints = []
+    for robot in robots:
+        # Followers head to the leader, every other robot to its own goal
+        robot = utils.transform_robot_api_model(robot)
+        goal = robot[10] if robot[7] == "FIND_LEADER" else robot[3]
+        if goal is None or not occupancy_map.is_point_valid(goal):
+            waypoints.append(None)
+            continue
+        # Fields are searched by the planning pool, the search would otherwise hold the GIL of this process
+        field = await flow_field_cache.get_field(occupancy_map, goal, planning_pool.compute_distance_field)
+        waypoints.append(field.get_next_waypoint(robot[1].point, lookahead))
+    return waypoints
+
+
+@app.get("/flow_field/")
+def get_flow_field_stats():
+    return flow_field_cache.get_stats()
+
+
+@app.get("/planning_pool/")
+async def get_planning_pool_stats():
+    return {**planning_pool.get_stats(), "scheduler": planning_scheduler.get_stats()}
+
+
+@app.get("/replanning/")
+def get_replanning_stats():
+    return incremental_planners.get_stats()
+
+
+@app.get("/path_map/")
+def path_map(version: int = None, count: int = 10):
+    image = plan_history.render(version, count)
+    if image is None:
+        raise HTTPException(status_code=404, detail="No plans recorded for this map version")
+    _, png = cv2.imencode(".png", image)
+    return Response(content=png.tobytes(), media_type="image/png")
 
 
 @app.post("/generate_ground_truth_map/")
-def generate_ground_truth_map(ground_truth: _GroundTruthMap):
-    generate_ground_truth(ground_truth)
+async def generate_ground_truth_map(ground_truth: _GroundTruthMap):
+    await planning_pool.run(generate_ground_truth_task, ground_truth)
     return "Success"
 
 
@@ -87,10 +370,11 @@ def log_activity_history(activity_histories: List[List[_ActivityHistory]]):
 
 
 @app.post("/test_plan_path/")
-def test_plan_path(robot: _Robot, mapping: _Mapping):
+async def test_plan_path(robot: _Robot, mapping: _Mapping = None, region_set_id: str = None, planner: str = "ASTAR", hierarchical: bool = False,
+                         time_budget_ms: float = settings.ANYTIME_PLANNER_BUDGET_MS, include_status: bool = False):
     robot = utils.transform_robot_api_model(robot)
-    mapping = utils.transform_mapping_api_model(mapping)
+    regions = get_plan_regions(mapping, region_set_id)
+    occupancy_map = get_plan_map(robot, planner)
     print("Robot ID >>> ", robot[0])
-    path_to_goal = PathToGoal(robot[1], robot[3], mapping[5])
-    navigation_paths = path_to_goal.execute()
-    return navigation_paths
+    plan_result = await planning_pool.plan(occupancy_map, robot[1], robot[3], regions, planner, hierarchical, robot[0], time_budget_ms)
+    return plan_result if include_status else get_legacy_navigation_paths(plan_result)
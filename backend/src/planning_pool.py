@@ -0,0 +1,345 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from algorithm.controllers.mapping.mapping import Mapping
+from algorithm.controllers.mapping.reading_store import ReadingStore
+from algorithm.controllers.path_planning.flow_field.flow_field import compute_distance_field
+from algorithm.controllers.path_planning.path_to_goal import PathToGoal, incremental_planner_dictionary, plan_history, segment_cache
+from algorithm.controllers.path_planning.plan_status import PlanStatus
+from models.occupancy_map import OccupancyMap
+from performance_metrics.generate_ground_truth import generate_ground_truth
+from src.api_models import _GroundTruthMap
+import src.settings as settings
+
+
+# Layers of an occupancy map shared with the workers, the workers never build them again
+SHARED_LAYERS = ["final_map", "validity_mask", "cost_field"]
+
+
+class SharedMap:
+    """
+    Picklable reference to an occupancy map written to memory mapped files, sent to the workers instead of the map
+    """
+    def __init__(self, name: str, lineage: str, version: int, paths: dict):
+        self.name = name
+        self.lineage = lineage
+        self.version = version
+        self.paths = paths
+
+
+class SharedMapDirectory:
+    """
+    Writes occupancy maps to .npy files the workers memory map read only. Every set of files holds one map version
+    and is only written again once no plan reads it anymore: a newer version of the same lineage then only writes
+    the boxes changed since, any other map is written whole to new files.
+    The files live in shared memory where available, so the workers share the pages of the parent.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.directory = tempfile.mkdtemp(prefix="occupancy_maps_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.shared_maps = OrderedDict()
+        self.readers = {}
+        self.count = 0
+        self.lock = Lock()
+
+
+    def share(self, occupancy_map: OccupancyMap):
+        """
+        Returns the SharedMap of the occupancy map for a plan to read, which must be released once the plan is done
+        """
+        with self.lock:
+            shared_map = next((shared_map for shared_map in self.shared_maps.values()
+                               if (shared_map.lineage, shared_map.version) == (occupancy_map.lineage, occupancy_map.version)), None)
+
+            if shared_map is None:
+                shared_map = self.get_free_files(occupancy_map)
+                if shared_map is not None:
+                    self.patch(shared_map, occupancy_map)
+                else:
+                    self.count += 1
+                    name = f'map_{self.count}'
+                    paths = {layer_name: os.path.join(self.directory, f'{name}_{layer_name}.npy') for layer_name in SHARED_LAYERS}
+                    shared_map = SharedMap(name, occupancy_map.lineage, occupancy_map.version, paths)
+                    self.shared_maps[name] = shared_map
+                    self.readers[name] = 0
+                    self.write(shared_map, occupancy_map)
+
+                # Workers still mapping files removed keep reading them
+                free_names = [name for name, readers in self.readers.items() if readers == 0 and name != shared_map.name]
+                while len(self.shared_maps) > self.max_size and len(free_names) > 0:
+                    self.remove(self.shared_maps.pop(free_names.pop(0)))
+
+            self.shared_maps.move_to_end(shared_map.name)
+            self.readers[shared_map.name] += 1
+            return SharedMap(shared_map.name, shared_map.lineage, shared_map.version, shared_map.paths)
+
+
+    def release(self, shared_map: SharedMap):
+        """
+        Marks a plan reading the files of the SharedMap as done
+        """
+        with self.lock:
+            self.readers[shared_map.name] -= 1
+
+
+    def get_free_files(self, occupancy_map: OccupancyMap):
+        """
+        Returns the files no plan reads holding the most recent older version of the lineage of the occupancy map,
+        or None if there are none or the change log of the map no longer reaches back to them
+        """
+        candidates = [
+            shared_map for shared_map in self.shared_maps.values()
+            if self.readers[shared_map.name] == 0 and shared_map.lineage == occupancy_map.lineage and shared_map.version < occupancy_map.version
+        ]
+        shared_map = max(candidates, key=lambda candidate: candidate.version, default=None)
+        if shared_map is None or occupancy_map.get_changes(shared_map.version) is None:
+            return None
+        return shared_map
+
+
+    def write(self, shared_map: SharedMap, occupancy_map: OccupancyMap):
+        """
+        Writes every layer of the occupancy map to new files, renamed over the files of the SharedMap
+        """
+        layers = [occupancy_map.final_map, occupancy_map.get_validity_mask(), occupancy_map.get_cost_field()]
+        for name, layer in zip(SHARED_LAYERS, layers):
+            temporary_path = f'{shared_map.paths[name]}.tmp.npy'
+            np.save(temporary_path, layer)
+            os.replace(temporary_path, shared_map.paths[name])
+
+
+    def patch(self, shared_map: SharedMap, occupancy_map: OccupancyMap):
+        """
+        Writes the boxes (top, bottom, left, right) changed since the version of the files no plan reads
+        """
+        boxes, _, _ = occupancy_map.get_changes(shared_map.version)
+        layers = [occupancy_map.final_map, occupancy_map.get_validity_mask(), occupancy_map.get_cost_field()]
+        for name, layer in zip(SHARED_LAYERS, layers):
+            shared_layer = np.load(shared_map.paths[name], mmap_mode="r+")
+            for top, bottom, left, right in boxes:
+                shared_layer[top:bottom, left:right] = layer[top:bottom, left:right]
+            shared_layer.flush()
+            del shared_layer
+        shared_map.version = occupancy_map.version
+
+
+    def remove(self, shared_map: SharedMap):
+        del self.readers[shared_map.name]
+        for path in shared_map.paths.values():
+            os.remove(path)
+
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Occupancy maps attached by this worker process, by files, lineage and version
+attached_maps = OrderedDict()
+
+
+def attach_map(shared_map: SharedMap):
+    """
+    Returns the occupancy map of a SharedMap in a worker process, memory mapping its layers on first use
+    """
+    key = (shared_map.name, shared_map.lineage, shared_map.version)
+    occupancy_map = attached_maps.get(key)
+    if occupancy_map is None:
+        layers = {name: np.asarray(np.load(path, mmap_mode="r")) for name, path in shared_map.paths.items()}
+        occupancy_map = OccupancyMap(layers["final_map"], shared_map.version)
+        occupancy_map.validity_mask = layers["validity_mask"]
+        occupancy_map.cost_field = layers["cost_field"]
+        occupancy_map.lineage = shared_map.lineage
+        attached_maps[key] = occupancy_map
+
+        while len(attached_maps) > 2:
+            attached_maps.popitem(last=False)
+
+    attached_maps.move_to_end(key)
+    return occupancy_map
+
+
+def execute_plan(occupancy_map: OccupancyMap, initial_pose, goal_point, regions, planner: str, hierarchical: bool, robot_id: int,
+                 time_budget_ms: float):
+    """
+    Builds the plan request on the map and executes it, the planner and its layers are only ever built here
+    """
+    path_to_goal = PathToGoal(initial_pose, goal_point, regions, planner, hierarchical, robot_id, occupancy_map, time_budget_ms)
+    return path_to_goal.execute_with_status()
+
+
+def plan_path_task(shared_map: SharedMap, initial_pose, goal_point, regions, planner: str, hierarchical: bool, robot_id: int,
+                   time_budget_ms: float):
+    plan_result = execute_plan(attach_map(shared_map), initial_pose, goal_point, regions, planner, hierarchical, robot_id, time_budget_ms)
+
+    # The segment cache of hierarchical plans lives in the worker, its stats travel back with the plan
+    return plan_result, os.getpid(), segment_cache.get_stats()
+
+
+def distance_field_task(shared_map: SharedMap, goal: tuple, window: tuple):
+    return compute_distance_field(attach_map(shared_map), goal, window)
+
+
+def generate_map_task(mapping: Mapping):
+    return mapping.build_map()
+
+
+def replay_map_task(directory: str):
+    # The worker memory maps the stored readings itself instead of receiving them
+    return ReadingStore(directory, settings.READING_STORE_MAX_SEGMENTS).replay()
+
+
+def generate_ground_truth_task(ground_truth: _GroundTruthMap):
+    generate_ground_truth(ground_truth)
+
+
+class PlanningPool:
+    """
+    Runs CPU bound planning, map generation and ground truth generation in worker processes, so they neither hold
+    the GIL nor a request thread while control requests are served. With no workers the tasks run on the thread pool.
+    """
+    def __init__(self, workers: int, shared_map_count: int):
+        self.workers = workers
+        self.executor = None
+        self.shared_maps = SharedMapDirectory(shared_map_count) if workers > 0 else None
+        self.lock = Lock()
+
+        # Segment cache stats last reported by each worker process, by process id
+        self.worker_segment_stats = {}
+
+        # Counters exposed through get_stats
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+    def get_executor(self):
+        """
+        Starts the worker processes on first use. Workers are spawned, forking the server would copy its threads' locks.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+
+    async def run(self, function, *args, on_done=None):
+        """
+        Runs the function in a worker process and returns its result. on_done is called once the task has finished,
+        even if the request awaiting it was cancelled while a worker still runs it.
+        """
+        with self.lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started_at = time.perf_counter()
+
+        try:
+            if self.workers > 0:
+                future = self.get_executor().submit(function, *args)
+
+                # Once submitted, the task calls on_done when it finishes instead
+                callback, on_done = on_done, None
+                if callback is not None:
+                    future.add_done_callback(lambda _: callback())
+                result = await asyncio.wrap_future(future)
+            else:
+                result = await run_in_threadpool(function, *args)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            # Tasks that never reached a worker are done too
+            if on_done is not None:
+                on_done()
+            elapsed = time.perf_counter() - started_at
+            with self.lock:
+                self.in_flight -= 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+        with self.lock:
+            self.completed += 1
+        return result
+
+
+    async def plan(self, occupancy_map: OccupancyMap, initial_pose, goal_point, regions, planner: str, hierarchical: bool, robot_id: int,
+                   time_budget_ms: float):
+        """
+        Executes the plan request on the map and returns its plan result.
+        Incremental planners keep their search state in this process and run on the thread pool.
+        """
+        if self.workers == 0 or planner in incremental_planner_dictionary:
+            return await run_in_threadpool(execute_plan, occupancy_map, initial_pose, goal_point, regions, planner, hierarchical, robot_id, time_budget_ms)
+
+        # The files of the map are not written again until the worker is done reading them
+        shared_map = await run_in_threadpool(self.shared_maps.share, occupancy_map)
+        plan_result, worker_id, segment_stats = await self.run(
+            plan_path_task, shared_map, initial_pose, goal_point, regions, planner, hierarchical, robot_id, time_budget_ms,
+            on_done=lambda: self.shared_maps.release(shared_map),
+        )
+        with self.lock:
+            self.worker_segment_stats[worker_id] = segment_stats
+
+        # Plans made by the workers are drawn by /path_map/ of this process
+        if plan_result["status"] == PlanStatus.FOUND:
+            plan_history.record(occupancy_map, plan_result["navigation_paths"])
+        return plan_result
+
+
+    async def compute_distance_field(self, occupancy_map: OccupancyMap, goal: tuple, window: tuple):
+        """
+        Returns the distance field to the goal over the window of the map, searched in a worker process
+        """
+        if self.workers == 0:
+            return await run_in_threadpool(compute_distance_field, occupancy_map, goal, window)
+
+        shared_map = await run_in_threadpool(self.shared_maps.share, occupancy_map)
+        return await self.run(distance_field_task, shared_map, goal, window, on_done=lambda: self.shared_maps.release(shared_map))
+
+
+    def get_segment_stats(self):
+        """
+        Returns the segment cache stats of this process and of every worker as last reported, summed
+        """
+        with self.lock:
+            stats = [segment_cache.get_stats()] + list(self.worker_segment_stats.values())
+        return {name: sum(process_stats[name] for process_stats in stats) for name in stats[0]}
+
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+        if self.shared_maps is not None:
+            self.shared_maps.close()
+
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "mean_task_time_ms": self.total_time / (self.completed + self.failed) * 1000 if self.completed + self.failed > 0 else 0.0,
+                "max_task_time_ms": self.max_time * 1000,
+                "shared_maps": len(self.shared_maps.shared_maps) if self.shared_maps is not None else 0,
+            }
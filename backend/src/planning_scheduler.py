@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import time
+from collections import deque
+
+
+# Planning priorities, lower values are scheduled first. Collision recovery comes first and opportunistic
+# mapping goals last, any other status plans at navigation priority.
+priority_dictionary = {
+    "COLLISION": 0,
+    "NAVIGATION": 1,
+    "MAPPING": 2,
+}
+
+
+# Reasons a plan request is dropped without a plan, CANCELLED requests were abandoned by their client
+DROP_REASONS = ["QUEUE_FULL", "SHED", "EXPIRED", "SUPERSEDED", "CANCELLED"]
+
+
+class PlanningDropped(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f'Plan request dropped: {reason}')
+        self.reason = reason
+
+
+class PlanningRequest:
+    def __init__(self, robot_id: int, priority: int, deadline: float, sequence: int):
+        self.robot_id = robot_id
+        self.priority = priority
+        self.deadline = deadline
+        self.sequence = sequence
+        self.submitted_at = time.monotonic()
+
+        # Resolved when the request may start, or with PlanningDropped when it is dropped while queued
+        self.admission = asyncio.get_running_loop().create_future()
+        self.drop_reason = None
+
+
+    def get_sort_key(self):
+        return (self.priority, self.deadline, self.sequence)
+
+
+class PlanningScheduler:
+    """
+    Admission control in front of the planners, run on the event loop. Requests wait in a bounded priority queue
+    ordered by priority then deadline and at most max_concurrent plans run at once. A request is dropped when the
+    queue is full, when it is still queued at its deadline or when a newer request of the same robot supersedes it.
+    A superseded request that is already running finishes, but its plan is discarded.
+    """
+    def __init__(self, max_queue_size: int, max_concurrent: int, window_size: int = 1000):
+        self.max_queue_size = max_queue_size
+        self.max_concurrent = max_concurrent
+        self.queue = []
+        self.queued = 0
+        self.running = 0
+        self.sequence = 0
+
+        # Latest request of every robot, queued or running
+        self.latest_requests = {}
+
+        # Counters exposed through get_stats
+        self.submitted = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.drops = {reason: 0 for reason in DROP_REASONS}
+        self.wait_times = deque(maxlen=window_size)
+
+
+    def drop(self, request: PlanningRequest, reason: str):
+        """
+        Drops a queued request, it is removed from the heap lazily when it reaches the top
+        """
+        request.drop_reason = reason
+        self.drops[reason] += 1
+        if not request.admission.done():
+            self.queued -= 1
+            request.admission.set_exception(PlanningDropped(reason))
+            # The waiting handler retrieves the exception, mark it retrieved in case it already gave up
+            request.admission.exception()
+
+
+    def abandon(self, request: PlanningRequest, reason: str):
+        """
+        Drops a request whose handler stopped waiting for its admission. If it was admitted meanwhile its slot is
+        handed on, nothing else would release it.
+        """
+        if not request.admission.done():
+            self.drop(request, reason)
+        elif request.admission.exception() is None:
+            # Admitted, possibly superseded since, but never started
+            if request.drop_reason is None:
+                request.drop_reason = reason
+                self.drops[reason] += 1
+            self.running -= 1
+            self.dispatch()
+
+
+    def dispatch(self):
+        """
+        Starts the most urgent queued requests while plans can run
+        """
+        while self.running < self.max_concurrent and len(self.queue) > 0:
+            _, request = heapq.heappop(self.queue)
+            if request.drop_reason is not None:
+                continue
+            self.queued -= 1
+            self.running += 1
+            self.wait_times.append(time.monotonic() - request.submitted_at)
+            request.admission.set_result(True)
+
+
+    def admit(self, request: PlanningRequest):
+        """
+        Queues the request, superseding the older request of its robot and shedding the least urgent queued
+        request when the queue is full
+        """
+        previous = self.latest_requests.get(request.robot_id)
+        if previous is not None and previous.drop_reason is None:
+            self.drop(previous, "SUPERSEDED")
+        self.latest_requests[request.robot_id] = request
+
+        heapq.heappush(self.queue, (request.get_sort_key(), request))
+        self.queued += 1
+
+        if self.queued > self.max_queue_size:
+            pending = [queued_request for _, queued_request in self.queue if queued_request.drop_reason is None]
+            least_urgent = max(pending, key=PlanningRequest.get_sort_key)
+            self.drop(least_urgent, "QUEUE_FULL" if least_urgent is request else "SHED")
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+
+    async def submit(self, robot_id: int, priority: int, deadline_ms: float, plan):
+        """
+        Runs the coroutine function plan once the request is admitted and returns its result.
+        Raises PlanningDropped if the request is dropped before or while it runs.
+        """
+        self.sequence += 1
+        self.submitted += 1
+        request = PlanningRequest(robot_id, priority, time.monotonic() + deadline_ms / 1000, self.sequence)
+        self.admit(request)
+        self.dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(request.admission), timeout=max(request.deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.abandon(request, "EXPIRED")
+            raise PlanningDropped(request.drop_reason)
+        except asyncio.CancelledError:
+            # The client disconnected while the request was queued
+            self.abandon(request, "CANCELLED")
+            raise
+        finally:
+            if self.latest_requests.get(robot_id) is request and request.drop_reason is not None:
+                del self.latest_requests[robot_id]
+
+        try:
+            result = await plan()
+        finally:
+            self.running -= 1
+            if self.latest_requests.get(robot_id) is request:
+                del self.latest_requests[robot_id]
+            self.dispatch()
+
+        if request.drop_reason is not None:
+            raise PlanningDropped(request.drop_reason)
+        self.completed += 1
+        return result
+
+
+    def get_stats(self):
+        wait_times = sorted(self.wait_times)
+
+        def percentile(fraction: float):
+            return wait_times[min(int(fraction * len(wait_times)), len(wait_times) - 1)] * 1000 if len(wait_times) > 0 else 0.0
+
+        return {
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue_size": self.max_queue_size,
+            "running": self.running,
+            "max_concurrent": self.max_concurrent,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": sum(self.drops.values()),
+            "drops": dict(self.drops),
+            "mean_wait_ms": sum(wait_times) / len(wait_times) * 1000 if len(wait_times) > 0 else 0.0,
+            "p50_wait_ms": percentile(0.5),
+            "p99_wait_ms": percentile(0.99),
+        }
@@ -0,0 +1,131 @@
+import time
+import uuid
+from threading import Lock
+from typing import List
+
+from algorithm.arbiter import payload_type_dictionary
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
+from src.api_models import _PIDMetadata, _Robot, _RobotDelta
+
+
+# Controller names by payload type, the client switches controllers the same way when it applies a decision
+controller_name_dictionary = {payload_type: name for name, payload_type in payload_type_dictionary.items()}
+
+
+class RobotSession:
+    """
+    Controller state of the robots of one client, kept between frames so the client only sends what changed
+    """
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.robots = {}
+        self.last_seen = time.monotonic()
+        self.lock = Lock()
+
+
+    def apply_deltas(self, deltas: List[_RobotDelta]):
+        """
+        Merges the changed fields into the robots of the session and returns the robots in delta order.
+        The first delta of a robot must carry every field except the controller state.
+        """
+        robots = []
+        for delta in deltas:
+            fields = {name: getattr(delta, name) for name in delta.model_fields_set if name != "id"}
+            robot = self.robots.get(delta.id)
+
+            if robot is None:
+                robot = _Robot(
+                    id=delta.id,
+                    pid_metadata=_PIDMetadata(prev_eP=0.0, prev_eI=0.0),
+                    current_controller="GO_TO_GOAL",
+                    **fields,
+                )
+                self.robots[delta.id] = robot
+            else:
+                for name, value in fields.items():
+                    setattr(robot, name, value)
+
+            robots.append(robot)
+        return robots
+
+
+    def record_decisions(self, robots: List[_Robot], decisions: List[dict]):
+        """
+        Keeps the PID errors and controller of every decision that selected a controller
+        """
+        for robot, decision in zip(robots, decisions):
+            if decision['type'] is None:
+                continue
+            robot.pid_metadata = _PIDMetadata(**decision['payload']['pid_metadata'])
+            robot.current_controller = controller_name_dictionary[decision['type']]
+
+
+    def decide(self, deltas: List[_RobotDelta]):
+        """
+        Returns the Arbiter payloads of the robots in the deltas
+        """
+        with self.lock:
+            self.last_seen = time.monotonic()
+            robots = self.apply_deltas(deltas)
+            decisions = BatchArbiter(pack_robots(robots)).execute()
+            self.record_decisions(robots, decisions)
+            return decisions
+
+
+class SessionStore:
+    """
+    Robot sessions by session id, sessions idle for longer than the timeout are expired
+    """
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.lock = Lock()
+
+        # Counters
+        self.created = 0
+        self.expired = 0
+
+
+    def expire_idle_sessions(self):
+        now = time.monotonic()
+        with self.lock:
+            idle_ids = [session_id for session_id, session in self.sessions.items() if now - session.last_seen > self.idle_timeout]
+            for session_id in idle_ids:
+                del self.sessions[session_id]
+            self.expired += len(idle_ids)
+
+
+    def create_session(self):
+        self.expire_idle_sessions()
+        session = RobotSession(uuid.uuid4().hex)
+        with self.lock:
+            self.sessions[session.session_id] = session
+            self.created += 1
+        return session
+
+
+    def get_session(self, session_id: str):
+        """
+        Returns the session, or None if it does not exist or has expired
+        """
+        self.expire_idle_sessions()
+        with self.lock:
+            return self.sessions.get(session_id)
+
+
+    def delete_session(self, session_id: str):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+
+    def get_stats(self):
+        self.expire_idle_sessions()
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "robots": sum(len(session.robots) for session in self.sessions.values()),
+                "created": self.created,
+                "expired": self.expired,
+                "idle_timeout_s": self.idle_timeout,
+            }
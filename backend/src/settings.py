@@ -44,3 +44,81 @@ WINDOW_OFFSET_IN_PX = WINDOW_OFFSET_IN_CM * PIXEL_TO_CM_RATIO;
 WINDOW_BUFFER_PX = 2;
 
 PX_AWAY_FROM_OBSTACLE = 6;
+
+# Maximum number of navigation paths kept by the /plan_path/ cache.
+PATH_CACHE_SIZE = 256
+
+# Maximum number of regions whose entry point paths are kept by the hierarchical planning segment cache.
+SEGMENT_CACHE_SIZE = 256
+
+# Writes path_map.png synchronously on every plan, for debugging only.
+DEBUG_VISUALIZE_PATHS = False
+
+# Number of recent plans kept for the /path_map/ endpoint.
+PLAN_HISTORY_SIZE = 50
+
+# Number of robot and goal pairs whose D* Lite search state is kept between plan requests.
+INCREMENTAL_PLANNER_CACHE_SIZE = 64
+
+# Number of flow fields kept by the /flow_field/ cache.
+FLOW_FIELD_CACHE_SIZE = 32
+
+# Goals within this many pixels of a cached flow field goal patch that field instead of recomputing it.
+FLOW_FIELD_PATCH_RADIUS_PX = 30
+
+# Number of cells descended on the flow field to pick the next waypoint.
+FLOW_FIELD_LOOKAHEAD = 10
+
+# Number of recent frames the control stream latency percentiles and frame rate are computed over.
+CONTROL_STREAM_METRICS_WINDOW = 300
+
+# Seconds without a frame after which a robot session and its controller state are dropped.
+SESSION_IDLE_TIMEOUT_S = 60
+
+# Number of uploaded region sets kept for plan requests that reference a region set by id.
+REGION_SET_STORE_SIZE = 16
+
+# Worker processes running planning, map generation and ground truth generation, 0 runs them on the thread pool.
+PLANNING_PROCESS_WORKERS = 2
+
+# Number of map versions kept memory mapped for the planning workers, more are written while every one is being read.
+SHARED_MAP_COUNT = 2
+
+# Plan requests waiting for a planner, the least urgent request is dropped when the queue is full.
+PLANNING_QUEUE_SIZE = 32
+
+# Plans running at once, one per planning worker process.
+PLANNING_MAX_CONCURRENT = max(PLANNING_PROCESS_WORKERS, 1)
+
+# Milliseconds a plan request may wait in the queue before it is dropped, unless the request sets its own deadline.
+PLANNING_DEADLINE_MS = 2000
+
+# Milliseconds the anytime planner (ARASTAR) may search for one plan request, unless the request sets its own budget.
+ANYTIME_PLANNER_BUDGET_MS = 200
+
+# Heuristic inflation of the first anytime search and how much it is lowered after every path found.
+ANYTIME_PLANNER_INITIAL_EPSILON = 3.0
+ANYTIME_PLANNER_EPSILON_STEP = 0.5
+
+# Side of the tiles new readings are grouped by on map updates, each tile holding new obstacles is opened again on its own.
+MAP_UPDATE_TILE_PX = 64
+
+# Map versions patched from one another whose changed cells are kept, so planners, map buffers and exports of older
+# versions can catch up.
+MAP_CHANGE_LOG_SIZE = 64
+
+# Seconds between writes of the current map images to disk, the reading store keeps every reading in between.
+MAP_PERSIST_INTERVAL_S = 5.0
+
+# Log odds added to a cell of the log odds map for every reading ending in it and every ray crossing it,
+# and the range the log odds are clamped to so cells can change state again.
+LOG_ODDS_HIT = 0.85
+LOG_ODDS_MISS = -0.4
+LOG_ODDS_MIN = -2.0
+LOG_ODDS_MAX = 3.5
+
+# Cells of the log odds map above these log odds are obstacles in the published map.
+LOG_ODDS_OCCUPIED_THRESHOLD = 0.0
+
+# Segments of raw readings kept per region by the reading store before they are merged into one.
+READING_STORE_MAX_SEGMENTS = 64
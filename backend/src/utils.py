@@ -4,10 +4,13 @@ from posixpath import dirname
 from typing import List
 
 import cv2
+import numpy as np
 from algorithm.controllers.mapping.mapping import SensorReadingsPerRegion
 from src.api_models import _ActivityHistory
+from src.api_models import _LogOddsFrame
 from models.region import Region
 from src.api_models import _Mapping
+from src.api_models import _RegionSet
 from src.api_models import _Robot
 from models.point import Point
 from models.pose import Pose
@@ -88,6 +91,29 @@ def transform_mapping_api_model(mapping: _Mapping):
     return mapping.width, mapping.height, mapping.number_of_regions, region_points, sensor_readings_per_region, regions
 
 
+def transform_region_set_api_model(region_set: _RegionSet):
+    regions: List[Region] = []
+    for region in region_set.regions:
+        points = [Point(point.x, point.y) for point in region.points]
+        entry_points = [Point(entry_point.x, entry_point.y) for entry_point in region.entry_points]
+        regions.append(Region(region.id, points, entry_points, region.connected_region_ids))
+
+    return regions
+
+
+def transform_log_odds_frame_api_model(frame: _LogOddsFrame):
+    """Transforms the scans of a frame into (n, 2) arrays of ray origins and ends, and whether each ray ends in a hit"""
+    origins, ends, is_hit = [], [], []
+    for scan in frame.scans:
+        for readings, hit in [(scan.sensor_readings, True), (scan.empty_readings, False)]:
+            for sensor_reading in readings:
+                origins.append((scan.pose.vector.x, scan.pose.vector.y))
+                ends.append((sensor_reading.reading.x, sensor_reading.reading.y))
+                is_hit.append(hit)
+
+    return frame.width, frame.height, np.array(origins, dtype=np.float64).reshape(-1, 2), np.array(ends, dtype=np.float64).reshape(-1, 2), np.array(is_hit, dtype=bool)
+
+
 def transform_activity_history_api_model(activity_histories: List[List[_ActivityHistory]]):
     activity_histories_dict = {}
     for idx, activity_history in enumerate(activity_histories):
@@ -0,0 +1,158 @@
+import struct
+
+import numpy as np
+
+from models.robot_frame import RobotFrame, ROBOT_STATUSES, controller_code_dictionary, pad_readings
+
+
+# Binary robot frames and decisions, little endian. Every message starts with the header
+# (magic, version, flags, frame id, robot count) and every block is padded to 8 bytes so the blocks decode as
+# aligned views of the message without copying.
+WIRE_FORMAT_VERSION = 1
+FRAME_MAGIC = b"RBF1"
+DECISIONS_MAGIC = b"RBD1"
+HEADER = struct.Struct("<4sHHII")
+
+# Columns of the float64 state block of a robot frame. Goals a robot does not have are NaN and the closest front
+# sensor distance is infinite without front sensors, it is the only front distance the arbiter reads.
+STATE_COLUMNS = [
+    "x", "y", "theta", "leader_x", "leader_y", "mapping_goal_x", "mapping_goal_y",
+    "path_point_x", "path_point_y", "prev_eP", "prev_eI", "closest_distance",
+]
+
+# Columns of the uint8 code block of a robot frame, the last column is reserved
+CODE_COLUMNS = ["status", "controller", "ir_count", "reserved"]
+
+# Columns of the float64 block of a decisions message
+DECISION_COLUMNS = ["velocity_left", "velocity_right", "prev_eP", "prev_eI"]
+
+
+def padded_size(size: int):
+    return (size + 7) // 8 * 8
+
+
+def read_header(data: bytes, magic: bytes):
+    """
+    Returns the frame id and robot count of a message, raises ValueError if it is not a message of this version
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"Message of {len(data)} bytes is shorter than the header")
+    message_magic, version, _, frame_id, count = HEADER.unpack_from(data)
+    if message_magic != magic:
+        raise ValueError(f"Unexpected message magic {message_magic!r}, expected {magic!r}")
+    if version != WIRE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported wire format version {version}")
+    return frame_id, count
+
+
+def encode_robot_frame(frame: RobotFrame, frame_id: int = 0):
+    """
+    Encodes a RobotFrame, the IR readings of every robot are sent in sensor order without padding
+    """
+    ir_counts = frame.ir_mask.sum(axis=1)
+    if frame.count > 0 and ir_counts.max() > 255:
+        raise ValueError("A robot frame carries at most 255 IR sensors per robot")
+
+    states = np.column_stack([getattr(frame, column) for column in STATE_COLUMNS]).astype("<f8").reshape(frame.count, len(STATE_COLUMNS))
+    codes = np.zeros((frame.count, len(CODE_COLUMNS)), dtype=np.uint8)
+    codes[:, 0] = frame.status
+    codes[:, 1] = frame.previous_controller
+    codes[:, 2] = ir_counts
+    readings = np.column_stack((frame.ir_x[frame.ir_mask], frame.ir_y[frame.ir_mask])).astype("<f8")
+    code_bytes = codes.tobytes()
+
+    return b"".join([
+        HEADER.pack(FRAME_MAGIC, WIRE_FORMAT_VERSION, 0, frame_id, frame.count),
+        states.tobytes(),
+        frame.ids.astype("<i8").tobytes(),
+        code_bytes + bytes(padded_size(len(code_bytes)) - len(code_bytes)),
+        readings.tobytes(),
+    ])
+
+
+def decode_robot_frame(data: bytes):
+    """
+    Decodes a robot frame message into its frame id and a RobotFrame backed by views of the message.
+    Validates the whole frame with array checks instead of one model per robot, raises ValueError if it is invalid.
+    """
+    frame_id, count = read_header(data, FRAME_MAGIC)
+
+    states_offset = HEADER.size
+    ids_offset = states_offset + count * len(STATE_COLUMNS) * 8
+    codes_offset = ids_offset + count * 8
+    readings_offset = codes_offset + padded_size(count * len(CODE_COLUMNS))
+    if len(data) < readings_offset:
+        raise ValueError(f"Message of {len(data)} bytes is too short for {count} robots")
+
+    codes = np.frombuffer(data, dtype=np.uint8, count=count * len(CODE_COLUMNS), offset=codes_offset).reshape(count, len(CODE_COLUMNS))
+    ir_counts = codes[:, 2].astype(np.int64)
+    reading_count = int(ir_counts.sum())
+    if len(data) != readings_offset + reading_count * 16:
+        raise ValueError(f"Message of {len(data)} bytes does not match {count} robots with {reading_count} IR readings")
+
+    states = np.frombuffer(data, dtype="<f8", count=count * len(STATE_COLUMNS), offset=states_offset).reshape(count, len(STATE_COLUMNS))
+    ids = np.frombuffer(data, dtype="<i8", count=count, offset=ids_offset)
+    readings = np.frombuffer(data, dtype="<f8", count=reading_count * 2, offset=readings_offset).reshape(reading_count, 2)
+
+    # Fast path validation of every robot at once
+    if np.any(codes[:, 0] > len(ROBOT_STATUSES)):
+        raise ValueError("Robot frame contains an unknown status code")
+    if np.any((codes[:, 1] < 1) | (codes[:, 1] > len(controller_code_dictionary))):
+        raise ValueError("Robot frame contains an unknown controller code")
+    if not np.all(np.isfinite(states[:, [0, 1, 2, 3, 4, 9, 10]])) or not np.all(np.isfinite(readings)):
+        raise ValueError("Robot frame contains non finite poses, leader positions, PID errors or IR readings")
+    goals = states[:, 5:9]
+    if np.any(np.isinf(goals)) or np.any(np.isnan(goals[:, [0, 2]]) != np.isnan(goals[:, [1, 3]])):
+        raise ValueError("Robot frame contains invalid mapping goals or path points")
+    if np.any(np.isnan(states[:, 11])) or np.any(states[:, 11] == -np.inf):
+        raise ValueError("Robot frame contains an invalid closest front sensor distance")
+
+    ir_x, ir_y, ir_mask = pad_readings(count, np.repeat(np.arange(count), ir_counts), readings)
+
+    return frame_id, RobotFrame(
+        ids,
+        codes[:, 0],
+        codes[:, 1].astype(np.int64),
+        states[:, 0:3],
+        states[:, 3:5],
+        states[:, 5:7],
+        states[:, 7:9],
+        states[:, 9:11],
+        states[:, 11],
+        ir_x, ir_y, ir_mask,
+    )
+
+
+def encode_decisions(ids: np.ndarray, controllers: np.ndarray, velocity_left: np.ndarray, velocity_right: np.ndarray,
+                     prev_eP: np.ndarray, prev_eI: np.ndarray, frame_id: int = 0):
+    """
+    Encodes the decision arrays of BatchArbiter.calculate_decisions, the controller is the ControllerType value
+    with 0 for robots without a controller
+    """
+    count = len(ids)
+    controller_bytes = np.asarray(controllers, dtype=np.uint8).tobytes()
+
+    return b"".join([
+        HEADER.pack(DECISIONS_MAGIC, WIRE_FORMAT_VERSION, 0, frame_id, count),
+        np.column_stack((velocity_left, velocity_right, prev_eP, prev_eI)).astype("<f8").reshape(count, len(DECISION_COLUMNS)).tobytes(),
+        np.asarray(ids).astype("<i8").tobytes(),
+        controller_bytes + bytes(padded_size(count) - count),
+    ])
+
+
+def decode_decisions(data: bytes):
+    """
+    Decodes a decisions message into its frame id, robot ids, controller values and (robots, 4) array of
+    wheel velocities and PID errors
+    """
+    frame_id, count = read_header(data, DECISIONS_MAGIC)
+
+    ids_offset = HEADER.size + count * len(DECISION_COLUMNS) * 8
+    controllers_offset = ids_offset + count * 8
+    if len(data) != controllers_offset + padded_size(count):
+        raise ValueError(f"Message of {len(data)} bytes does not match {count} decisions")
+
+    decisions = np.frombuffer(data, dtype="<f8", count=count * len(DECISION_COLUMNS), offset=HEADER.size).reshape(count, len(DECISION_COLUMNS))
+    ids = np.frombuffer(data, dtype="<i8", count=count, offset=ids_offset)
+    controllers = np.frombuffer(data, dtype=np.uint8, count=count, offset=controllers_offset)
+    return frame_id, ids, controllers, decisions
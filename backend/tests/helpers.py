@@ -0,0 +1,164 @@
+from math import sqrt
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+from src.api_models import _Robot
+
+
+STATUSES = ["MAPPING", "NAVIGATION", "FIND_LEADER", "COLLISION", "IDLE"]
+CONTROLLERS = ["GO_TO_GOAL", "AVOID_OBSTACLES", "REVERSE"]
+
+
+def generate_robots(count: int, seed: int = 0):
+    """
+    Generates robots with random poses, goals, sensor readings, statuses and PID state
+    """
+    rng = np.random.default_rng(seed)
+
+    def random_point():
+        return {"x": float(rng.uniform(0, 1400)), "y": float(rng.uniform(0, 900))}
+
+    robots = []
+    for idx in range(count):
+        robots.append(_Robot(**{
+            "id": idx,
+            "pose": {"vector": random_point(), "theta": float(rng.uniform(-np.pi, np.pi))},
+            "sensor_readings": [],
+            "mapping_goals": [random_point() for _ in range(rng.integers(0, 3))],
+            "status": STATUSES[rng.integers(0, len(STATUSES))],
+            "front_sensor_distances": [float(distance) for distance in rng.uniform(0, 40, rng.integers(0, 4))],
+            "ir_sensors": [{"reading": random_point()} for _ in range(rng.integers(0, 9))],
+            "leader_position": random_point(),
+            "path_points": [random_point() for _ in range(rng.integers(0, 3))],
+            "pid_metadata": {"prev_eP": float(rng.normal()), "prev_eI": float(rng.normal())},
+            "robots_within_signal_range": [],
+            "current_controller": CONTROLLERS[rng.integers(0, len(CONTROLLERS))],
+        }))
+    return robots
+
+
+def is_decision_close(decision: dict, batch_decision: dict, tolerance: float = 1e-9):
+    """
+    Returns True if two decisions select the same controller and their velocities and PID errors match within
+    the relative tolerance
+    """
+    if decision['robot_id'] != batch_decision['robot_id'] or decision['type'] != batch_decision['type']:
+        return False
+
+    payload, batch_payload = decision['payload'], batch_decision['payload']
+    values = [*payload['steering_input'], payload['pid_metadata']['prev_eP'], payload['pid_metadata']['prev_eI']]
+    batch_values = [*batch_payload['steering_input'], batch_payload['pid_metadata']['prev_eP'], batch_payload['pid_metadata']['prev_eI']]
+    return bool(np.allclose(values, batch_values, rtol=tolerance, atol=tolerance))
+
+
+def generate_regions(width: int, height: int, columns: int, rows: int):
+    """
+    Splits the map into a grid of regions, every region given by its four corners starting at the top left one
+    """
+    region_points = []
+    for row in range(rows):
+        for column in range(columns):
+            x_min, x_max = column * width // columns, (column + 1) * width // columns
+            y_min, y_max = row * height // rows, (row + 1) * height // rows
+            region_points.append([Point(x_min, y_min), Point(x_max, y_min), Point(x_max, y_max), Point(x_min, y_max)])
+    return region_points
+
+
+def generate_block_map(seed: int):
+    """
+    Returns an open map with random blocks, every block surrounded by cells with a proximity cost
+    """
+    rng = np.random.default_rng(seed)
+    final_map = np.full((161, 201), 255, dtype=np.uint8)
+    for _ in range(6):
+        y, x = rng.integers(0, 150), rng.integers(0, 190)
+        final_map[y:y + rng.integers(3, 30), x:x + rng.integers(3, 30)] = 0
+    return final_map
+
+
+def get_path_cost(occupancy_map: OccupancyMap, path: list):
+    """
+    Returns the cost A* gives the path: the length of every step plus the proximity cost of the cell it enters
+    """
+    cost_field = occupancy_map.get_cost_field()
+    return sum(sqrt((b.x - a.x) ** 2 + (b.y - a.y) ** 2) + cost_field[int(b.y), int(b.x)] for a, b in zip(path, path[1:]))
+
+
+class LegacyAStar(AStar):
+    """
+    The list based search and per cell window checks that AStar replaced, kept as the reference the tests compare against
+    """
+    def get_window(self, point: Point, size: int):
+        x, y = point.unpack()
+        x_min, y_min, x_max, y_max = x - size, y - size, x + size, y + size
+        window = np.zeros((size * 2, size * 2), dtype=np.uint8)
+
+        start_x, end_x, start_y, end_y = 0, size * 2, 0, size * 2
+        if x_min < 0:
+            start_x, x_min = abs(x_min), 0
+        if y_min < 0:
+            start_y, y_min = abs(y_min), 0
+        if x_max > self.width:
+            end_x, x_max = abs(self.width - x_max), self.width
+        if y_max > self.height:
+            end_y, y_max = abs(self.height - y_max), self.height
+
+        window[int(start_y):int(end_y), int(start_x):int(end_x)] = self.final_map[int(y_min):int(y_max), int(x_min):int(x_max)]
+        return window
+
+
+    def is_point_valid(self, point: Point):
+        size = self.occupancy_map.validity_window_size
+        window = self.get_window(point, size)
+        inverse_window = cv2.bitwise_not(window)
+        result = cv2.bitwise_and(inverse_window, np.full((size * 2, size * 2), 255, dtype=np.uint8))
+        return not np.sum(result) >= 255
+
+
+    def calculate_path_cost(self, point: Point):
+        inverse_window = cv2.bitwise_not(self.get_window(point, self.occupancy_map.cost_window_size))
+        row, col = inverse_window.shape
+        return np.sum(inverse_window) / (row * col)
+
+
+    def search(self, start_point: Point, goal_point: Point):
+        # Each node is [point, f, parent point]
+        frontier = [[start_point, self.calculate_euclidean_distance(start_point, goal_point), None]]
+        explored = []
+        goal_node = None
+        iterations = 0
+
+        while iterations < self.max_iterations:
+            if frontier[0][0].equal(goal_point):
+                goal_node = frontier[0]
+                break
+
+            node = frontier.pop(0)
+            self.number_of_expansions += 1
+            explored.append(node)
+
+            for neighbour in [node[0].add(action) for action in self.actions]:
+                if not (neighbour.x in range(0, self.width) and neighbour.y in range(0, self.height) and self.is_point_valid(neighbour)):
+                    continue
+                if not np.any([neighbour.equal(e[0]) for e in explored]) and not np.any([neighbour.equal(f[0]) for f in frontier]):
+                    frontier.append([neighbour, self.calculate_path_cost(neighbour) + self.calculate_euclidean_distance(neighbour, goal_point), node[0]])
+
+            frontier.sort(key=lambda x: x[1])
+            iterations = iterations + 1
+
+        if goal_node is None:
+            return ["Max Iterations Reached"]
+
+        path = [goal_node[0]]
+        while goal_node[2] is not None:
+            path.insert(0, goal_node[2])
+            for explored_node in explored:
+                if explored_node[0].equal(goal_node[2]):
+                    goal_node = explored_node
+                    break
+
+        return path
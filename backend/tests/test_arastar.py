@@ -0,0 +1,46 @@
+import numpy as np
+
+from algorithm.controllers.path_planning.arastar.arastar import ARAStar
+from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.plan_status import PlanStatus
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+from tests.helpers import generate_block_map, get_path_cost
+
+
+def test_suboptimality_bound_holds_when_stopped_early():
+    checked = 0
+    for seed in range(3):
+        occupancy_map = OccupancyMap(generate_block_map(seed))
+        ys, xs = np.nonzero(occupancy_map.get_validity_mask())
+        rng = np.random.default_rng(seed)
+
+        for start, goal in rng.integers(0, len(xs), (4, 2)):
+            start_point, goal_point = Point(int(xs[start]), int(ys[start])), Point(int(xs[goal]), int(ys[goal]))
+            astar = AStar(occupancy_map, heuristic_weight=1.0)
+            astar.max_iterations = 100000
+            optimal_path = astar.search(start_point, goal_point)
+            if astar.status != PlanStatus.FOUND:
+                continue
+            optimal_cost = get_path_cost(occupancy_map, optimal_path)
+
+            # The expansion cap stops the searches at different inflations, the budget is never what stops them
+            for max_iterations in [100, 400, 1600, 6400, 100000]:
+                planner = ARAStar(occupancy_map, time_budget_ms=60000)
+                planner.max_iterations = max_iterations
+                path = planner.search(start_point, goal_point)
+                if planner.status != PlanStatus.FOUND:
+                    assert planner.status == PlanStatus.MAX_ITERATIONS_REACHED
+                    continue
+
+                checked += 1
+                assert path[0].unpack() == start_point.unpack() and path[-1].unpack() == goal_point.unpack()
+                assert all(occupancy_map.is_point_valid(point) for point in path)
+                assert 1.0 <= planner.suboptimality_bound <= planner.heuristic_weight
+                assert get_path_cost(occupancy_map, path) <= planner.suboptimality_bound * optimal_cost + 1e-6
+
+            # Without a cap the search runs to the optimal path
+            assert planner.suboptimality_bound == 1.0
+            assert np.isclose(get_path_cost(occupancy_map, path), optimal_cost)
+
+    assert checked > 20
@@ -0,0 +1,100 @@
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.plan_status import PlanStatus
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+from tests.helpers import LegacyAStar
+
+
+def create_map(width: int = 160, height: int = 160):
+    """
+    Returns an open map with a few obstacles, away from the row the searches run along
+    """
+    final_map = np.full((height + 1, width + 1), 255, dtype=np.uint8)
+    final_map[5:12, 60:70] = 0
+    final_map[140:150, 100:104] = 0
+    final_map[30, 130] = 0
+    return final_map
+
+
+def get_coordinates(path: list):
+    return [point.unpack() for point in path]
+
+
+def test_layers_match_legacy_window_checks():
+    occupancy_map = OccupancyMap(create_map())
+    legacy = LegacyAStar(occupancy_map)
+    planner = AStar(occupancy_map)
+
+    # The legacy windows only line up with the map away from its bottom and right edges
+    size = occupancy_map.cost_window_size
+    rng = np.random.default_rng(0)
+    for x, y in zip(rng.integers(0, occupancy_map.width - size, 300), rng.integers(0, occupancy_map.height - size, 300)):
+        point = Point(int(x), int(y))
+        assert planner.is_point_valid(point) == legacy.is_point_valid(point)
+        assert np.isclose(planner.calculate_path_cost(point), legacy.calculate_path_cost(point))
+
+
+def test_path_matches_legacy_search():
+    occupancy_map = OccupancyMap(create_map())
+    start, goal = Point(40, 80), Point(120, 80)
+
+    path = AStar(occupancy_map).search(start, goal)
+    legacy_path = LegacyAStar(occupancy_map).search(start, goal)
+
+    assert get_coordinates(path) == get_coordinates(legacy_path)
+    assert get_coordinates(path) == [(x, 80) for x in range(40, 121)]
+
+
+def create_wall_map():
+    """
+    Returns an open map with a wall between the searches' start and goal
+    """
+    final_map = np.full((161, 161), 255, dtype=np.uint8)
+    final_map[50:110, 80:84] = 0
+    return final_map
+
+
+def test_path_around_obstacles_matches_legacy_search():
+    occupancy_map = OccupancyMap(create_wall_map())
+    start, goal = Point(40, 80), Point(120, 80)
+
+    path = AStar(occupancy_map).search(start, goal)
+    legacy = LegacyAStar(occupancy_map)
+    legacy.max_iterations = 20000
+    legacy_path = legacy.search(start, goal)
+
+    assert get_coordinates(path) == get_coordinates(legacy_path)
+    assert all(occupancy_map.is_point_valid(point) for point in path)
+    assert all(max(abs(a.x - b.x), abs(a.y - b.y)) == 1 for a, b in zip(path, path[1:]))
+
+
+def test_weighted_path_avoids_obstacles():
+    occupancy_map = OccupancyMap(create_wall_map())
+    planner = AStar(occupancy_map, heuristic_weight=1.0)
+    planner.max_iterations = 20000
+
+    path = planner.search(Point(40, 80), Point(120, 80))
+
+    assert get_coordinates(path)[0] == (40, 80) and get_coordinates(path)[-1] == (120, 80)
+    assert all(occupancy_map.is_point_valid(point) for point in path)
+    assert all(max(abs(a.x - b.x), abs(a.y - b.y)) == 1 for a, b in zip(path, path[1:]))
+
+
+def test_unreachable_goal_reports_no_path():
+    final_map = create_map()
+    final_map[:, 80:84] = 0
+    planner = AStar(OccupancyMap(final_map))
+    planner.max_iterations = 20000
+
+    assert planner.search(Point(40, 80), Point(120, 80)) == ["Max Iterations Reached"]
+    assert planner.status == PlanStatus.NO_PATH
+
+
+def test_iteration_cap_reports_max_iterations():
+    planner = AStar(OccupancyMap(create_wall_map()))
+    planner.max_iterations = 50
+
+    assert planner.search(Point(40, 80), Point(120, 80)) == ["Max Iterations Reached"]
+    assert planner.status == PlanStatus.MAX_ITERATIONS_REACHED
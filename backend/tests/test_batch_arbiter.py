@@ -0,0 +1,25 @@
+import pytest
+
+from algorithm.arbiter import Arbiter
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
+from src.api_models import _PayloadTypes
+from tests.helpers import generate_robots, is_decision_close
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_decisions_match_arbiter(seed: int):
+    robots = generate_robots(500, seed)
+
+    decisions = [Arbiter(robot).execute() for robot in robots]
+    batch_decisions = BatchArbiter(pack_robots(robots)).execute()
+
+    assert len(batch_decisions) == len(decisions)
+    for decision, batch_decision in zip(decisions, batch_decisions):
+        assert is_decision_close(decision, batch_decision), (decision, batch_decision)
+
+
+def test_every_controller_is_covered():
+    decisions = BatchArbiter(pack_robots(generate_robots(500))).execute()
+
+    assert {decision['type'] for decision in decisions} == {_PayloadTypes.gtg, _PayloadTypes.ao, _PayloadTypes.rv, None}
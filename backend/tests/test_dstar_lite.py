@@ -0,0 +1,82 @@
+import tempfile
+from math import inf, isclose
+
+import numpy as np
+
+from algorithm.controllers.mapping.map_store import MapStore
+from algorithm.controllers.path_planning.dstar_lite.dstar_lite import DStarLite
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+
+
+START, GOAL = Point(30, 120), Point(170, 120)
+
+
+def create_map():
+    final_map = np.full((241, 201), 255, dtype=np.uint8)
+    final_map[60:180, 100:104] = 0
+    return final_map
+
+
+def search(planner: DStarLite):
+    planner.update_start(START)
+    assert planner.compute_shortest_path()
+    return planner.extract_path()
+
+
+def get_path_cost(planner: DStarLite, path: list):
+    cells = [(int(point.x), int(point.y)) for point in path]
+    return sum(planner.get_edge_cost(a, b) for a, b in zip(cells, cells[1:]))
+
+
+def assert_matches_fresh_search(planner: DStarLite, occupancy_map: OccupancyMap):
+    path = search(planner)
+    fresh_planner = DStarLite(occupancy_map, GOAL)
+    fresh_path = search(fresh_planner)
+
+    assert fresh_planner.g.get(fresh_planner.start, inf) < inf
+    assert isclose(planner.g.get(planner.start, inf), fresh_planner.g[fresh_planner.start], rel_tol=1e-9)
+    assert isclose(get_path_cost(fresh_planner, path), get_path_cost(fresh_planner, fresh_path), rel_tol=1e-9)
+
+
+def test_repair_matches_fresh_search_after_map_edits():
+    final_map = create_map()
+    planner = DStarLite(OccupancyMap(final_map.copy(), 1), GOAL)
+    search(planner)
+
+    # Block the shorter way around the wall, then open a gap through it
+    edits = [(slice(0, 60), slice(100, 104), 0), (slice(90, 150), slice(100, 104), 255), (slice(150, 241), slice(140, 144), 0)]
+    for version, (rows, columns, value) in enumerate(edits, start=2):
+        final_map[rows, columns] = value
+        occupancy_map = OccupancyMap(final_map.copy(), version)
+        assert planner.update_map(occupancy_map) > 0
+        assert_matches_fresh_search(planner, occupancy_map)
+
+
+def test_repair_matches_fresh_search_on_patched_versions():
+    store = MapStore(tempfile.mkdtemp() + "/")
+    final_map = create_map()
+    snapshot = store.publish(final_map, final_map.copy())
+    planner = DStarLite(snapshot, GOAL)
+    search(planner)
+
+    # Walls added through the store are only known to the planner from the change log
+    for y_min, y_max, x in [(0, 60, 100), (0, 100, 140), (160, 241, 160)]:
+        y, x = np.mgrid[y_min:y_max, x:x + 4]
+        window = np.full((y_max - y_min, 4), 0, dtype=np.uint8)
+        snapshot = store.publish_patch(snapshot, x.ravel(), y.ravel(), [(y_min, int(x.min()), window)])
+        assert planner.update_map(snapshot) > 0
+        assert_matches_fresh_search(planner, OccupancyMap(snapshot.final_map.copy()))
+
+
+def test_repair_restarts_when_the_change_log_is_gone():
+    store = MapStore(tempfile.mkdtemp() + "/")
+    final_map = create_map()
+    snapshot = store.publish(final_map, final_map.copy())
+    planner = DStarLite(snapshot, GOAL)
+    search(planner)
+
+    snapshot = store.publish_patch(snapshot, np.array([200]), np.array([20]), [(20, 200, np.zeros((1, 1), dtype=np.uint8))])
+    snapshot.changes = []
+    assert planner.update_map(snapshot) is None
+    assert_matches_fresh_search(planner, OccupancyMap(snapshot.final_map.copy()))
@@ -0,0 +1,186 @@
+import tempfile
+
+import cv2
+import numpy as np
+
+from algorithm.controllers.mapping.incremental_map import IncrementalMap
+from algorithm.controllers.mapping.map_store import MapStore
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from models.occupancy_map import OccupancyMap
+from src.planning_pool import SharedMapDirectory, attach_map
+import src.settings as settings
+from tests.helpers import generate_regions
+
+
+WIDTH, HEIGHT = 320, 240
+REGION_POINTS = generate_regions(WIDTH, HEIGHT, 2, 2)
+
+
+def generate_deltas(count: int, seed: int = 0):
+    """
+    Generates batches of readings along random walls, each batch spread over the regions
+    """
+    rng = np.random.default_rng(seed)
+    deltas = []
+    for _ in range(count):
+        start = rng.uniform([0, 0], [WIDTH, HEIGHT])
+        direction = rng.normal(size=2)
+        readings = start + np.outer(rng.uniform(0, 60, 40), direction / np.linalg.norm(direction)) + rng.normal(0, 1, (40, 2))
+        readings = np.clip(readings, 0, [WIDTH, HEIGHT])
+        sensor_readings = [readings[idx::len(REGION_POINTS)] for idx in range(len(REGION_POINTS))]
+        deltas.append([SensorReadingsPerRegion(idx, region_readings) for idx, region_readings in enumerate(sensor_readings)])
+    return deltas
+
+
+def build_map(deltas: list):
+    """
+    Builds the map and its layers from every reading of the deltas at once
+    """
+    sensor_readings = [
+        SensorReadingsPerRegion(idx, np.concatenate([delta[idx].sensor_readings for delta in deltas]).reshape(-1, 2))
+        for idx in range(len(REGION_POINTS))
+    ]
+    return Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, sensor_readings).build_map()
+
+
+def assert_same_map(snapshot: OccupancyMap, final_map_opened: np.ndarray):
+    expected = OccupancyMap(final_map_opened)
+    assert np.array_equal(snapshot.final_map, expected.final_map)
+    assert np.array_equal(snapshot.get_validity_mask(), expected.get_validity_mask())
+    assert np.array_equal(snapshot.get_cost_field(), expected.get_cost_field())
+
+
+def create_incremental_map():
+    store = MapStore(tempfile.mkdtemp() + "/")
+    return IncrementalMap(store, settings.MAP_UPDATE_TILE_PX), store
+
+
+def test_deltas_match_full_rebuild():
+    incremental_map, store = create_incremental_map()
+    empty_map = np.full((HEIGHT + 1, WIDTH + 1), 255, dtype=np.uint8)
+    first = incremental_map.reset(empty_map, empty_map.copy())
+
+    deltas = generate_deltas(20)
+    for idx, delta in enumerate(deltas):
+        snapshot, changed_pixels = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+        assert changed_pixels > 0
+        assert snapshot is store.get_snapshot()
+
+        final_map, final_map_opened = build_map(deltas[:idx + 1])
+        assert_same_map(snapshot, final_map_opened)
+        assert np.array_equal(store.get_maps()[1], final_map)
+
+    # Every version was patched from the first one
+    assert snapshot.lineage == first.lineage
+    assert snapshot.get_changes(first.version) is not None
+
+
+def test_deltas_leave_earlier_snapshots_unchanged():
+    incremental_map, store = create_incremental_map()
+    empty_map = np.full((HEIGHT + 1, WIDTH + 1), 255, dtype=np.uint8)
+    snapshots = [incremental_map.reset(empty_map, empty_map.copy())]
+    copies = [(snapshots[0].final_map.copy(), snapshots[0].get_validity_mask().copy(), snapshots[0].get_cost_field().copy())]
+
+    for delta in generate_deltas(10):
+        snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+        snapshots.append(snapshot)
+        copies.append((snapshot.final_map.copy(), snapshot.get_validity_mask().copy(), snapshot.get_cost_field().copy()))
+
+    for snapshot, (final_map, validity_mask, cost_field) in zip(snapshots, copies):
+        assert np.array_equal(snapshot.final_map, final_map)
+        assert np.array_equal(snapshot.get_validity_mask(), validity_mask)
+        assert np.array_equal(snapshot.get_cost_field(), cost_field)
+
+
+def test_deltas_reuse_the_buffers_of_dropped_snapshots():
+    incremental_map, store = create_incremental_map()
+    deltas = generate_deltas(10)
+
+    # Only the store and the incremental map hold the current snapshot, earlier buffers are reused
+    for delta in deltas:
+        incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+    assert store.get_stats()["reused_buffers"] > 0
+
+    final_map, final_map_opened = build_map(deltas)
+    snapshot, store_final_map = store.get_maps()
+    assert_same_map(snapshot, final_map_opened)
+    assert np.array_equal(store_final_map, final_map)
+
+
+def test_repeated_delta_changes_nothing():
+    incremental_map, store = create_incremental_map()
+    delta = generate_deltas(1)[0]
+    mapping = Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta)
+
+    snapshot, changed_pixels = incremental_map.apply_delta(mapping)
+    assert changed_pixels > 0
+    assert incremental_map.apply_delta(mapping) == (snapshot, 0)
+    assert store.get_version() == snapshot.version
+
+
+def test_deltas_continue_from_the_map_in_memory():
+    incremental_map, store = create_incremental_map()
+    deltas = generate_deltas(4)
+
+    # Another writer publishes a map, the readings are added to the raw grid it published
+    final_map, final_map_opened = build_map(deltas[:2])
+    store.publish(final_map, final_map_opened)
+
+    for delta in deltas[2:]:
+        snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+    assert_same_map(snapshot, build_map(deltas)[1])
+
+
+def test_flush_writes_the_latest_version():
+    incremental_map, store = create_incremental_map()
+    for delta in generate_deltas(5):
+        snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+
+    assert store.flush(10)
+    assert store.persisted_version == snapshot.version
+    assert np.array_equal(cv2.imread(store.save_dir + store.final_map_opened_name, cv2.IMREAD_GRAYSCALE), snapshot.final_map)
+    assert np.array_equal(cv2.imread(store.save_dir + store.final_map_name, cv2.IMREAD_GRAYSCALE), store.get_maps()[1])
+
+
+def test_shared_map_files_follow_the_deltas():
+    incremental_map, store = create_incremental_map()
+    shared_maps = SharedMapDirectory(2)
+    deltas = generate_deltas(6)
+
+    try:
+        for delta in deltas:
+            snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, delta))
+            shared_map = shared_maps.share(snapshot)
+            attached_map = attach_map(shared_map)
+
+            assert shared_map.version == snapshot.version
+            assert np.array_equal(attached_map.final_map, snapshot.final_map)
+            assert np.array_equal(attached_map.get_validity_mask(), snapshot.get_validity_mask())
+            assert np.array_equal(attached_map.get_cost_field(), snapshot.get_cost_field())
+            shared_maps.release(shared_map)
+
+        # Once released, every version was written to the files of the first one
+        assert len(shared_maps.shared_maps) == 1
+    finally:
+        shared_maps.close()
+
+
+def test_shared_map_files_are_not_written_while_read():
+    incremental_map, store = create_incremental_map()
+    shared_maps = SharedMapDirectory(2)
+    deltas = generate_deltas(2)
+
+    try:
+        snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, deltas[0]))
+        shared_map = shared_maps.share(snapshot)
+        attached_map = attach_map(shared_map)
+        final_map = snapshot.final_map.copy()
+
+        # A plan still reads the first version, the next one is written to other files
+        next_snapshot, _ = incremental_map.apply_delta(Mapping(WIDTH, HEIGHT, len(REGION_POINTS), REGION_POINTS, deltas[1]))
+        next_shared_map = shared_maps.share(next_snapshot)
+        assert next_shared_map.paths != shared_map.paths
+        assert np.array_equal(attached_map.final_map, final_map)
+        assert np.array_equal(attach_map(next_shared_map).final_map, next_snapshot.final_map)
+    finally:
+        shared_maps.close()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from algorithm.controllers.path_planning.astar.astar import AStar
+from algorithm.controllers.path_planning.jps.jps import JumpPointSearch
+from algorithm.controllers.path_planning.plan_status import PlanStatus
+from models.occupancy_map import OccupancyMap
+from models.point import Point
+from tests.helpers import generate_block_map, get_path_cost
+
+
+def test_path_cost_matches_astar_around_obstacles():
+    compared = 0
+    for seed in range(4):
+        occupancy_map = OccupancyMap(generate_block_map(seed))
+        assert (occupancy_map.get_cost_field()[occupancy_map.get_validity_mask()] > 0).any()
+
+        ys, xs = np.nonzero(occupancy_map.get_validity_mask())
+        rng = np.random.default_rng(seed)
+        for start, goal in rng.integers(0, len(xs), (5, 2)):
+            start_point, goal_point = Point(int(xs[start]), int(ys[start])), Point(int(xs[goal]), int(ys[goal]))
+            astar = AStar(occupancy_map, heuristic_weight=1.0)
+            jps = JumpPointSearch(occupancy_map, heuristic_weight=1.0)
+            astar.max_iterations = jps.max_iterations = 100000
+
+            astar_path = astar.search(start_point, goal_point)
+            path = jps.search(start_point, goal_point)
+
+            assert jps.status == astar.status
+            if astar.status != PlanStatus.FOUND:
+                continue
+            compared += 1
+            assert path[0].unpack() == start_point.unpack() and path[-1].unpack() == goal_point.unpack()
+            assert all(occupancy_map.is_point_valid(point) for point in path)
+            assert all(max(abs(a.x - b.x), abs(a.y - b.y)) == 1 for a, b in zip(path, path[1:]))
+            assert np.isclose(get_path_cost(occupancy_map, path), get_path_cost(occupancy_map, astar_path))
+
+    assert compared > 10
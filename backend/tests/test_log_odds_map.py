@@ -0,0 +1,62 @@
+import tempfile
+
+import numpy as np
+
+from algorithm.controllers.mapping.log_odds_map import LogOddsMap, trace_rays
+from algorithm.controllers.mapping.map_store import MapStore
+import src.settings as settings
+
+
+def trace_ray(origin: tuple, end: tuple):
+    """
+    Reference traversal of a single ray, one cell per step along its major axis
+    """
+    x0, y0, x1, y1 = round(origin[0]), round(origin[1]), round(end[0]), round(end[1])
+    steps = max(abs(x1 - x0), abs(y1 - y0))
+    return [(round(x0 + (x1 - x0) * step / steps), round(y0 + (y1 - y0) * step / steps)) for step in range(steps)]
+
+
+def test_rays_include_their_origin_and_exclude_their_end():
+    x, y = trace_rays(np.array([[2.0, 3.0]]), np.array([[7.0, 3.0]]))
+
+    assert list(zip(x.tolist(), y.tolist())) == [(2, 3), (3, 3), (4, 3), (5, 3), (6, 3)]
+
+
+def test_rays_of_a_batch_match_single_rays():
+    rng = np.random.default_rng(0)
+    origins = rng.uniform(0, 100, (200, 2))
+    ends = origins + rng.uniform(-40, 40, (200, 2))
+    ends[:5] = origins[:5]
+
+    x, y = trace_rays(origins, ends)
+
+    expected = [cell for origin, end in zip(origins, ends) for cell in trace_ray(origin, end)]
+    assert list(zip(x.tolist(), y.tolist())) == expected
+
+
+def test_ray_cells_are_neighbours_and_end_next_to_the_end():
+    rng = np.random.default_rng(1)
+    for origin, end in zip(rng.integers(0, 50, (50, 2)), rng.integers(0, 50, (50, 2))):
+        if np.array_equal(origin, end):
+            continue
+        x, y = trace_rays(origin[None].astype(np.float64), end[None].astype(np.float64))
+        assert (x[0], y[0]) == tuple(origin)
+        assert len(x) == np.abs(end - origin).max()
+        step_x, step_y = np.abs(np.diff(np.r_[x, end[0]])), np.abs(np.diff(np.r_[y, end[1]]))
+        assert np.all(np.maximum(step_x, step_y) == 1)
+
+
+def test_hits_are_published_and_cleared_by_later_rays():
+    store = MapStore(tempfile.mkdtemp() + "/")
+    log_odds_map = LogOddsMap(store, settings.MAP_UPDATE_TILE_PX)
+    origins, ends = np.array([[10.0, 20.0]]), np.array([[40.0, 20.0]])
+
+    snapshot, changed_pixels = log_odds_map.apply_frame(60, 40, origins, ends, np.array([True]))
+    assert changed_pixels == 1
+    assert snapshot.final_map[20, 40] == 0 and np.count_nonzero(snapshot.final_map == 0) == 1
+
+    # Rays through the cell lower its log odds until it is free again
+    for _ in range(int(np.ceil(settings.LOG_ODDS_HIT / -settings.LOG_ODDS_MISS))):
+        snapshot, _ = log_odds_map.apply_frame(60, 40, origins, np.array([[50.0, 20.0]]), np.array([False]))
+    assert snapshot.final_map[20, 40] == 255
+    assert snapshot is store.get_snapshot()
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from src.planning_scheduler import PlanningDropped, PlanningScheduler
+
+
+async def wait_for_event(event: asyncio.Event, result):
+    await event.wait()
+    return result
+
+
+async def get_result(result):
+    return result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_newer_request_supersedes_queued_request():
+    async def run():
+        scheduler = PlanningScheduler(10, 1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit(0, 1, 10000, lambda: wait_for_event(release, "running")))
+        await settle()
+        older = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("older")))
+        await settle()
+        newer = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("newer")))
+        await settle()
+
+        with pytest.raises(PlanningDropped) as dropped:
+            await older
+        assert dropped.value.reason == "SUPERSEDED"
+
+        release.set()
+        assert await running == "running"
+        assert await newer == "newer"
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+    assert stats["drops"]["SUPERSEDED"] == 1 and stats["completed"] == 2
+
+
+def test_superseded_running_request_discards_its_plan():
+    async def run():
+        scheduler = PlanningScheduler(10, 2)
+        release = asyncio.Event()
+        older = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: wait_for_event(release, "older")))
+        await settle()
+        newer = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("newer")))
+        assert await newer == "newer"
+
+        release.set()
+        with pytest.raises(PlanningDropped) as dropped:
+            await older
+        assert dropped.value.reason == "SUPERSEDED"
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["completed"] == 1
+
+
+def test_cancelled_queued_request_is_dropped():
+    async def run():
+        scheduler = PlanningScheduler(10, 1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit(0, 1, 10000, lambda: wait_for_event(release, "running")))
+        await settle()
+        queued = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("queued")))
+        await settle()
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        assert await running == "running"
+        assert await scheduler.submit(1, 1, 10000, lambda: get_result("next")) == "next"
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+    assert stats["drops"]["CANCELLED"] == 1
+
+
+def test_request_cancelled_after_admission_releases_its_slot():
+    async def run():
+        scheduler = PlanningScheduler(10, 1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit(0, 1, 10000, lambda: wait_for_event(release, "running")))
+        await settle()
+        queued = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("queued")))
+        await settle()
+
+        # The running plan finishes and admits the queued request, a newer request of the same robot supersedes it
+        # and it is cancelled before it resumes
+        release.set()
+        newer = asyncio.create_task(scheduler.submit(1, 1, 10000, lambda: get_result("newer")))
+        queued.cancel()
+
+        assert await running == "running"
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert await asyncio.wait_for(newer, 1) == "newer"
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+    assert stats["drops"]["SUPERSEDED"] == 1 and stats["completed"] == 2
+
+
+def test_request_still_queued_at_its_deadline_expires():
+    async def run():
+        scheduler = PlanningScheduler(10, 1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit(0, 1, 10000, lambda: wait_for_event(release, "running")))
+        await settle()
+
+        with pytest.raises(PlanningDropped) as dropped:
+            await scheduler.submit(1, 1, 20, lambda: get_result("late"))
+        assert dropped.value.reason == "EXPIRED"
+
+        release.set()
+        await running
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["queue_depth"] == 0 and stats["drops"]["EXPIRED"] == 1
+
+
+def test_full_queue_sheds_the_least_urgent_request():
+    async def run():
+        scheduler = PlanningScheduler(2, 1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit(0, 0, 10000, lambda: wait_for_event(release, "running")))
+        await settle()
+        mapping = asyncio.create_task(scheduler.submit(1, 2, 10000, lambda: get_result("mapping")))
+        navigation = asyncio.create_task(scheduler.submit(2, 1, 10000, lambda: get_result("navigation")))
+        collision = asyncio.create_task(scheduler.submit(3, 0, 10000, lambda: get_result("collision")))
+        await settle()
+
+        with pytest.raises(PlanningDropped) as dropped:
+            await mapping
+        assert dropped.value.reason == "SHED"
+
+        release.set()
+        await running
+        assert await collision == "collision" and await navigation == "navigation"
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 0 and stats["drops"]["SHED"] == 1
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from algorithm.controllers.mapping.mapping import Mapping, SensorReadingsPerRegion
+from algorithm.controllers.mapping.reading_store import ReadingStore, convert_map_json
+from models.point import Point
+import src.settings as settings
+from tests.helpers import generate_regions
+
+
+def create_mapping(seed: int = 0):
+    """
+    Returns a mapping with readings given as points, the way older versions received them
+    """
+    rng = np.random.default_rng(seed)
+    region_points = generate_regions(200, 100, 2, 1)
+    sensor_readings = [
+        SensorReadingsPerRegion(idx, [Point(float(x), float(y)) for x, y in rng.uniform([idx * 100, 0], [(idx + 1) * 100, 100], (30, 2))])
+        for idx in range(len(region_points))
+    ]
+    return Mapping(200, 100, len(region_points), region_points, sensor_readings)
+
+
+def write_map_json(directory: str, data):
+    """
+    Writes map.json as older versions of Mapping.store_raw_data did
+    """
+    json_path = os.path.join(directory, "map.json")
+    with open(json_path, "w") as map_file:
+        map_file.write(json.dumps(data))
+    return json_path
+
+
+def test_map_json_converts_to_the_same_map():
+    directory = tempfile.mkdtemp()
+    mapping = create_mapping()
+    json_path = write_map_json(directory, {
+        "width": mapping.width,
+        "height": mapping.height,
+        "number_of_regions": mapping.number_of_regions,
+        "regions": mapping.convert_regions_to_tuples(False),
+        "sensor_readings": mapping.convert_sensor_readings_per_region_to_dict(False),
+    })
+    store = ReadingStore(os.path.join(directory, "readings/"), settings.READING_STORE_MAX_SEGMENTS)
+
+    assert convert_map_json(json_path, store) == 60
+
+    loaded = store.load()
+    assert (loaded.width, loaded.height, loaded.number_of_regions) == (mapping.width, mapping.height, mapping.number_of_regions)
+    assert loaded.convert_regions_to_tuples(False) == mapping.convert_regions_to_tuples(False)
+    for readings, expected in zip(loaded.sensor_readings, mapping.sensor_readings):
+        assert readings.region_number == expected.region_number
+        assert np.array_equal(readings.sensor_readings, mapping.convert_readings_to_array(expected.sensor_readings))
+
+    final_map, final_map_opened = store.replay()
+    expected_map, expected_map_opened = mapping.build_map()
+    assert np.array_equal(final_map, expected_map) and np.array_equal(final_map_opened, expected_map_opened)
+
+
+def test_cleared_map_json_converts_nothing():
+    directory = tempfile.mkdtemp()
+    store = ReadingStore(os.path.join(directory, "readings/"), settings.READING_STORE_MAX_SEGMENTS)
+
+    assert convert_map_json(write_map_json(directory, ""), store) == 0
+    with open(os.path.join(directory, "empty.json"), "w"):
+        pass
+    assert convert_map_json(os.path.join(directory, "empty.json"), store) == 0
+    assert store.load() is None
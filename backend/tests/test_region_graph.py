@@ -0,0 +1,130 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from algorithm.controllers.path_planning.region_graph import RegionGraph, calculate_distance, get_region_centre
+from models.point import Point
+from models.region import Region
+from tests.helpers import generate_regions
+
+
+def create_regions(columns: int, rows: int, seed: int, isolated_ids: tuple = ()):
+    """
+    Returns a grid of regions joined to the regions beside them, through entry points placed at random along their
+    shared borders, with some connections left out. The isolated regions are not joined to any region.
+    """
+    rng = np.random.default_rng(seed)
+    corners = generate_regions(columns * 100, rows * 100, columns, rows)
+
+    neighbours = {idx: [] for idx in range(len(corners))}
+    for idx in range(len(corners)):
+        row, column = divmod(idx, columns)
+        for other in ([idx + 1] if column + 1 < columns else []) + ([idx + columns] if row + 1 < rows else []):
+            if idx not in isolated_ids and other not in isolated_ids and rng.random() < 0.8:
+                neighbours[idx].append(other)
+                neighbours[other].append(idx)
+
+    regions = []
+    for idx, points in enumerate(corners):
+        entry_points = []
+        for other in neighbours[idx]:
+            # Entry points lie inside the region, a random distance along the border it shares with the neighbour
+            if abs(other - idx) == 1:
+                x = points[0].x + 5 if other < idx else points[2].x - 5
+                entry_points.append(Point(x, points[0].y + int(rng.integers(5, 95))))
+            else:
+                y = points[0].y + 5 if other < idx else points[2].y - 5
+                entry_points.append(Point(points[0].x + int(rng.integers(5, 95)), y))
+        regions.append(Region(idx, points, entry_points, neighbours[idx]))
+    return regions
+
+
+def search_bfs(regions: list, start_id: int, goal_id: int):
+    """
+    Returns the route with the fewest regions from the start to the goal region like the BFS the region graph
+    replaced, None if the goal can not be reached
+    """
+    parents = {start_id: None}
+    frontier = deque([start_id])
+    while frontier:
+        region_id = frontier.popleft()
+        for neighbour_id in regions[region_id].connected_region_ids:
+            if neighbour_id not in parents:
+                parents[neighbour_id] = region_id
+                frontier.append(neighbour_id)
+
+    if goal_id not in parents:
+        return None
+    route = [goal_id]
+    while parents[route[-1]] is not None:
+        route.append(parents[route[-1]])
+    return list(reversed(route))
+
+
+def get_route_length(regions: list, route: list):
+    """
+    Returns the distance from the centre of the start region through the entry points of the route to the centre
+    of the goal region
+    """
+    points = [get_region_centre(regions[route[0]])]
+    points += [regions[route[idx + 1]].get_entry_point(route[idx]) for idx in range(len(route) - 1)]
+    points.append(get_region_centre(regions[route[-1]]))
+    return sum(calculate_distance(a, b) for a, b in zip(points, points[1:]))
+
+
+def test_routes_match_bfs_reachability_and_are_no_longer():
+    regions = create_regions(5, 4, 0, isolated_ids=(19,))
+    region_graph = RegionGraph(regions)
+
+    shorter = 0
+    for start in regions:
+        for goal in regions:
+            bfs_route = search_bfs(regions, start.id, goal.id)
+            if bfs_route is None:
+                with pytest.raises(ValueError):
+                    region_graph.get_route(start.id, goal.id)
+                continue
+            if start.id == goal.id:
+                assert region_graph.get_route(start.id, goal.id) == []
+                assert region_graph.get_entry_points(start.id, goal.id) == []
+                continue
+
+            route = region_graph.get_route(start.id, goal.id)
+            assert route[0] == start.id and route[-1] == goal.id
+            assert all(regions[b].get_entry_point(a) is not None for a, b in zip(route, route[1:]))
+            assert len(route) >= len(bfs_route)
+            assert get_route_length(regions, route) <= get_route_length(regions, bfs_route) + 1e-9
+            shorter += get_route_length(regions, route) < get_route_length(regions, bfs_route) - 1e-9
+
+    # The grid has loops, so routes by distance must differ from routes by number of regions somewhere
+    assert shorter > 0
+
+
+def test_routes_match_bfs_without_loops():
+    # A corridor of regions has a single route between any two of them
+    regions = []
+    for idx, points in enumerate(generate_regions(600, 100, 6, 1)):
+        connected_region_ids = [other for other in (idx - 1, idx + 1) if 0 <= other < 6]
+        entry_points = [Point(points[0].x + 5 if other < idx else points[2].x - 5, 50) for other in connected_region_ids]
+        regions.append(Region(idx, points, entry_points, connected_region_ids))
+    region_graph = RegionGraph(regions)
+
+    for start in regions:
+        for goal in regions:
+            bfs_route = search_bfs(regions, start.id, goal.id)
+            assert region_graph.get_route(start.id, goal.id) == (bfs_route if start.id != goal.id else [])
+            assert len(region_graph.get_entry_points(start.id, goal.id)) == abs(goal.id - start.id)
+
+
+def test_unconnected_regions_raise():
+    regions = create_regions(3, 3, 2, isolated_ids=(4,))
+    region_graph = RegionGraph(regions)
+
+    assert region_graph.get_route(4, 4) == []
+    for region in regions:
+        if region.id != 4:
+            with pytest.raises(ValueError):
+                region_graph.get_route(region.id, 4)
+            with pytest.raises(ValueError):
+                region_graph.get_entry_points(4, region.id)
@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+
+from algorithm.controllers.path_planning.region_store import RegionSetStore, is_etag_matched
+import src.main as main
+import src.utils as utils
+from src.api_models import _RegionSet
+
+
+def create_region_set(width: int = 600):
+    def create_region(idx: int, x_min: int, x_max: int, connected_region_ids: list):
+        return {
+            "id": idx,
+            "points": [{"x": x_min, "y": 0}, {"x": x_max, "y": 0}, {"x": x_max, "y": 400}, {"x": x_min, "y": 400}],
+            "entry_points": [{"x": x_max - 10, "y": 200}],
+            "connected_region_ids": connected_region_ids,
+        }
+    return {"regions": [create_region(0, 0, width // 2, [1]), create_region(1, width // 2, width, [0])]}
+
+
+def test_etag_matching():
+    assert is_etag_matched('"abc"', '"abc"')
+    assert is_etag_matched('W/"abc"', '"abc"')
+    assert is_etag_matched('"other", "abc"', '"abc"')
+    assert is_etag_matched("*", '"abc"')
+    assert not is_etag_matched('"other"', '"abc"')
+    assert not is_etag_matched(None, '"abc"')
+
+
+def test_store_keys_region_sets_by_content_and_evicts():
+    store = RegionSetStore(1)
+    regions = utils.transform_region_set_api_model(_RegionSet(**create_region_set()))
+    region_set_id = store.register(regions)
+
+    assert store.register(utils.transform_region_set_api_model(_RegionSet(**create_region_set()))) == region_set_id
+    assert store.get(region_set_id) is regions
+
+    other_id = store.register(utils.transform_region_set_api_model(_RegionSet(**create_region_set(800))))
+    assert other_id != region_set_id
+    assert store.get(region_set_id) is None
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_upload_and_revalidate():
+    client = TestClient(main.app)
+
+    response = client.post("/regions/", json=create_region_set())
+    assert response.status_code == 200
+    region_set_id = response.json()["region_set_id"]
+    etag = response.headers["ETag"]
+    assert etag == f'"{region_set_id}"'
+
+    response = client.get(f"/regions/{region_set_id}")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert response.json()["number_of_regions"] == 2
+
+    response = client.get(f"/regions/{region_set_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_unknown_region_set_is_not_found():
+    client = TestClient(main.app)
+
+    assert client.get("/regions/unknown").status_code == 404
+
+    robot = {
+        "id": 0, "pose": {"vector": {"x": 100, "y": 200}, "theta": 0}, "sensor_readings": [], "mapping_goals": [],
+        "status": "NAVIGATION", "front_sensor_distances": [], "ir_sensors": [], "leader_position": {"x": 0, "y": 0},
+        "path_points": [], "current_goal": {"x": 500, "y": 200}, "pid_metadata": {"prev_eP": 0, "prev_eI": 0},
+        "robots_within_signal_range": [], "current_controller": "GO_TO_GOAL",
+    }
+    response = client.post("/plan_path/?region_set_id=unknown", json={"robot": robot})
+    assert response.status_code == 404
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from algorithm.batch_arbiter import BatchArbiter
+from models.robot_frame import pack_robots
+from src.wire_format import STATE_COLUMNS, decode_decisions, decode_robot_frame, encode_decisions, encode_robot_frame
+from tests.helpers import generate_robots
+
+
+def test_robot_frame_round_trip():
+    frame = pack_robots(generate_robots(200))
+
+    frame_id, decoded = decode_robot_frame(encode_robot_frame(frame, 42))
+
+    assert frame_id == 42
+    assert decoded.count == frame.count
+    for column in ["ids", "status", "previous_controller", "has_mapping_goal", "has_path_point", *STATE_COLUMNS]:
+        assert np.array_equal(getattr(decoded, column), getattr(frame, column), equal_nan=True), column
+    assert np.array_equal(decoded.ir_x[decoded.ir_mask], frame.ir_x[frame.ir_mask])
+    assert np.array_equal(decoded.ir_y[decoded.ir_mask], frame.ir_y[frame.ir_mask])
+    assert np.array_equal(decoded.ir_mask.sum(axis=1), frame.ir_mask.sum(axis=1))
+
+
+def test_empty_robot_frame_round_trip():
+    frame_id, decoded = decode_robot_frame(encode_robot_frame(pack_robots([]), 7))
+
+    assert frame_id == 7
+    assert decoded.count == 0
+
+
+def test_decisions_round_trip():
+    frame = pack_robots(generate_robots(200))
+    controllers, *values = BatchArbiter(frame).calculate_decisions()
+
+    frame_id, ids, decoded_controllers, decisions = decode_decisions(encode_decisions(frame.ids, controllers, *values, frame_id=3))
+
+    assert frame_id == 3
+    assert np.array_equal(ids, frame.ids)
+    assert np.array_equal(decoded_controllers, controllers)
+    assert np.array_equal(decisions, np.column_stack(values))
+
+
+def test_decoded_frame_makes_the_same_decisions():
+    frame = pack_robots(generate_robots(200))
+    _, decoded = decode_robot_frame(encode_robot_frame(frame))
+
+    for expected, decision in zip(BatchArbiter(frame).calculate_decisions(), BatchArbiter(decoded).calculate_decisions()):
+        assert np.array_equal(expected, decision)
+
+
+def test_invalid_messages_are_rejected():
+    message = encode_robot_frame(pack_robots(generate_robots(10)))
+
+    with pytest.raises(ValueError):
+        decode_robot_frame(message[:10])
+    with pytest.raises(ValueError):
+        decode_robot_frame(message[:-8])
+    with pytest.raises(ValueError):
+        decode_robot_frame(b"XXXX" + message[4:])
+    with pytest.raises(ValueError):
+        decode_decisions(message)
@@ -385,7 +385,10 @@ const Canvas = (props: CanvasProp) => {
           const robot = robots[idx];
 
           if (operation === RobotWorkerOperation.PLAN_PATH.toString()) {
-            if (payload.flat().length > 0) {
+            if (!payload) {
+              // No answer yet, the request was dropped by the planning scheduler or failed and the worker backed off.
+              // The robot keeps its goal and plans again
+            } else if (payload.flat().length > 0) {
               if (typeof payload.flat()[0] === "string") {
                 simulator.removeGoal(robot, true);
               } else {
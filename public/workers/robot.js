@@ -3,15 +3,87 @@ const API_HEADERS = {
   "Content-Type": "application/json",
 };
 
-const executePathPlanning = async (payload) => {
-  const response = await fetch(`http://127.0.0.1:8000/plan_path/`, {
+// Id of the last region set uploaded by this worker, plan requests reference it instead of sending the map
+let uploadedRegionSet = { regions: null, id: null };
+
+// Header of the plan requests dropped by the planning scheduler, the robot keeps its goal and asks again
+const PLAN_DROPPED_HEADER = "X-Plan-Dropped";
+
+// Failed plan requests are asked again after an exponential backoff, the goal is given up after MAX_PLAN_FAILURES
+const MAX_PLAN_FAILURES = 5;
+const PLAN_BACKOFF_MS = 250;
+let planFailures = 0;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const uploadRegions = async (regions) => {
+  const response = await fetch(`http://127.0.0.1:8000/regions/`, {
     method: "POST",
     headers: API_HEADERS,
-    body: JSON.stringify(payload),
+    body: JSON.stringify({ regions }),
   });
+  const { region_set_id } = await response.json();
+  return region_set_id;
+};
+
+const executePathPlanning = async (payload, isRetry = false) => {
+  const regions = JSON.stringify(payload.mapping.regions);
+  if (uploadedRegionSet.regions !== regions) {
+    uploadedRegionSet = {
+      regions,
+      id: await uploadRegions(payload.mapping.regions),
+    };
+  }
+
+  const response = await fetch(
+    `http://127.0.0.1:8000/plan_path/?region_set_id=${uploadedRegionSet.id}`,
+    {
+      method: "POST",
+      headers: API_HEADERS,
+      body: JSON.stringify({ robot: payload.robot }),
+    }
+  );
+
+  // The server evicted the region set, upload it again once
+  if (response.status === 404 && !isRetry) {
+    uploadedRegionSet = { regions: null, id: null };
+    return await executePathPlanning(payload, true);
+  }
+
+  // The planning scheduler dropped the request, there is no answer yet
+  if (response.headers.get(PLAN_DROPPED_HEADER)) {
+    return null;
+  }
+
+  if (!response.ok) {
+    throw new Error(
+      `Plan request failed with status ${response.status}: ${await response.text()}`
+    );
+  }
   return await response.json();
 };
 
+const executePathPlanningWithBackoff = async (payload) => {
+  try {
+    const navigationPaths = await executePathPlanning(payload);
+    planFailures = 0;
+    return navigationPaths;
+  } catch (err) {
+    console.error(err);
+    planFailures += 1;
+
+    // Give the goal up instead of asking again forever
+    if (planFailures >= MAX_PLAN_FAILURES) {
+      planFailures = 0;
+      return [];
+    }
+
+    // No answer yet, the robot keeps its goal and asks again after the backoff
+    await sleep(PLAN_BACKOFF_MS * 2 ** (planFailures - 1));
+    return null;
+  }
+};
+
 const executeSingleRobot = async (payload, id) => {
   const response = await fetch(`http://127.0.0.1:8000/single_robot/`, {
     method: "POST",
@@ -31,13 +103,7 @@ self.onmessage = async (event) => {
 
   switch (operation) {
     case "PLAN_PATH":
-      await executePathPlanning(payload)
-        .then((res) => {
-          response = res;
-        })
-        .catch((err) => {
-          console.log(err);
-        });
+      response = await executePathPlanningWithBackoff(payload);
 
       break;
 